@@ -0,0 +1,66 @@
+"""确定性的合成HTML语料生成器
+
+同样的参数和种子总是生成同样的文档, 便于在不同版本之间比较耗时.
+"""
+import random
+
+TAGS = ('div', 'section', 'article', 'ul', 'li', 'p', 'span', 'a', 'table', 'tr', 'td', 'em', 'strong')
+VOID_TAGS = ('br', 'img', 'input', 'hr')
+ATTR_NAMES = ('title', 'role', 'href', 'src', 'lang', 'tabindex')
+WORDS = ('alpha', 'beta', 'gamma', 'delta', '标题', '内容', 'lorem', 'ipsum', 'dolor', 'amet')
+
+# 预设规模: 元素数, 最大深度, 每个元素平均的属性数
+PRESETS = {
+    'small': dict(elements=2_000, depth=8, attr_density=1.0),
+    'medium': dict(elements=50_000, depth=16, attr_density=2.0),
+    'large': dict(elements=300_000, depth=24, attr_density=2.0),
+}
+
+
+def generate_html(elements=10_000, depth=12, attr_density=1.5, seed=0):
+    """生成约含 elements 个元素、嵌套不超过 depth 层的UTF-8文档
+
+    attr_density 为每个元素的平均属性数(id、class 和其他属性按比例分配).
+    """
+    rng = random.Random(seed)
+    parts = ['<!DOCTYPE html><html><head><meta charset="utf-8"><title>bench</title></head><body>\n']
+    stack = []
+    count = 0
+    while count < elements:
+        # 越深越倾向于关闭元素, 使树的形状接近真实页面
+        if stack and (len(stack) >= depth or rng.random() < len(stack) / (depth * 2)):
+            parts.append(f'</{stack.pop()}>')
+            continue
+        count += 1
+        if rng.random() < 0.05:
+            parts.append(f'<{rng.choice(VOID_TAGS)}{_attrs(rng, attr_density, count)}>')
+            continue
+        tag = rng.choice(TAGS)
+        parts.append(f'<{tag}{_attrs(rng, attr_density, count)}>')
+        if rng.random() < 0.6:
+            parts.append(' '.join(rng.choices(WORDS, k=rng.randint(1, 6))))
+        stack.append(tag)
+    while stack:
+        parts.append(f'</{stack.pop()}>')
+    parts.append('\n</body></html>\n')
+    return ''.join(parts).encode('utf-8')
+
+
+def _attrs(rng, density, serial):
+    count = min(int(rng.expovariate(1 / density)) if density > 0 else 0, 8)
+    attrs = []
+    for i in range(count):
+        kind = rng.random()
+        if kind < 0.2 and not any(a.startswith(' id=') for a in attrs):
+            attrs.append(f' id="n{serial}"')
+        elif kind < 0.6:
+            attrs.append(f' class="c{rng.randint(0, 99)} k{rng.randint(0, 9)}"')
+        elif kind < 0.7:
+            attrs.append(' hidden')
+        else:
+            attrs.append(f' {rng.choice(ATTR_NAMES)}{i}="{rng.choice(WORDS)}-{rng.randint(0, 999)}"')
+    return ''.join(attrs)
+
+
+def preset(name, seed=0):
+    return generate_html(seed=seed, **PRESETS[name])
@@ -0,0 +1,325 @@
+"""基准测试: 在合成语料上测量各阶段的耗时和峰值内存, 并与保存的基线比较
+
+用法示例:
+    python -m benchmarks.run                        # 运行全部基准, 默认 medium 规模
+    python -m benchmarks.run -s small --only parse  # 只运行名称包含 parse 的基准
+    python -m benchmarks.run --save-baseline        # 把结果保存为基线
+    python -m benchmarks.run --check                # 比基线慢超过容差时返回非零退出码
+
+测试在临时的 HOME 下进行, 不读写用户的缓存和历史记录; 解析缓存被关闭,
+本地服务器不返回校验头, 每次测量的都是完整的下载和解析.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.corpus import PRESETS, generate_html
+from benchmarks.server import serve
+
+BASELINE_FILE = Path(__file__).with_name('baseline.json')
+# 中位数比基线慢超过该比例时视为退化
+DEFAULT_TOLERANCE = 0.25
+# 树模型基准中最多展开的行数, 相当于用户逐层展开浏览
+TREE_ROWS = 5_000
+HISTORY_ENTRIES = 100
+# 切换主题基准中打开的标签页数
+THEME_TABS = 10
+FILTERS = (
+    ('text', 'c42'),
+    ('css', 'div.c7 > span[title0]'),
+    ('xpath', "//ul/li[@class and contains(@class, 'k3')]"),
+)
+
+BENCHMARKS = []
+
+
+def benchmark(name):
+    """注册基准函数; 函数接收上下文并返回一个无参的被测函数"""
+    def register(func):
+        BENCHMARKS.append((name, func))
+        return func
+    return register
+
+
+def measure(func, repeat):
+    """先预热一次, 再测 repeat 次耗时; 峰值内存单独用 tracemalloc 测一次, 不影响计时"""
+    func()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'median_ms': round(statistics.median(times) * 1000, 2),
+        'best_ms': round(min(times) * 1000, 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+@benchmark('parse_url')
+def bench_parse_url(ctx):
+    from src.core.parser import HTMLParser
+    url = ctx['base_url'] + '/doc.html'
+
+    def run():
+        if not HTMLParser().parse_url(url):
+            raise RuntimeError(f"解析失败: {url}")
+    return run
+
+
+@benchmark('parse_html')
+def bench_parse_html(ctx):
+    from src.core.parser import HTMLParser
+    return lambda: HTMLParser().parse_html(ctx['data'])
+
+
+@benchmark('get_element_tree')
+def bench_element_tree(ctx):
+    parser = ctx['parser']
+    return parser.get_element_tree
+
+
+def _qt_app(ctx):
+    """界面相关的基准共用一个 QApplication, 没有显示器时使用 offscreen 平台; 缺少 PyQt6 时返回 None"""
+    try:
+        from PyQt6.QtWidgets import QApplication
+    except ImportError:
+        return None
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    return ctx.setdefault('qt_app', QApplication.instance() or QApplication([]))
+
+
+@benchmark('tree_model')
+def bench_tree_model(ctx):
+    """设置快照后按广度优先展开, 直到创建 TREE_ROWS 行并读取每行的显示数据"""
+    if _qt_app(ctx) is None:
+        return None
+    from PyQt6.QtCore import QModelIndex
+    from src.ui.element_model import ElementTreeModel
+    snapshot = ctx['parser'].snapshot
+
+    def run():
+        model = ElementTreeModel()
+        model.set_snapshot(snapshot)
+        queue = [QModelIndex()]
+        rows = 0
+        while queue and rows < TREE_ROWS:
+            parent = queue.pop(0)
+            while model.canFetchMore(parent):
+                model.fetchMore(parent)
+            for row in range(model.rowCount(parent)):
+                index = model.index(row, 0, parent)
+                model.data(index)
+                model.data(model.index(row, 1, parent))
+                queue.append(index)
+                rows += 1
+    return run
+
+
+@benchmark('new_tab')
+def bench_new_tab(ctx):
+    """创建一个标签页并显示出来(含样式的 polish 和布局), 再销毁"""
+    app = _qt_app(ctx)
+    if app is None:
+        return None
+    from PyQt6.QtCore import QEvent
+    from src.ui.parser_widget import ParserWidget
+    from src.ui.theme import apply_theme
+    apply_theme(app, 'light')
+
+    def run():
+        widget = ParserWidget({})
+        widget.show()
+        app.processEvents()
+        widget.close()
+        widget.deleteLater()
+        app.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+    return run
+
+
+@benchmark('theme_switch')
+def bench_theme_switch(ctx):
+    """打开 THEME_TABS 个标签页(都显示过一次), 在浅色和深色主题之间切换"""
+    app = _qt_app(ctx)
+    if app is None:
+        return None
+    from src.ui.tab_widget import TabWidget
+    from src.ui.theme import apply_theme
+    tabs = TabWidget({})
+    tabs.show()
+    for _ in range(THEME_TABS):
+        tabs.add_tab()
+        app.processEvents()
+    themes = iter(['dark', 'light'] * 10 ** 6)
+    ctx['theme_tabs'] = tabs
+
+    def run():
+        apply_theme(app, next(themes))
+        app.processEvents()
+    return run
+
+
+def _filter_benchmark(mode, text):
+    def factory(ctx):
+        from src.ui.element_model import ElementTreeModel
+        snapshot = ctx['parser'].snapshot
+        return lambda: ElementTreeModel.compute_visible(snapshot, text, mode=mode)
+    return factory
+
+
+for _mode, _text in FILTERS:
+    benchmark(f'filter_{_mode}')(_filter_benchmark(_mode, _text))
+
+
+@benchmark('history_add_entry')
+def bench_history(ctx):
+    """在已有 HISTORY_ENTRIES 条记录的情况下追加一条"""
+    from src.utils.history import HistoryManager
+    manager = HistoryManager()
+    for i in range(HISTORY_ENTRIES):
+        manager.add_entry(f'https://example.com/page/{i}')
+    counter = iter(range(10 ** 9))
+    return lambda: manager.add_entry(f'https://example.com/new/{next(counter)}')
+
+
+@benchmark('cold_start')
+def bench_cold_start(ctx):
+    """在新进程中启动图形界面, 直到第一个标签页就绪后退出, 包含解释器启动和全部导入"""
+    import importlib.util
+    if importlib.util.find_spec('PyQt6') is None:
+        return None
+    root = str(Path(__file__).resolve().parent.parent)
+    # 日志目录相对于当前目录创建, 在临时的 HOME 中运行, 不在仓库里留下文件
+    home = os.environ['HOME']
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen',
+               PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    command = [sys.executable, '-m', 'src.main', '--exit-after-startup']
+
+    def run():
+        subprocess.run(command, cwd=home, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return run
+
+
+def load_baseline(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def compare(results, baseline, tolerance):
+    """返回退化的基准列表 [(名称, 基线毫秒, 当前毫秒)]"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous and result['median_ms'] > previous['median_ms'] * (1 + tolerance):
+            regressions.append((name, previous['median_ms'], result['median_ms']))
+    return regressions
+
+
+def print_table(results, baseline):
+    print(f"{'基准':<20}{'中位数ms':>12}{'最快ms':>12}{'峰值KB':>12}{'相对基线':>10}")
+    for name, result in results.items():
+        previous = baseline.get(name)
+        ratio = f"{result['median_ms'] / previous['median_ms']:.2f}x" if previous and previous['median_ms'] else '-'
+        print(f"{name:<20}{result['median_ms']:>12.2f}{result['best_ms']:>12.2f}"
+              f"{result['peak_kb']:>12.1f}{ratio:>10}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description="HTML标签解析器基准测试")
+    parser.add_argument('-s', '--size', default='medium', choices=sorted(PRESETS), help="语料规模")
+    parser.add_argument('--elements', type=int, help="覆盖预设的元素数")
+    parser.add_argument('--depth', type=int, help="覆盖预设的最大嵌套深度")
+    parser.add_argument('--attr-density', type=float, help="覆盖预设的每元素平均属性数")
+    parser.add_argument('--seed', type=int, default=0, help="语料随机种子")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="每个基准的计时次数")
+    parser.add_argument('--only', action='append', default=[], help="只运行名称包含该字符串的基准")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE, help="基线文件")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果保存为基线")
+    parser.add_argument('--check', action='store_true', help="比基线慢超过容差时返回退出码1")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="允许的变慢比例")
+    parser.add_argument('--json', action='store_true', help="以JSON输出结果")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    corpus = dict(PRESETS[args.size])
+    for key in ('elements', 'depth', 'attr_density'):
+        if getattr(args, key) is not None:
+            corpus[key] = getattr(args, key)
+    corpus['seed'] = args.seed
+    data = generate_html(**corpus)
+
+    with tempfile.TemporaryDirectory(prefix='html_parser_bench_') as home:
+        # 在导入解析器之前切换 HOME, 缓存和历史记录都落在临时目录中
+        os.environ['HOME'] = home
+        from src.core.doc_cache import set_document_cache
+        from src.core.parser import HTMLParser
+        set_document_cache(None)
+
+        parser = HTMLParser()
+        parser.parse_html(data)
+        print(f"语料: {len(data) / 1024:.0f} KB, {len(parser.snapshot) - 1} 个元素, 参数 {corpus}",
+              file=sys.stderr)
+
+        results = {}
+        with serve({'/doc.html': data}) as base_url:
+            ctx = {'data': data, 'parser': parser, 'base_url': base_url}
+            for name, factory in BENCHMARKS:
+                if args.only and not any(part in name for part in args.only):
+                    continue
+                func = factory(ctx)
+                if func is None:
+                    print(f"跳过 {name}: 缺少依赖", file=sys.stderr)
+                    continue
+                results[name] = measure(func, args.repeat)
+
+    baseline_doc = load_baseline(args.baseline)
+    baseline = baseline_doc.get('results', {}) if baseline_doc.get('corpus') == corpus else {}
+    if baseline_doc and not baseline:
+        print("基线的语料参数与本次不同, 不做比较", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps({'corpus': corpus, 'results': results}, ensure_ascii=False, indent=2))
+    else:
+        print_table(results, baseline)
+
+    if args.save_baseline:
+        document = {
+            'corpus': corpus,
+            'machine': f"{platform.python_implementation()} {platform.python_version()} {platform.machine()}",
+            'results': results,
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存到 {args.baseline}", file=sys.stderr)
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name, previous, current in regressions:
+        print(f"性能退化: {name} {previous:.2f}ms -> {current:.2f}ms", file=sys.stderr)
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
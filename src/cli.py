@@ -0,0 +1,211 @@
+"""命令行批量解析, 不加载 PyQt6
+
+用法示例:
+    python -m src.cli parse https://example.com pages/*.html
+    python -m src.cli parse -i urls.txt --css "a[href]" --html > out.jsonl
+每个文档输出一行JSON, 出错的文档输出 {"source": ..., "error": ...}.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.backends import DEFAULT_BACKEND, available_backends
+from src.core.doc_cache import set_document_cache
+from src.core.http_cache import ResponseCache
+from src.core.http_client import DEFAULT_TIMEOUT, HttpClient
+from src.core.parser import HTMLParser
+from src.core.query import QueryError, compile_query
+
+# 同时处理(下载和解析)的文档数
+DEFAULT_CONCURRENCY = 16
+
+
+def _is_url(source):
+    return source.startswith(('http://', 'https://'))
+
+
+def expand_sources(patterns, list_files):
+    """展开URL、文件通配符和URL列表文件('-'表示标准输入), 保持顺序并去重"""
+    items = list(patterns)
+    for path in list_files:
+        stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+        with stream:
+            items.extend(line.strip() for line in stream)
+    seen = set()
+    sources = []
+    for item in items:
+        if not item or item.startswith('#'):
+            continue
+        if _is_url(item):
+            matches = [item]
+        else:
+            matches = sorted(glob.glob(item, recursive=True)) or [item]
+        for source in matches:
+            if source not in seen:
+                seen.add(source)
+                sources.append(source)
+    return sources
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class BatchParser:
+    """在 HttpClient 的事件循环中并发下载, 在线程池中解析, 结果逐行写出
+
+    concurrency 限制同时在下载或解析中的文档数, 也就限制了同时保存在内存中的原始内容.
+    """
+
+    def __init__(self, client, backend=DEFAULT_BACKEND, query=None, include_html=False,
+                 concurrency=DEFAULT_CONCURRENCY, workers=None, processes=False, output=sys.stdout):
+        self.client = client
+        self.backend = backend
+        self.processes = processes
+        self.query = query
+        self.include_html = include_html
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count(), thread_name_prefix='cli-parse')
+        self.output = output
+        self.failed = 0
+
+    def run(self, sources):
+        """处理全部文档, 返回出错的文档数"""
+        self.client.submit(self._run_all(sources)).result()
+        self.executor.shutdown()
+        return self.failed
+
+    async def _run_all(self, sources):
+        # 固定数量的工作协程依次取文档, 每个文档下载和解析都完成后才取下一个,
+        # 同时持有原始内容的文档不超过 concurrency 个
+        pending = iter(sources)
+        results = asyncio.Queue()
+
+        async def worker():
+            for source in pending:
+                await results.put(await self._process(source))
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(min(self.concurrency, len(sources)))]
+        try:
+            for _ in range(len(sources)):
+                record = await results.get()
+                if 'error' in record:
+                    self.failed += 1
+                self.output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                self.output.flush()
+        finally:
+            for task in workers:
+                task.cancel()
+
+    async def _process(self, source):
+        loop = asyncio.get_running_loop()
+        try:
+            if _is_url(source):
+                response = await self.client.fetch_async(source)
+                data, encoding = response.data, response.encoding
+            else:
+                data = await loop.run_in_executor(self.executor, _read_file, source)
+                encoding = None
+            return await loop.run_in_executor(self.executor, self._parse, source, data, encoding)
+        except Exception as e:
+            return {'source': source, 'error': str(e) or type(e).__name__}
+
+    def _parse(self, source, data, encoding):
+        snapshot = HTMLParser(self.backend, self.processes).parse_html(data, encoding)
+        record = {'source': source, 'encoding': snapshot.source.encoding, 'elements': len(snapshot) - 1}
+        if self.query is None:
+            record['tree'] = snapshot.to_dict()
+            return record
+        matches = []
+        for node in self.query.select(snapshot):
+            match = {
+                'tag': snapshot.name(node),
+                'attrs': dict(snapshot.attr_items(node)),
+                'start': snapshot.starts[node],
+                'end': snapshot.ends[node]
+            }
+            if self.include_html:
+                match['html'] = snapshot.outer_html(node)
+            matches.append(match)
+        record['matches'] = matches
+        return record
+
+
+def _positive_int(text):
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"不是整数: {text}")
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"必须大于0: {text}")
+    return value
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description="HTML标签解析器命令行")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    parse = commands.add_parser('parse', help="解析URL或本地文件, 按行输出JSON")
+    parse.add_argument('sources', nargs='*', help="URL或文件通配符")
+    parse.add_argument('-i', '--input', action='append', default=[],
+                       help="每行一个URL或路径的列表文件, '-' 表示标准输入")
+    query = parse.add_mutually_exclusive_group()
+    query.add_argument('--css', help="只输出匹配CSS选择器的元素")
+    query.add_argument('--xpath', help="只输出匹配XPath的元素")
+    parse.add_argument('--html', action='store_true', help="匹配结果中包含元素的HTML")
+    parse.add_argument('-b', '--backend', default=DEFAULT_BACKEND, choices=available_backends(),
+                       help="解析引擎")
+    parse.add_argument('-c', '--concurrency', type=_positive_int, default=DEFAULT_CONCURRENCY, help="同时处理(下载和解析)的文档数")
+    parse.add_argument('-j', '--jobs', type=_positive_int, default=None, help="解析线程数, 默认为CPU核数")
+    parse.add_argument('-p', '--processes', action='store_true', help="在子进程中解析, 充分利用多核")
+    parse.add_argument('-t', '--timeout', type=int, default=DEFAULT_TIMEOUT, help="请求超时(秒)")
+    parse.add_argument('--no-cache', action='store_true', help="不使用响应缓存和解析缓存")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sources = expand_sources(args.sources, args.input)
+    if not sources:
+        print("没有要解析的URL或文件", file=sys.stderr)
+        return 2
+    try:
+        query = None
+        if args.css:
+            query = compile_query(args.css, 'css')
+        elif args.xpath:
+            query = compile_query(args.xpath, 'xpath')
+    except QueryError as e:
+        print(f"查询语法错误: {e}", file=sys.stderr)
+        return 2
+
+    cache = None
+    if args.no_cache:
+        set_document_cache(None)
+    else:
+        try:
+            cache = ResponseCache()
+        except Exception as e:
+            print(f"无法创建响应缓存, 将不使用缓存: {e}", file=sys.stderr)
+    client = HttpClient(timeout=args.timeout, cache=cache)
+    try:
+        failed = BatchParser(client, args.backend, query, args.html, args.concurrency, args.jobs,
+                             args.processes).run(sources)
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # 下游(如 head)提前关闭了管道
+        sys.stdout = open(os.devnull, 'w')
+        return 0
+    finally:
+        client.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
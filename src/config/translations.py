@@ -31,6 +31,12 @@ TRANSLATIONS = {
         "settings_theme_dark": "深色",
         "settings_language": "语言:",
         "settings_timeout": "请求超时(秒):",
+        "settings_http_cache": "响应缓存上限(MB):",
+        "settings_doc_cache": "解析缓存上限(MB):",
+        "settings_tab_memory": "标签页内存上限(MB, 0为不限制):",
+        "settings_parser_backend": "解析引擎:",
+        "settings_streaming": "边下载边解析",
+        "settings_process_parse": "多进程解析(适合大文档, 不能边下载边解析)",
         "settings_history": "最大历史记录数:",
         "settings_font_size": "字体大小:",
         "settings_font_preview": "字体预览:",
@@ -96,6 +102,12 @@ TRANSLATIONS = {
         "settings_theme_dark": "Dark",
         "settings_language": "Language:",
         "settings_timeout": "Request Timeout (seconds):",
+        "settings_http_cache": "Response Cache Limit (MB):",
+        "settings_doc_cache": "Parse Cache Limit (MB):",
+        "settings_tab_memory": "Tab Memory Budget (MB, 0 = unlimited):",
+        "settings_parser_backend": "Parser Backend:",
+        "settings_streaming": "Parse while downloading",
+        "settings_process_parse": "Parse in worker processes (large documents, disables streaming)",
         "settings_history": "Max History Records:",
         "settings_font_size": "Font Size:",
         "settings_font_preview": "Font Preview:",
@@ -0,0 +1,417 @@
+import re
+from functools import lru_cache
+from html.parser import HTMLParser as _StdHTMLParser
+
+from src.core.cancel import ParseCancelled, check
+from src.core.snapshot import NONE, ROOT, SnapshotBuilder
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_BACKEND = 'html.parser'
+# 分块送入分词器的大小, 每块之间检查一次取消
+FEED_SIZE = 256 * 1024
+# 遍历第三方解析树时每处理这么多元素检查一次取消
+CHECK_INTERVAL = 4096
+
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'param', 'source', 'track', 'wbr'
+])
+
+# 开始这些标签时, 会隐式关闭栈顶的同类元素
+IMPLIED_END = {
+    'li': {'li'},
+    'p': {'p'},
+    'option': {'option'},
+    'dt': {'dt', 'dd'},
+    'dd': {'dt', 'dd'},
+    'tr': {'tr', 'td', 'th'},
+    'td': {'td', 'th'},
+    'th': {'td', 'th'},
+}
+BLOCK_ELEMENTS = frozenset([
+    'address', 'article', 'aside', 'blockquote', 'div', 'dl', 'fieldset',
+    'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+    'main', 'nav', 'ol', 'pre', 'section', 'table', 'ul'
+])
+
+
+class _AttrReader(_StdHTMLParser):
+    """重新解析含非ASCII字符的开始标签, 取得正确解码的属性"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.attrs = []
+
+    def handle_starttag(self, tag, attrs):
+        self.attrs = attrs
+
+    handle_startendtag = handle_starttag
+
+    def read(self, starttag_text):
+        self.reset()
+        self.attrs = []
+        self.feed(starttag_text)
+        return self.attrs
+
+
+class _TreeBuilder(_StdHTMLParser):
+    """基于标准库分词器构建DOM快照, 同时记录每个元素的字节偏移"""
+
+    def __init__(self, source):
+        super().__init__(convert_charrefs=False)
+        self.source = source
+        self.snapshot = SnapshotBuilder(source)
+        # 栈中保存 (元素下标, 标签名)
+        self.stack = [(ROOT, '[document]')]
+        self._fed = 0
+        self._base = 0
+        self._token_start = 0
+        self._attr_reader = None
+
+    def feed(self, data):
+        # rawdata 中尚未处理的部分在文档中的起始偏移
+        self._base = self._fed - len(self.rawdata)
+        self._fed += len(data)
+        super().feed(data)
+
+    def updatepos(self, i, j):
+        # 只记录下一个记号的绝对偏移, 省去标准库逐行计数的开销
+        self._token_start = self._base + j
+        return j
+
+    def handle_starttag(self, tag, attrs):
+        self._open(tag, attrs, tag in VOID_ELEMENTS)
+
+    def handle_startendtag(self, tag, attrs):
+        self._open(tag, attrs, True)
+
+    def handle_endtag(self, tag):
+        stack = self.stack
+        for depth in range(len(stack) - 1, 0, -1):
+            if stack[depth][1] == tag:
+                break
+        else:
+            return
+        start = self._token_start
+        close = self.rawdata.find('>', start - self._base)
+        end = self._base + close + 1 if close >= 0 else start + len(tag) + 3
+        close_element = self.snapshot.close_element
+        while len(stack) > depth + 1:
+            close_element(stack.pop()[0], start)
+        close_element(stack.pop()[0], end)
+
+    def _open(self, tag, attrs, closed):
+        start = self._token_start
+        text = self.get_starttag_text()
+        top = self.stack[-1][1]
+        if top in IMPLIED_END.get(tag, ()) or (top == 'p' and tag in BLOCK_ELEMENTS):
+            self.snapshot.close_element(self.stack.pop()[0], start)
+        if not text.isascii():
+            if self._attr_reader is None:
+                self._attr_reader = _AttrReader()
+            attrs = self._attr_reader.read(self.source.decode_token(text))
+        node = self.snapshot.open_element(self.stack[-1][0], tag, attrs, start)
+        if closed:
+            self.snapshot.close_element(node, start + len(text))
+        else:
+            self.stack.append((node, tag))
+
+    def partial(self):
+        """冻结已解析的部分, 尚未关闭的元素暂时延伸到已接收数据的末尾"""
+        snapshot = self.snapshot.freeze()
+        for node, _ in self.stack:
+            snapshot.ends[node] = self._fed
+        return snapshot
+
+    @property
+    def node_count(self):
+        return len(self.snapshot)
+
+    def close(self):
+        super().close()
+        end = self._fed
+        while self.stack:
+            self.snapshot.close_element(self.stack.pop()[0], end)
+        return self.snapshot.freeze()
+
+
+# 开始标签中的属性部分, 引号内的 > 不结束标签
+_TAG_BODY = rb'(?:"[^"]*"|\'[^\']*\'|[^\'">])*'
+# 扫描原始字节中的开始标签, 跳过注释、属性值以及脚本、样式等原始文本元素的内容
+_START_TAG_SCAN = re.compile(
+    rb'<!--.*?(?:-->|\Z)'
+    rb'|<(script|style|textarea|title|xmp)\b(' + _TAG_BODY + rb'>).*?(?:</\1\s*>|\Z)'
+    rb'|<([a-zA-Z][^\s/>]*)' + _TAG_BODY + rb'>?',
+    re.S | re.I
+)
+# 在源码中对齐元素时向前查找的开始标签数
+_ALIGN_WINDOW = 8
+
+
+@lru_cache(maxsize=256)
+def _end_tag_pattern(name):
+    return re.compile(rb'</' + re.escape(name.encode('ascii', 'ignore')) + rb'\s*>', re.I)
+
+
+def locate_offsets(builder, token=None):
+    """为不提供源码位置的后端在原始字节中定位元素的起止偏移
+
+    按文档顺序把元素与源码中的开始标签逐个对齐, 源码中不存在的
+    隐含元素(如补全的 html/body/tbody)取其子元素的范围.
+    """
+    data = builder.source.data
+    tag_names = builder.tag_names()
+    tags = builder.tags
+    starts = builder.starts
+    ends = builder.ends
+    parent = builder.parent
+    first_child = builder.first_child
+    last_child = builder.last_child
+    next_sibling = builder.next_sibling
+    count = len(tags)
+
+    check(token)
+    source_names = []
+    source_starts = []
+    # 开始标签结束的位置, 引号没有闭合时为 NONE
+    source_tag_ends = []
+    for match in _START_TAG_SCAN.finditer(data):
+        if match.group(1):
+            name, tag_end = match.group(1), match.end(2)
+        elif match.group(3):
+            name, tag_end = match.group(3), match.end()
+            if data[tag_end - 1:tag_end] != b'>':
+                tag_end = NONE
+        else:
+            continue
+        source_names.append(name.decode('latin-1').lower())
+        source_starts.append(match.start())
+        source_tag_ends.append(tag_end)
+
+    position = 0
+    total = len(source_names)
+    tag_ends = [NONE] * count
+    for node in range(1, count):
+        name = tag_names[tags[node]]
+        if position < total and source_names[position] == name:
+            starts[node] = source_starts[position]
+            tag_ends[node] = source_tag_ends[position]
+            position += 1
+            continue
+        for offset in range(position + 1, min(position + _ALIGN_WINDOW, total)):
+            if source_names[offset] == name:
+                starts[node] = source_starts[offset]
+                tag_ends[node] = source_tag_ends[offset]
+                position = offset + 1
+                break
+        else:
+            starts[node] = NONE
+
+    check(token)
+    # 每个元素的结束位置不会超过其后第一个兄弟元素的起点
+    bounds = [len(data)] * count
+    for node in range(1, count):
+        sibling = next_sibling[node]
+        if sibling != NONE and starts[sibling] != NONE:
+            bounds[node] = starts[sibling]
+        else:
+            bounds[node] = bounds[parent[node]]
+
+    # 内容的结束位置: 有结束标签时为结束标签的起点, 否则与 ends 相同
+    content_ends = [len(data)] * count
+    # 没有结束标签也没有后续兄弟的元素, 等父元素确定范围后再延伸到父元素内容的末尾
+    pending = []
+    # 逆序处理, 子元素总是先于父元素确定范围
+    for node in range(count - 1, 0, -1):
+        child = first_child[node]
+        first_start = starts[child] if child != NONE else NONE
+        child = last_child[node]
+        last_end = ends[child] if child != NONE else NONE
+        start = starts[node]
+        if start == NONE:
+            starts[node] = first_start if first_start != NONE else 0
+            ends[node] = last_end if last_end != NONE else starts[node]
+            content_ends[node] = ends[node]
+            if next_sibling[node] == NONE:
+                # 源码中没有标签的隐含元素(如补出的 body、tbody)同样延伸到父元素内容的末尾
+                pending.append(node)
+            continue
+        tag_end = tag_ends[node]
+        if tag_end == NONE:
+            # 引号没有闭合, 退回到第一个 >
+            tag_end = data.find(b'>', start) + 1 or bounds[node]
+        name = tag_names[tags[node]]
+        if name in VOID_ELEMENTS:
+            ends[node] = content_ends[node] = tag_end
+            continue
+        search_from = max(tag_end, last_end)
+        match = _end_tag_pattern(name).search(data, search_from, max(search_from, bounds[node]))
+        if match:
+            ends[node] = match.end()
+            content_ends[node] = match.start()
+        elif next_sibling[node] != NONE and starts[next_sibling[node]] != NONE:
+            # 没有结束标签时延伸到下一个兄弟元素之前, 与 html.parser 的隐式关闭一致
+            ends[node] = content_ends[node] = max(search_from, bounds[node])
+        else:
+            # 先记下至少要到的位置, 父元素查找结束标签时从这里之后开始
+            ends[node] = content_ends[node] = search_from
+            pending.append(node)
+    # 顺序处理, 父元素先于子元素; 如 <div><p>a<p>last</div> 中第二个 p 到 </div> 之前为止
+    for node in reversed(pending):
+        ends[node] = content_ends[node] = max(ends[node], content_ends[parent[node]])
+    ends[ROOT] = len(data)
+
+
+def _build_from_tree(source, top_level, children, name, attrs, skip, token=None):
+    """以显式栈遍历第三方解析器的树, 按文档顺序写入快照"""
+    check(token)
+    builder = SnapshotBuilder(source)
+    stack = [(element, ROOT) for element in reversed(top_level)]
+    visited = 0
+    while stack:
+        visited += 1
+        if visited % CHECK_INTERVAL == 0:
+            check(token)
+        element, parent = stack.pop()
+        if skip(element):
+            continue
+        node = builder.open_element(parent, name(element), attrs(element), NONE)
+        stack.extend((child, node) for child in reversed(children(element)))
+    locate_offsets(builder, token)
+    return builder.freeze()
+
+
+class ParserBackend:
+    """解析后端的基类, 所有后端都输出同样的 DocumentSnapshot"""
+    name = None
+    module = None
+
+    def available(self):
+        if self.module is None:
+            return True
+        try:
+            __import__(self.module)
+            return True
+        except ImportError:
+            return False
+
+    def parse(self, source, token=None):
+        raise NotImplementedError
+
+
+class HtmlParserBackend(ParserBackend):
+    """标准库 html.parser, 无额外依赖, 偏移精确"""
+    name = 'html.parser'
+
+    def parse(self, source, token=None):
+        builder = self.create_builder(source)
+        for chunk in source.parse_chunks(FEED_SIZE):
+            check(token)
+            builder.feed(chunk)
+        return builder.close()
+
+    def create_builder(self, source):
+        """返回可以分块 feed 的推送式构建器"""
+        return _TreeBuilder(source)
+
+
+class LxmlBackend(ParserBackend):
+    name = 'lxml'
+    module = 'lxml'
+
+    def parse(self, source, token=None):
+        from lxml import etree
+        parser = etree.HTMLParser(encoding=source.encoding, remove_comments=True, remove_pis=True)
+        root = etree.fromstring(bytes(source.data), parser)
+        return _build_from_tree(
+            source,
+            [] if root is None else [root],
+            lambda element: list(element),
+            lambda element: element.tag.lower(),
+            lambda element: element.attrib.items(),
+            lambda element: not isinstance(element.tag, str),
+            token
+        )
+
+
+def _local_name(name):
+    """去掉 {namespace} 前缀或 (namespace, name) 形式中的命名空间"""
+    if not isinstance(name, str):
+        return name[1]
+    return name.rsplit('}', 1)[-1].lower()
+
+
+class Html5libBackend(ParserBackend):
+    name = 'html5lib'
+    module = 'html5lib'
+
+    def parse(self, source, token=None):
+        import html5lib
+        root = html5lib.parse(source.text(0, len(source)), treebuilder='etree',
+                              namespaceHTMLElements=False)
+        return _build_from_tree(
+            source,
+            [root],
+            lambda element: list(element),
+            lambda element: _local_name(element.tag),
+            lambda element: [(_local_name(k), v) for k, v in element.attrib.items()],
+            lambda element: not isinstance(element.tag, str),
+            token
+        )
+
+
+class SelectolaxBackend(ParserBackend):
+    """selectolax 的 lexbor 引擎, C实现的HTML5解析器"""
+    name = 'selectolax'
+    module = 'selectolax'
+
+    def parse(self, source, token=None):
+        from selectolax.lexbor import LexborHTMLParser
+        root = LexborHTMLParser(source.text(0, len(source))).root
+        return _build_from_tree(
+            source,
+            [] if root is None else [root],
+            lambda node: list(node.iter(include_text=False)),
+            lambda node: node.tag.lower(),
+            lambda node: node.attributes.items(),
+            lambda node: node.tag.startswith(('-', '_')),
+            token
+        )
+
+
+BACKENDS = {backend.name: backend for backend in (
+    HtmlParserBackend(),
+    LxmlBackend(),
+    Html5libBackend(),
+    SelectolaxBackend(),
+)}
+
+
+def available_backends():
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def get_backend(name):
+    """取得指定的解析后端, 不存在或未安装时回退到 html.parser"""
+    backend = BACKENDS.get(name)
+    if backend is None or not backend.available():
+        if name != DEFAULT_BACKEND:
+            logger.warning(f"解析后端不可用, 使用 {DEFAULT_BACKEND}: {name}")
+        backend = BACKENDS[DEFAULT_BACKEND]
+    return backend
+
+
+def parse_with_backend(source, name=DEFAULT_BACKEND, token=None):
+    check(token)
+    backend = get_backend(name)
+    try:
+        return backend.parse(source, token)
+    except ParseCancelled:
+        raise
+    except Exception as e:
+        if backend.name == DEFAULT_BACKEND:
+            raise
+        logger.warning(f"{backend.name} 解析失败, 回退到 {DEFAULT_BACKEND}: {str(e)}")
+        return BACKENDS[DEFAULT_BACKEND].parse(source, token)
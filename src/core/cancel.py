@@ -0,0 +1,26 @@
+import threading
+
+
+class ParseCancelled(Exception):
+    """解析任务已被取消"""
+
+
+class CancelToken:
+    """在下载、解码、解析、建树各阶段之间检查的取消标记, 可跨线程使用"""
+    __slots__ = ('_event',)
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+
+def check(token):
+    """token 可以为 None, 便于不需要取消的调用方直接传空"""
+    if token is not None and token.cancelled:
+        raise ParseCancelled()
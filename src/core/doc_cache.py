@@ -0,0 +1,177 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from src.core.snapshot import DocumentSnapshot
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / '.html_parser' / 'cache'
+# 内存中保留的快照数
+DEFAULT_MEMORY_ITEMS = 16
+DEFAULT_DISK_MB = 500
+# 解析结果的格式或偏移定位方式改变时加一, 旧版本缓存的结果不再命中, 按磁盘上限逐渐淘汰
+CACHE_VERSION = 3
+
+
+class DocumentCache:
+    """按内容哈希缓存解析结果
+
+    内存层保存最近使用的快照, 各标签页直接共用; 磁盘层保存序列化后的树结构,
+    重启后内容相同的页面也不必重新解析. 两层都按最近最少使用淘汰.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, memory_items=DEFAULT_MEMORY_ITEMS,
+                 max_bytes=DEFAULT_DISK_MB * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(data, backend, encoding=None):
+        """同样的字节、解析引擎和声明编码得到同样的结果"""
+        return DocumentCache.finish_key(DocumentCache.hasher(data), backend, encoding)
+
+    @staticmethod
+    def hasher(data=b''):
+        """返回计算内容哈希的对象, 边下载边 update, 最后交给 finish_key"""
+        return hashlib.blake2b(data, digest_size=20)
+
+    @staticmethod
+    def finish_key(digest, backend, encoding=None):
+        digest.update(f'\0{backend}\0{encoding or ""}\0{CACHE_VERSION}'.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return self.directory / f'{key}.snap'
+
+    def get(self, key, source):
+        """命中时返回快照; 磁盘层的结果用 source 作为原始内容"""
+        with self._lock:
+            snapshot = self._memory.get(key)
+            if snapshot is not None:
+                self._memory.move_to_end(key)
+                return snapshot
+        path = self._path(key)
+        try:
+            payload = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            snapshot = DocumentSnapshot.from_bytes(payload, source)
+        except Exception as e:
+            logger.warning(f"解析缓存已损坏, 将重新解析: {str(e)}")
+            path.unlink(missing_ok=True)
+            return None
+        # 更新访问时间, 磁盘层按它淘汰
+        os.utime(path)
+        self._remember(key, snapshot)
+        return snapshot
+
+    def put(self, key, snapshot):
+        self._remember(key, snapshot)
+        if self.max_bytes <= 0:
+            return
+        path = self._path(key)
+        tmp = path.with_name(f'{key}.{threading.get_ident()}.tmp')
+        try:
+            tmp.write_bytes(snapshot.to_bytes())
+            os.replace(tmp, path)
+        except Exception as e:
+            tmp.unlink(missing_ok=True)
+            logger.warning(f"写入解析缓存失败: {str(e)}")
+            return
+        self._evict_disk()
+
+    def _remember(self, key, snapshot):
+        with self._lock:
+            self._memory[key] = snapshot
+            self._memory.move_to_end(key)
+        self._trim_memory()
+
+    def _evict_disk(self):
+        with self._lock:
+            entries = []
+            total = 0
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith('.snap'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def configure(self, memory_items=None, max_bytes=None):
+        """调整两层的容量, 立即按新容量淘汰"""
+        if memory_items is not None:
+            self.memory_items = memory_items
+            self._trim_memory()
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+            self._evict_disk()
+
+    def _trim_memory(self):
+        with self._lock:
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def memory_usage(self):
+        """返回内存层的 (快照数, 估算字节数), 快照引用的原始内容也一并计入"""
+        with self._lock:
+            snapshots = list(self._memory.values())
+        size = 0
+        for snapshot in snapshots:
+            size += sum(snapshot.memory_usage().values())
+        return len(snapshots), size
+
+    def release(self, snapshot):
+        """把快照移出内存层, 磁盘层保留; 休眠的标签页借此真正释放快照"""
+        with self._lock:
+            for key in [key for key, cached in self._memory.items() if cached is snapshot]:
+                del self._memory[key]
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            for path in self.directory.glob('*.snap'):
+                path.unlink(missing_ok=True)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def set_document_cache(cache):
+    """替换进程内的 DocumentCache, 传入 None 关闭解析缓存"""
+    global _cache
+    with _cache_lock:
+        _cache = cache if cache is not None else False
+
+
+def get_document_cache():
+    """返回进程内唯一的 DocumentCache, 无法创建缓存目录时返回 None"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = DocumentCache()
+            except Exception as e:
+                logger.warning(f"无法创建解析缓存, 将不使用缓存: {str(e)}")
+                _cache = False
+        return _cache or None
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from src.utils.logger import get_logger
+from src.utils.storage import WriteBehindFile
+
+logger = get_logger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / '.html_parser' / 'http_cache'
+DEFAULT_CACHE_MB = 200
+DEFAULT_MAX_BYTES = DEFAULT_CACHE_MB * 1024 * 1024
+# 缓存中保留的响应头
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class CacheEntry:
+    __slots__ = ('url', 'path', 'headers', 'size')
+
+    def __init__(self, url, path, headers, size):
+        self.url = url
+        self.path = path
+        self.headers = headers
+        self.size = size
+
+    def validators(self):
+        """条件请求头, 服务器内容未变时返回304"""
+        headers = {}
+        if self.headers.get('ETag'):
+            headers['If-None-Match'] = self.headers['ETag']
+        if self.headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = self.headers['Last-Modified']
+        return headers
+
+    def read(self):
+        return self.path.read_bytes()
+
+
+class ResponseCache:
+    """按URL保存响应正文和校验头的磁盘缓存, 超出容量时淘汰最久未使用的条目"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.index_file = self.directory / 'index.json'
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+        # 索引在后台合并写盘, 命中缓存时只改内存中的访问时间
+        self._index_writer = WriteBehindFile(self.index_file)
+
+    def _load_index(self):
+        try:
+            if self.index_file.exists():
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.warning(f"读取响应缓存索引失败: {str(e)}")
+        return {}
+
+    def _save_index(self):
+        self._index_writer.schedule(self._dump_index)
+
+    def _dump_index(self):
+        with self._lock:
+            return json.dumps(self._index, ensure_ascii=False)
+
+    def flush(self):
+        """立即写出尚未写盘的索引"""
+        self._index_writer.flush()
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _body_path(self, key):
+        return self.directory / f'{key}.body'
+
+    @staticmethod
+    def cacheable(headers):
+        """只有带 ETag 或 Last-Modified 的响应才能重新验证"""
+        return bool(headers.get('ETag') or headers.get('Last-Modified'))
+
+    def lookup(self, url):
+        key = self.key(url)
+        with self._lock:
+            record = self._index.get(key)
+            if record is None:
+                return None
+            path = self._body_path(key)
+            if not path.exists():
+                del self._index[key]
+                return None
+            return CacheEntry(url, path, record['headers'], record['size'])
+
+    def touch(self, url):
+        """记录一次命中, 用于LRU淘汰; 索引稍后在后台写盘"""
+        key = self.key(url)
+        with self._lock:
+            record = self._index.get(key)
+            if record is not None:
+                record['last_used'] = time.time()
+                self._save_index()
+
+    def open_writer(self, url, headers):
+        """返回写入临时文件的 CacheWriter, 完整接收后再替换旧条目"""
+        return CacheWriter(self, url, {name: headers[name] for name in KEPT_HEADERS if name in headers})
+
+    def _commit(self, url, headers, tmp_path, size):
+        key = self.key(url)
+        if size > self.max_bytes:
+            tmp_path.unlink(missing_ok=True)
+            return
+        with self._lock:
+            os.replace(tmp_path, self._body_path(key))
+            self._index[key] = {
+                'url': url,
+                'headers': headers,
+                'size': size,
+                'last_used': time.time()
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        total = sum(record['size'] for record in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for key, record in sorted(self._index.items(), key=lambda item: item[1]['last_used']):
+            self._body_path(key).unlink(missing_ok=True)
+            del self._index[key]
+            total -= record['size']
+            if total <= self.max_bytes:
+                break
+
+    def set_max_bytes(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+            self._save_index()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                self._body_path(key).unlink(missing_ok=True)
+            self._index = {}
+            self._save_index()
+
+
+class CacheWriter:
+    """边下载边写入缓存的临时文件"""
+
+    def __init__(self, cache, url, headers):
+        self.cache = cache
+        self.url = url
+        self.headers = headers
+        self.size = 0
+        self.path = cache.directory / f'{cache.key(url)}.{id(self)}.part'
+        self._file = open(self.path, 'wb')
+
+    def write(self, chunk):
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        self.cache._commit(self.url, self.headers, self.path, self.size)
+
+    def abort(self):
+        """提交后再调用不做任何事"""
+        if self._file.closed:
+            return
+        self._file.close()
+        self.path.unlink(missing_ok=True)
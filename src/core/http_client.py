@@ -0,0 +1,313 @@
+import asyncio
+import atexit
+import queue
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from src.core.cancel import ParseCancelled
+from src.core.http_cache import ResponseCache
+from src.core.source import charset_from_content_type
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 连接和读取停顿的超时(秒)
+DEFAULT_TIMEOUT = 10
+# 流式读取响应的块大小
+CHUNK_SIZE = 64 * 1024
+# ResponseStream 等待数据时检查取消的间隔(秒)
+POLL_INTERVAL = 0.1
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, url):
+        super().__init__(f"HTTP错误: {status}")
+        self.status = status
+        self.url = url
+
+
+class FetchResult:
+    __slots__ = ('url', 'status', 'headers', 'encoding', 'data')
+
+    def __init__(self, url, status, headers, data):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.encoding = charset_from_content_type(headers.get('Content-Type'))
+        self.data = data
+
+
+class NetworkResponse:
+    """来自网络的响应, 读取的同时写入响应缓存"""
+    from_cache = False
+
+    def __init__(self, response, writer=None):
+        self._response = response
+        self._writer = writer
+        self.status = response.status
+        self.headers = response.headers
+
+    async def iter_chunks(self, size=CHUNK_SIZE):
+        writer = self._writer
+        async for chunk in self._response.content.iter_chunked(size):
+            if writer is not None:
+                writer.write(chunk)
+            yield chunk
+        # 只有完整读完的响应才写入缓存
+        if writer is not None:
+            await asyncio.get_running_loop().run_in_executor(None, writer.commit)
+
+    async def read(self):
+        return b''.join([chunk async for chunk in self.iter_chunks()])
+
+
+class CachedResponse:
+    """服务器返回304时, 从磁盘缓存读取的响应"""
+    from_cache = True
+    status = 200
+
+    def __init__(self, entry):
+        self._entry = entry
+        self.headers = entry.headers
+
+    async def read(self):
+        return await asyncio.get_running_loop().run_in_executor(None, self._entry.read)
+
+    async def iter_chunks(self, size=CHUNK_SIZE):
+        data = await self.read()
+        for start in range(0, len(data), size):
+            yield data[start:start + size]
+
+
+def _trace_config():
+    """把DNS解析、建立连接和等待响应头的耗时记到请求传入的 StageTimings 中
+
+    DNS解析发生在建立连接之内, 连接耗时扣除DNS部分; 复用连接时两者都不记录.
+    """
+    import aiohttp
+    config = aiohttp.TraceConfig()
+
+    def mark(name):
+        async def handler(session, ctx, params):
+            setattr(ctx, name, time.perf_counter())
+        return handler
+
+    async def dns_end(session, ctx, params):
+        if ctx.trace_request_ctx is not None and hasattr(ctx, 'dns_start'):
+            ctx.dns = time.perf_counter() - ctx.dns_start
+            ctx.trace_request_ctx.add('dns', ctx.dns)
+
+    async def connect_end(session, ctx, params):
+        if ctx.trace_request_ctx is not None and hasattr(ctx, 'connect_start'):
+            ctx.connect = time.perf_counter() - ctx.connect_start
+            ctx.trace_request_ctx.add('connect', ctx.connect - getattr(ctx, 'dns', 0.0))
+
+    async def request_end(session, ctx, params):
+        if ctx.trace_request_ctx is not None and hasattr(ctx, 'request_start'):
+            # 余下为发出请求到收到响应头的时间
+            elapsed = time.perf_counter() - ctx.request_start
+            ctx.trace_request_ctx.add('wait', elapsed - getattr(ctx, 'connect', 0.0))
+
+    config.on_dns_resolvehost_start.append(mark('dns_start'))
+    config.on_dns_resolvehost_end.append(dns_end)
+    config.on_connection_create_start.append(mark('connect_start'))
+    config.on_connection_create_end.append(connect_end)
+    config.on_request_start.append(mark('request_start'))
+    config.on_request_end.append(request_end)
+    return config
+
+
+class ResponseStream:
+    """在线程中逐块读取响应; 网络读取在共享事件循环中进行, 通过队列交给调用线程
+
+    等待期间定期检查 token, 取消后中断下载并抛出 ParseCancelled.
+    """
+
+    def __init__(self, client, url, chunk_size, token=None):
+        self._queue = queue.Queue()
+        self._token = token
+        self._future = client.submit(self._pump(client, url, chunk_size))
+        kind, value = self._get()
+        if kind == 'error':
+            raise value
+        if kind == 'end':
+            raise ParseCancelled()
+        self.headers = value
+        self.encoding = charset_from_content_type(value.get('Content-Type'))
+
+    async def _pump(self, client, url, chunk_size):
+        put = self._queue.put
+        # 无论正常结束、出错还是被取消, 最后都放入结束标记, 读取线程不会一直等下去
+        last = ('end', None)
+        try:
+            async with client.request(url) as response:
+                put(('headers', response.headers))
+                async for chunk in response.iter_chunks(chunk_size):
+                    put(('data', chunk))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            last = ('error', e)
+        finally:
+            put(last)
+
+    def _get(self):
+        while True:
+            try:
+                return self._queue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                pass
+            if self._token is not None and self._token.cancelled:
+                self.close()
+                raise ParseCancelled()
+            if self._future.done() and self._queue.empty():
+                # 协程没有运行就结束了(如事件循环已停止), 不会再有结束标记
+                if not self._future.cancelled() and self._future.exception() is not None:
+                    return 'error', self._future.exception()
+                return 'end', None
+
+    def __iter__(self):
+        while True:
+            kind, value = self._get()
+            if kind == 'data':
+                yield value
+            elif kind == 'error':
+                raise value
+            else:
+                return
+
+    def close(self):
+        self._future.cancel()
+
+
+class HttpClient:
+    """进程内共享的HTTP客户端
+
+    所有标签页和核心解析器共用一个后台事件循环和一个 aiohttp 连接池,
+    重复访问同一主机时复用 keep-alive 连接和DNS缓存. 设置了 cache 时,
+    带校验头的响应会存到磁盘, 再次请求时发送条件请求, 304时直接读取缓存.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, limit=64, limit_per_host=8, dns_ttl=300, cache=None):
+        self.timeout = timeout
+        self.cache = cache
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        """后台事件循环, 首次使用时启动"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever,
+                                                name='http-client', daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def set_timeout(self, timeout):
+        self.timeout = timeout
+
+    def set_cache_limit(self, max_mb):
+        if self.cache is not None:
+            self.cache.set_max_bytes(max_mb * 1024 * 1024)
+
+    def submit(self, coro):
+        """在后台事件循环中执行协程, 返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def _get_session(self):
+        # aiohttp 导入较慢, 第一次请求时才加载, 不拖慢启动
+        import aiohttp
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=30
+            )
+            self._session = aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS,
+                                                  trace_configs=[_trace_config()])
+        return self._session
+
+    @asynccontextmanager
+    async def request(self, url, timings=None):
+        """在共享事件循环中发起GET请求, 得到 NetworkResponse 或 CachedResponse
+
+        非200(命中缓存的304除外)状态抛出 HttpError. 传入 timings 时记录连接各阶段的耗时.
+        """
+        import aiohttp
+        session = self._get_session()
+        # 只限制建立连接和两次读取之间的等待, 不限制下载总时长, 慢速的大文档可以边下载边显示
+        timeout = aiohttp.ClientTimeout(total=None, connect=self.timeout, sock_read=self.timeout)
+        # 缓存的磁盘读写放到线程池, 不阻塞共享事件循环中的其他请求
+        loop = asyncio.get_running_loop()
+        entry = await loop.run_in_executor(None, self.cache.lookup, url) if self.cache is not None else None
+        headers = entry.validators() if entry is not None else None
+        async with session.get(url, timeout=timeout, headers=headers, trace_request_ctx=timings) as response:
+            if response.status == 304 and entry is not None:
+                self.cache.touch(url)
+                yield CachedResponse(entry)
+                return
+            if response.status != 200:
+                raise HttpError(response.status, url)
+            writer = None
+            if self.cache is not None and self.cache.cacheable(response.headers):
+                writer = await loop.run_in_executor(None, self.cache.open_writer, url, response.headers)
+            try:
+                yield NetworkResponse(response, writer)
+            finally:
+                # 未读完(出错或取消)时丢弃写了一半的缓存文件
+                if writer is not None:
+                    writer.abort()
+
+    async def fetch_async(self, url):
+        async with self.request(url) as response:
+            data = await response.read()
+            return FetchResult(url, response.status, response.headers, data)
+
+    def fetch(self, url):
+        """阻塞地下载整个响应, 供非事件循环线程调用"""
+        return self.submit(self.fetch_async(url)).result()
+
+    def stream(self, url, chunk_size=CHUNK_SIZE, token=None):
+        """阻塞地打开响应流, 返回可逐块迭代的 ResponseStream; token 被取消时抛出 ParseCancelled"""
+        return ResponseStream(self, url, chunk_size, token)
+
+    def close(self):
+        if self._loop is None:
+            return
+        if self._session is not None and not self._session.closed:
+            try:
+                self.submit(self._session.close()).result(timeout=2)
+            except Exception as e:
+                logger.warning(f"关闭HTTP连接池失败: {str(e)}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """返回进程内唯一的 HttpClient"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            try:
+                cache = ResponseCache()
+            except Exception as e:
+                logger.warning(f"无法创建响应缓存, 将不使用缓存: {str(e)}")
+                cache = None
+            _client = HttpClient(cache=cache)
+            atexit.register(_client.close)
+        return _client
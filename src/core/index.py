@@ -0,0 +1,161 @@
+import sys
+from array import array
+from collections import defaultdict
+
+from src.core.cancel import check
+
+ROOT = 0
+NONE = -1
+
+
+class DocumentIndex:
+    """快照的倒排索引, 解析完成后在工作线程中一次建好
+
+    by_tag/by_id/by_class/by_attr 分别把标签名、id、class 中的单词、属性名映射到
+    按文档顺序排列的节点数组; terms 把以上所有词以及属性值(均为小写)映射到节点,
+    供过滤框做子串匹配.
+    """
+    __slots__ = ('parent', 'next_sibling', 'by_tag', 'by_id', 'by_class', 'by_attr', 'terms',
+                 '_prev_sibling', '_position', '_subtree_end')
+
+    def __init__(self, snapshot):
+        self.parent = snapshot.parent
+        self.next_sibling = snapshot.next_sibling
+        self._prev_sibling = None
+        self._position = None
+        self._subtree_end = None
+        strings = snapshot.strings
+        attrs = snapshot.attrs
+        attr_index = snapshot.attr_index
+
+        by_tag_id = defaultdict(lambda: array('I'))
+        for node, tag in enumerate(snapshot.tags):
+            by_tag_id[tag].append(node)
+        del by_tag_id[0]
+
+        # 先按字符串id归类, 每个不同的字符串只处理一次
+        by_name_id = defaultdict(lambda: array('I'))
+        by_value_id = defaultdict(lambda: array('I'))
+        id_value_ids = defaultdict(lambda: array('I'))
+        class_value_ids = defaultdict(lambda: array('I'))
+        id_name = _string_id(snapshot, 'id')
+        class_name = _string_id(snapshot, 'class')
+        for node in range(1, len(snapshot)):
+            for i in range(2 * attr_index[node], 2 * attr_index[node + 1], 2):
+                name_id = attrs[i]
+                value_id = attrs[i + 1]
+                names = by_name_id[name_id]
+                # 重复的属性只记录一次
+                if not names or names[-1] != node:
+                    names.append(node)
+                if value_id:
+                    by_value_id[value_id].append(node)
+                    if name_id == id_name:
+                        id_value_ids[value_id].append(node)
+                    elif name_id == class_name:
+                        class_value_ids[value_id].append(node)
+
+        self.by_tag = {snapshot.tag_names[tag]: nodes for tag, nodes in by_tag_id.items()}
+        self.by_attr = {strings[name_id]: nodes for name_id, nodes in by_name_id.items()}
+        self.by_id = {strings[value_id]: nodes for value_id, nodes in id_value_ids.items()}
+        by_class = defaultdict(set)
+        for value_id, nodes in class_value_ids.items():
+            for token in strings[value_id].split():
+                by_class[token].update(nodes)
+        self.by_class = {token: array('I', sorted(nodes)) for token, nodes in by_class.items()}
+
+        terms = defaultdict(list)
+        for postings in (self.by_tag, self.by_attr, self.by_class):
+            for key, nodes in postings.items():
+                terms[key.lower()].append(nodes)
+        for value_id, nodes in by_value_id.items():
+            terms[strings[value_id].lower()].append(nodes)
+        self.terms = dict(terms)
+
+    def memory_usage(self):
+        """估算占用的字节数; 与快照共用的 parent/next_sibling 不计入"""
+        size = 0
+        seen = set()
+        for postings in (self.by_tag, self.by_id, self.by_class, self.by_attr):
+            size += sys.getsizeof(postings)
+            for key, nodes in postings.items():
+                seen.add(id(nodes))
+                size += sys.getsizeof(key) + sys.getsizeof(nodes)
+        size += sys.getsizeof(self.terms)
+        for key, postings in self.terms.items():
+            size += sys.getsizeof(key) + sys.getsizeof(postings)
+            # 属性值的节点数组只被 terms 引用
+            size += sum(sys.getsizeof(nodes) for nodes in postings if id(nodes) not in seen)
+        for lazy in (self._prev_sibling, self._position, self._subtree_end):
+            if lazy is not None:
+                size += sys.getsizeof(lazy)
+        return size
+
+    @property
+    def prev_sibling(self):
+        """前一个兄弟节点, 首次用到时计算"""
+        if self._prev_sibling is None:
+            prev = array('i', [NONE]) * len(self.parent)
+            for node, following in enumerate(self.next_sibling):
+                if following != NONE:
+                    prev[following] = node
+            self._prev_sibling = prev
+        return self._prev_sibling
+
+    @property
+    def position(self):
+        """在兄弟节点中的序号, 从1开始"""
+        if self._position is None:
+            position = array('I', [1]) * len(self.parent)
+            # 节点按先序编号, 前一个兄弟总是排在前面
+            for node, prev in enumerate(self.prev_sibling):
+                if prev != NONE:
+                    position[node] = position[prev] + 1
+            self._position = position
+        return self._position
+
+    @property
+    def subtree_end(self):
+        """子树中最后一个节点的下标; 节点按先序编号, 子树占据 [node, subtree_end[node]] 区间"""
+        if self._subtree_end is None:
+            parent = self.parent
+            end = array('i', range(len(parent)))
+            for node in range(len(parent) - 1, 0, -1):
+                if end[node] > end[parent[node]]:
+                    end[parent[node]] = end[node]
+            self._subtree_end = end
+        return self._subtree_end
+
+    def search(self, text, token=None):
+        """按空白分词, 每个词匹配包含它的索引词, 返回同时匹配所有词的节点集合"""
+        result = None
+        for word in text.lower().split():
+            check(token)
+            matched = set()
+            for term, postings in self.terms.items():
+                if word in term:
+                    for nodes in postings:
+                        matched.update(nodes)
+            result = matched if result is None else result & matched
+            if not result:
+                return set()
+        return result or set()
+
+    def with_ancestors(self, nodes, token=None):
+        """加上所有祖先节点, 使匹配的元素在树中可见"""
+        check(token)
+        parent = self.parent
+        visible = set()
+        for node in nodes:
+            # 沿父链向上标记, 遇到已可见的节点即可停止
+            while node != ROOT and node not in visible:
+                visible.add(node)
+                node = parent[node]
+        return visible
+
+
+def _string_id(snapshot, value):
+    try:
+        return snapshot.strings.index(value)
+    except ValueError:
+        return None
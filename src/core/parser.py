@@ -1,43 +1,105 @@
-import requests
-from bs4 import BeautifulSoup
+from src.core.backends import BACKENDS, DEFAULT_BACKEND, parse_with_backend
+from src.core.doc_cache import get_document_cache
+from src.core.process_pool import get_process_parser
+from src.core.http_client import get_http_client
+from src.core.source import SNIFF_BYTES, SourceBuffer, ascii_compatible, sniff_encoding
+from src.core.timing import span
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+
+class IncrementalParser:
+    """边下载边解析: 数据分块推入 html.parser 分词器, 随时可以取得已解析部分的快照"""
+
+    def __init__(self, encoding=None):
+        self.declared = encoding
+        self.buffer = bytearray()
+        self.builder = None
+        self._deferred = False
+
+    @property
+    def bytes_received(self):
+        return len(self.buffer)
+
+    @property
+    def node_count(self):
+        return self.builder.node_count if self.builder else 0
+
+    def feed(self, chunk):
+        self.buffer.extend(chunk)
+        if self.builder is not None:
+            self.builder.feed(str(chunk, 'latin-1'))
+        elif not self._deferred and (self.declared or len(self.buffer) >= SNIFF_BYTES):
+            self._start()
+
+    def _start(self):
+        encoding = sniff_encoding(self.buffer, self.declared)
+        if not ascii_compatible(encoding):
+            # UTF-16/32 需要整体转码, 只能在接收完毕后解析
+            self._deferred = True
+            return
+        source = SourceBuffer(self.buffer, encoding)
+        self.builder = BACKENDS[DEFAULT_BACKEND].create_builder(source)
+        self.builder.feed(str(self.buffer, 'latin-1'))
+
+    def snapshot(self):
+        """返回目前已解析部分的快照, 尚未开始解析时返回 None"""
+        return self.builder.partial() if self.builder else None
+
+    def close(self):
+        if self._deferred:
+            return parse_with_backend(SourceBuffer(bytes(self.buffer), self.declared))
+        if self.builder is None:
+            self._start()
+            if self._deferred:
+                return self.close()
+        return self.builder.close()
+
 class HTMLParser:
-    def __init__(self):
-        self.soup = None
-        
+    def __init__(self, backend=DEFAULT_BACKEND, processes=False):
+        self.backend = backend
+        # 为真时在子进程中解析
+        self.processes = processes
+        self.snapshot = None
+
     def parse_url(self, url):
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            self.soup = BeautifulSoup(response.text, 'html.parser')
+            response = get_http_client().fetch(url)
+            self.parse_html(response.data, response.encoding)
             return True
         except Exception as e:
             logger.error(f"解析URL失败: {str(e)}")
             return False
-            
+
+    def parse_html(self, data, encoding=None, backend=None, token=None, timings=None):
+        """解析原始字节, 返回紧凑的DOM快照; token 被取消时抛出 ParseCancelled
+
+        内容相同的文档直接取自解析缓存. 传入 timings 时记录各阶段的耗时.
+        """
+        backend = backend or self.backend
+        with span(timings, 'decode'):
+            source = SourceBuffer(data, encoding)
+        cache = get_document_cache()
+        with span(timings, 'cache'):
+            key = cache.key(data, backend, encoding) if cache else None
+            snapshot = cache.get(key, source) if cache else None
+        if snapshot is None:
+            with span(timings, 'parse'):
+                if self.processes:
+                    snapshot = get_process_parser().parse(source, backend, token)
+                else:
+                    snapshot = parse_with_backend(source, backend, token)
+            if cache:
+                with span(timings, 'store'):
+                    cache.put(key, snapshot)
+        # 在调用线程中建好过滤用的索引, 不留到界面线程
+        with span(timings, 'index'):
+            snapshot.index
+        self.snapshot = snapshot
+        return snapshot
+
     def get_element_tree(self):
-        if not self.soup:
-            return None
-        return self._build_element_tree(self.soup)
-        
-    def _build_element_tree(self, element):
-        if element.name is None:
+        if not self.snapshot:
             return None
-            
-        node = {
-            'name': element.name,
-            'attrs': element.attrs,
-            'text': str(element),
-            'children': []
-        }
-        
-        for child in element.children:
-            if child.name is not None:
-                child_node = self._build_element_tree(child)
-                if child_node:
-                    node['children'].append(child_node)
-                    
-        return node
+        return self.snapshot.to_dict()
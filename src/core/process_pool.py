@@ -0,0 +1,70 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from src.core.backends import DEFAULT_BACKEND, parse_with_backend
+from src.core.cancel import check
+from src.core.snapshot import DocumentSnapshot
+from src.core.source import SourceBuffer
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _parse_in_worker(data, encoding, backend):
+    """在子进程中解析, 只把紧凑的树结构传回, 原始内容由父进程保留"""
+    return parse_with_backend(SourceBuffer(data, encoding), backend).to_bytes()
+
+
+class ProcessParser:
+    """多进程解析: 解析和建树在子进程中进行, 不受GIL限制, 吞吐量随CPU核数增长
+
+    子进程用 spawn 方式启动, 避免复制带有界面和事件循环线程的父进程.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def submit(self, data, encoding=None, backend=DEFAULT_BACKEND):
+        """提交解析, 返回结果为序列化快照的 Future"""
+        return self.pool.submit(_parse_in_worker, bytes(data), encoding, backend)
+
+    def parse(self, source, backend=DEFAULT_BACKEND, token=None):
+        """阻塞地在子进程中解析 SourceBuffer, 返回快照
+
+        子进程中的解析无法中途取消, 只在前后检查 token.
+        """
+        check(token)
+        payload = self.submit(source.data, source.encoding, backend).result()
+        check(token)
+        return DocumentSnapshot.from_bytes(payload, source)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+_parser = None
+_parser_lock = threading.Lock()
+
+
+def get_process_parser():
+    """返回进程内唯一的 ProcessParser, 子进程在第一次解析时才启动"""
+    global _parser
+    with _parser_lock:
+        if _parser is None:
+            _parser = ProcessParser()
+        return _parser
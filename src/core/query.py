@@ -0,0 +1,942 @@
+import html
+import re
+from bisect import bisect_right
+from functools import lru_cache
+
+from src.core.cancel import check
+from src.core.snapshot import NONE, ROOT
+
+# 查询模式: 子串过滤、CSS选择器、XPath
+MODES = ('text', 'css', 'xpath')
+# 编译结果缓存的查询数, 各标签页共用
+QUERY_CACHE_SIZE = 256
+# 每处理这么多节点检查一次取消标记
+CHECK_INTERVAL = 4096
+# 上下文节点超过这个数, 或索引候选不超过这个数时, child 轴改为从倒排索引出发
+INDEXED_CHILD_CONTEXTS = 64
+INDEXED_CHILD_CANDIDATES = 1024
+
+_MISSING = object()
+
+
+class QueryError(ValueError):
+    """查询语法错误或使用了不支持的语法"""
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_query(text, mode='css'):
+    """编译查询, 结果按 (text, mode) 缓存; 语法错误时抛出 QueryError"""
+    if mode == 'text':
+        return TextQuery(text)
+    if mode == 'css':
+        return CssQuery(text)
+    if mode == 'xpath':
+        return XPathQuery(text)
+    raise QueryError(f"未知的查询模式: {mode}")
+
+
+def select(snapshot, text, mode='css', token=None):
+    """返回匹配的元素下标, 按文档顺序排列"""
+    return compile_query(text, mode).select(snapshot, token)
+
+
+def _attr(snapshot, node, name):
+    """属性值; 没有值的布尔属性返回空串, 不存在时返回 None"""
+    value = snapshot.attr(node, name, _MISSING)
+    if value is _MISSING:
+        return None
+    return '' if value is None else value
+
+
+def _ranges(index, contexts, include_self):
+    """把上下文节点合并成互不重叠的子树区间"""
+    end = index.subtree_end
+    starts = []
+    ends = []
+    for node in sorted(contexts):
+        if ends and node <= ends[-1]:
+            continue
+        starts.append(node if include_self else node + 1)
+        ends.append(end[node])
+    return starts, ends
+
+
+def _in_ranges(node, starts, ends):
+    i = bisect_right(starts, node) - 1
+    return i >= 0 and node <= ends[i]
+
+
+class TextQuery:
+    """过滤框原有的子串匹配"""
+
+    def __init__(self, text):
+        self.text = text
+
+    def select(self, snapshot, token=None):
+        return sorted(snapshot.index.search(self.text, token))
+
+
+# ---------------------------------------------------------------- CSS
+
+_NAME = r'(?:[\w\-]|[^\x00-\x7f]|\\.)+'
+_CSS_TAG = re.compile(r'\*|' + _NAME)
+_CSS_ID = re.compile(r'#(' + _NAME + r')')
+_CSS_CLASS = re.compile(r'\.(' + _NAME + r')')
+_CSS_ATTR = re.compile(
+    r'\[\s*(' + _NAME + r')\s*(?:([~|^$*]?=)\s*(?:"([^"]*)"|\'([^\']*)\'|(' + _NAME + r'))\s*([iI])?\s*)?\]')
+_CSS_PSEUDO = re.compile(r':(' + _NAME + r')(?:\(\s*((?:[^()]|\([^()]*\))*?)\s*\))?')
+_CSS_COMBINATOR = re.compile(r'\s*([>+~])\s*|\s+')
+_NTH = re.compile(r'^([+-]?\d*)n\s*(?:([+-])\s*(\d+))?$')
+
+
+def _unescape(name):
+    return re.sub(r'\\(.)', r'\1', name)
+
+
+def _split_top(text, separator):
+    """按不在括号、方括号和引号内的分隔符切分"""
+    parts = []
+    depth = 0
+    quote = None
+    start = 0
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _parse_nth(arg):
+    arg = arg.strip().lower()
+    if arg == 'odd':
+        return 2, 1
+    if arg == 'even':
+        return 2, 0
+    if re.fullmatch(r'[+-]?\d+', arg):
+        return 0, int(arg)
+    match = _NTH.match(arg)
+    if not match:
+        raise QueryError(f"无法解析 nth-child 参数: {arg}")
+    a = match.group(1)
+    a = -1 if a == '-' else 1 if a in ('', '+') else int(a)
+    b = int(match.group(3) or 0)
+    return a, -b if match.group(2) == '-' else b
+
+
+class _Compound:
+    """一个简单选择器序列, 如 div.item[href]:first-child"""
+    __slots__ = ('tag', 'ids', 'classes', 'attrs', 'pseudos')
+
+    def __init__(self):
+        self.tag = None
+        self.ids = []
+        self.classes = []
+        self.attrs = []
+        self.pseudos = []
+
+    def candidates(self, index):
+        """从倒排索引中取最小的候选集合, 无可用索引时返回 None"""
+        postings = []
+        for value in self.ids:
+            postings.append(index.by_id.get(value, ()))
+        for value in self.classes:
+            postings.append(index.by_class.get(value, ()))
+        if self.tag is not None:
+            postings.append(index.by_tag.get(self.tag, ()))
+        for name, _, _, _ in self.attrs:
+            postings.append(index.by_attr.get(name, ()))
+        if not postings:
+            return None
+        return min(postings, key=len)
+
+    def match(self, snapshot, index, node):
+        if self.tag is not None and snapshot.name(node) != self.tag:
+            return False
+        for value in self.ids:
+            if _attr(snapshot, node, 'id') != value:
+                return False
+        if self.classes:
+            tokens = (_attr(snapshot, node, 'class') or '').split()
+            for value in self.classes:
+                if value not in tokens:
+                    return False
+        for name, op, value, ignore_case in self.attrs:
+            actual = _attr(snapshot, node, name)
+            if actual is None:
+                return False
+            if op is None:
+                continue
+            if ignore_case:
+                actual = actual.lower()
+            if not _match_attr(op, actual, value):
+                return False
+        for name, arg in self.pseudos:
+            if not _match_pseudo(snapshot, index, node, name, arg):
+                return False
+        return True
+
+
+def _match_attr(op, actual, value):
+    if op == '=':
+        return actual == value
+    if op == '~=':
+        return value in actual.split()
+    if op == '|=':
+        return actual == value or actual.startswith(value + '-')
+    if not value:
+        # ^= $= *= 的值为空时不匹配任何元素
+        return False
+    if op == '^=':
+        return actual.startswith(value)
+    if op == '$=':
+        return actual.endswith(value)
+    return value in actual
+
+
+def _match_pseudo(snapshot, index, node, name, arg):
+    if name == 'first-child':
+        return index.prev_sibling[node] == NONE
+    if name == 'last-child':
+        return snapshot.next_sibling[node] == NONE
+    if name == 'only-child':
+        return index.prev_sibling[node] == NONE and snapshot.next_sibling[node] == NONE
+    if name == 'nth-child':
+        a, b = arg
+        position = index.position[node]
+        if a == 0:
+            return position == b
+        n, remainder = divmod(position - b, a)
+        return remainder == 0 and n >= 0
+    if name == 'root':
+        return snapshot.parent[node] == ROOT
+    if name == 'not':
+        return not any(compound.match(snapshot, index, node) for compound in arg)
+    return False
+
+
+_PSEUDOS = ('first-child', 'last-child', 'only-child', 'nth-child', 'root', 'not')
+
+
+def _parse_compound(text, pos):
+    compound = _Compound()
+    match = _CSS_TAG.match(text, pos)
+    if match:
+        if match.group() != '*':
+            compound.tag = _unescape(match.group()).lower()
+        pos = match.end()
+    while pos < len(text):
+        match = _CSS_ID.match(text, pos)
+        if match:
+            compound.ids.append(_unescape(match.group(1)))
+            pos = match.end()
+            continue
+        match = _CSS_CLASS.match(text, pos)
+        if match:
+            compound.classes.append(_unescape(match.group(1)))
+            pos = match.end()
+            continue
+        match = _CSS_ATTR.match(text, pos)
+        if match:
+            name, op, double, single, bare, flag = match.groups()
+            value = next((v for v in (double, single, bare) if v is not None), None)
+            if bare is not None:
+                value = _unescape(value)
+            if flag and value is not None:
+                value = value.lower()
+            compound.attrs.append((_unescape(name).lower(), op, value, bool(flag)))
+            pos = match.end()
+            continue
+        match = _CSS_PSEUDO.match(text, pos)
+        if match:
+            name = match.group(1).lower()
+            arg = match.group(2)
+            if name == 'empty':
+                # 快照不记录文本节点, 无法区分没有子元素和没有内容
+                raise QueryError("不支持 :empty, 快照中没有文本内容")
+            if name not in _PSEUDOS:
+                raise QueryError(f"不支持的伪类: :{name}")
+            if name == 'nth-child':
+                arg = _parse_nth(arg or '')
+            elif name == 'not':
+                arg = [_parse_single_compound(part) for part in _split_top(arg or '', ',')]
+            compound.pseudos.append((name, arg))
+            pos = match.end()
+            continue
+        break
+    return compound, pos
+
+
+def _parse_single_compound(text):
+    text = text.strip()
+    compound, pos = _parse_compound(text, 0)
+    if pos != len(text) or not text:
+        raise QueryError(f"无法解析选择器: {text}")
+    return compound
+
+
+class _ComplexSelector:
+    """由组合符连接的简单选择器序列, 从右向左匹配"""
+
+    def __init__(self, text):
+        text = text.strip()
+        if not text:
+            raise QueryError("选择器为空")
+        self.compounds = []
+        self.combinators = []
+        pos = 0
+        while True:
+            compound, end = _parse_compound(text, pos)
+            if end == pos:
+                raise QueryError(f"无法解析选择器: {text}")
+            self.compounds.append(compound)
+            pos = end
+            if pos >= len(text):
+                break
+            match = _CSS_COMBINATOR.match(text, pos)
+            if not match:
+                raise QueryError(f"无法解析选择器: {text[pos:]}")
+            self.combinators.append(match.group(1) or ' ')
+            pos = match.end()
+
+    def select(self, snapshot, index, token):
+        last = self.compounds[-1]
+        candidates = last.candidates(index)
+        if candidates is None:
+            candidates = range(1, len(snapshot))
+        result = []
+        for i, node in enumerate(candidates):
+            if i % CHECK_INTERVAL == 0:
+                check(token)
+            if last.match(snapshot, index, node) and self._match_left(snapshot, index, node, len(self.compounds) - 1):
+                result.append(node)
+        return result
+
+    def _match_left(self, snapshot, index, node, i):
+        """compounds[i] 已匹配 node, 检查它左边的部分"""
+        if i == 0:
+            return True
+        compound = self.compounds[i - 1]
+        combinator = self.combinators[i - 1]
+        parent = snapshot.parent
+        if combinator in '> ':
+            other = parent[node]
+            while other > ROOT:
+                if compound.match(snapshot, index, other) and self._match_left(snapshot, index, other, i - 1):
+                    return True
+                if combinator == '>':
+                    return False
+                other = parent[other]
+            return False
+        prev_sibling = index.prev_sibling
+        other = prev_sibling[node]
+        while other != NONE:
+            if compound.match(snapshot, index, other) and self._match_left(snapshot, index, other, i - 1):
+                return True
+            if combinator == '+':
+                return False
+            other = prev_sibling[other]
+        return False
+
+
+class CssQuery:
+    """CSS选择器, 支持类型、#id、.class、属性选择器、常用结构伪类、:not() 以及四种组合符"""
+
+    def __init__(self, text):
+        self.text = text
+        self.selectors = [_ComplexSelector(part) for part in _split_top(text, ',')]
+
+    def select(self, snapshot, token=None):
+        index = snapshot.index
+        if len(self.selectors) == 1:
+            return self.selectors[0].select(snapshot, index, token)
+        result = set()
+        for selector in self.selectors:
+            result.update(selector.select(snapshot, index, token))
+        return sorted(result)
+
+
+# ---------------------------------------------------------------- XPath
+
+_XPATH_TOKEN = re.compile(r'''\s*(?:
+    (?P<str>"[^"]*"|'[^']*')
+  | (?P<num>\d+(?:\.\d+)?)
+  | (?P<op>//|::|!=|<=|>=|\.\.|[/\[\]()@,|=<>.*])
+  | (?P<name>[A-Za-z_][\w\-]*)
+)''', re.VERBOSE)
+_AXES = ('child', 'descendant', 'descendant-or-self', 'self', 'parent', 'ancestor',
+         'ancestor-or-self', 'following-sibling', 'preceding-sibling', 'following', 'preceding')
+_FUNCTIONS = {'contains': 2, 'starts-with': 2, 'ends-with': 2, 'not': 1, 'position': 0, 'last': 0,
+              'count': 1, 'normalize-space': (0, 1), 'name': 0, 'local-name': 0, 'string-length': (0, 1),
+              'string': (0, 1), 'text': 0}
+_NUMERIC_FUNCTIONS = ('position', 'last', 'count', 'string-length')
+_TAG_PATTERN = re.compile(r'<[^>]*>')
+# 任意节点, 对应 node()
+_ANY = object()
+
+
+def _tokenize_xpath(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _XPATH_TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise QueryError(f"无法解析XPath: {text[pos:]}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        pos = match.end()
+    return tokens
+
+
+class _Step:
+    __slots__ = ('axis', 'test', 'predicates', 'positional')
+
+    def __init__(self, axis, test, predicates=()):
+        self.axis = axis
+        # None 表示任意元素, _ANY 表示任意节点(含文档根)
+        self.test = test
+        self.predicates = list(predicates)
+        self.positional = any(_uses_position(p) for p in self.predicates)
+
+
+def _numeric(expr):
+    return expr[0] == 'num' or (expr[0] == 'call' and expr[1] in _NUMERIC_FUNCTIONS)
+
+
+def _uses_position(expr, top=True):
+    """谓词是否依赖节点位置: 值为数字(即 [n]), 或用到了 position()/last()"""
+    if top and _numeric(expr):
+        return True
+    kind = expr[0]
+    if kind == 'call' and expr[1] in ('position', 'last'):
+        return True
+    if kind in ('or', 'and', 'cmp', 'call'):
+        return any(_uses_position(e, False) for e in expr[2:])
+    return False
+
+
+class _XPathParser:
+    def __init__(self, text):
+        self.tokens = _tokenize_xpath(text)
+        self.pos = 0
+
+    def peek(self, offset=0):
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        token = self.peek()
+        if token[0] is None or (value is not None and token[1] != value):
+            raise QueryError(f"XPath语法错误: 期望 {value or '更多内容'}")
+        self.pos += 1
+        return token
+
+    def at(self, value):
+        token = self.peek()
+        return token[0] == 'op' and token[1] == value
+
+    def parse(self):
+        paths = [self.parse_path()]
+        while self.at('|'):
+            self.take('|')
+            paths.append(self.parse_path())
+        if self.peek()[0] is not None:
+            raise QueryError(f"XPath语法错误: 多余的 {self.peek()[1]}")
+        return paths
+
+    def parse_path(self):
+        """返回 (是否从根开始, 步骤列表)"""
+        steps = []
+        absolute = False
+        if self.at('/'):
+            self.take()
+            absolute = True
+            if not self._starts_step():
+                return True, steps
+        elif self.at('//'):
+            self.take()
+            absolute = True
+            steps.append(_Step('descendant-or-self', _ANY))
+        steps.append(self.parse_step())
+        while self.at('/') or self.at('//'):
+            if self.take()[1] == '//':
+                steps.append(_Step('descendant-or-self', _ANY))
+            steps.append(self.parse_step())
+        return absolute, _optimize(steps)
+
+    def _starts_step(self):
+        kind, value = self.peek()
+        return kind == 'name' or (kind == 'op' and value in ('.', '..', '*', '@'))
+
+    def parse_step(self):
+        if self.at('.'):
+            self.take()
+            return _Step('self', _ANY)
+        if self.at('..'):
+            self.take()
+            return _Step('parent', _ANY)
+        if self.at('@'):
+            raise QueryError("只能选择元素, 属性请写在谓词中, 如 //a[@href]")
+        axis = 'child'
+        if self.peek()[0] == 'name' and self.peek(1) == ('op', '::'):
+            axis = self.take()[1]
+            self.take('::')
+            if axis not in _AXES:
+                raise QueryError(f"不支持的轴: {axis}")
+        if self.at('*'):
+            self.take()
+            test = None
+        else:
+            name = self.take()[1]
+            if self.at('('):
+                if name != 'node':
+                    raise QueryError(f"不支持的节点测试: {name}()")
+                self.take('(')
+                self.take(')')
+                test = _ANY
+            else:
+                test = name.lower()
+        predicates = []
+        while self.at('['):
+            self.take('[')
+            predicates.append(self.parse_or())
+            self.take(']')
+        return _Step(axis, test, predicates)
+
+    def parse_or(self):
+        expr = self.parse_and()
+        while self.peek() == ('name', 'or'):
+            self.take()
+            expr = ('or', None, expr, self.parse_and())
+        return expr
+
+    def parse_and(self):
+        expr = self.parse_compare()
+        while self.peek() == ('name', 'and'):
+            self.take()
+            expr = ('and', None, expr, self.parse_compare())
+        return expr
+
+    def parse_compare(self):
+        expr = self.parse_primary()
+        kind, value = self.peek()
+        if kind == 'op' and value in ('=', '!=', '<', '>', '<=', '>='):
+            self.take()
+            expr = ('cmp', value, expr, self.parse_primary())
+        return expr
+
+    def parse_primary(self):
+        kind, value = self.peek()
+        if kind == 'str':
+            self.take()
+            return ('str', value[1:-1])
+        if kind == 'num':
+            self.take()
+            return ('num', float(value))
+        if kind == 'op' and value == '@':
+            self.take()
+            return ('attr', self.take()[1].lower())
+        if kind == 'op' and value == '(':
+            self.take()
+            expr = self.parse_or()
+            self.take(')')
+            return expr
+        if kind == 'name' and self.peek(1) == ('op', '(') and value != 'node':
+            return self.parse_call()
+        if self._starts_step() or self.at('/') or self.at('//'):
+            return ('path',) + self.parse_path()
+        if kind is None:
+            raise QueryError("XPath语法错误: 表达式不完整")
+        raise QueryError(f"XPath语法错误: {value}")
+
+    def parse_call(self):
+        name = self.take()[1]
+        if name not in _FUNCTIONS:
+            raise QueryError(f"不支持的函数: {name}()")
+        self.take('(')
+        args = []
+        if not self.at(')'):
+            args.append(self.parse_or())
+            while self.at(','):
+                self.take()
+                args.append(self.parse_or())
+        self.take(')')
+        arity = _FUNCTIONS[name]
+        allowed = arity if isinstance(arity, tuple) else (arity,)
+        if len(args) not in allowed:
+            raise QueryError(f"{name}() 的参数个数不对")
+        return ('call', name) + tuple(args)
+
+
+def _optimize(steps):
+    """把 //name 展开后的 descendant-or-self::node()/child::name 合并为 descendant::name"""
+    result = []
+    for step in steps:
+        previous = result[-1] if result else None
+        if (previous is not None and previous.axis == 'descendant-or-self' and previous.test is _ANY
+                and not previous.predicates and step.axis == 'child' and not step.positional):
+            result[-1] = _Step('descendant', step.test, step.predicates)
+        else:
+            result.append(step)
+    return result
+
+
+class _XPathContext:
+    __slots__ = ('snapshot', 'index', 'token', '_texts')
+
+    def __init__(self, snapshot, token):
+        self.snapshot = snapshot
+        self.index = snapshot.index
+        self.token = token
+        self._texts = {}
+
+    def text(self, node):
+        """元素的文本内容(近似: 去掉标签后反转义)"""
+        text = self._texts.get(node)
+        if text is None:
+            if node == ROOT:
+                text = ''
+            else:
+                text = html.unescape(_TAG_PATTERN.sub('', self.snapshot.outer_html(node)))
+            self._texts[node] = text
+        return text
+
+    def test(self, step, node):
+        if step.test is _ANY:
+            return True
+        if node == ROOT:
+            return False
+        return step.test is None or self.snapshot.name(node) == step.test
+
+    def axis(self, axis, node):
+        """按轴的方向(反向轴由近及远)返回节点"""
+        snapshot = self.snapshot
+        index = self.index
+        parent = snapshot.parent
+        if axis == 'child':
+            return list(snapshot.children(node))
+        if axis == 'descendant':
+            return range(node + 1, index.subtree_end[node] + 1)
+        if axis == 'descendant-or-self':
+            return range(node, index.subtree_end[node] + 1)
+        if axis == 'self':
+            return [node]
+        if axis == 'parent':
+            return [parent[node]] if parent[node] != NONE else []
+        if axis in ('ancestor', 'ancestor-or-self'):
+            nodes = [node] if axis == 'ancestor-or-self' else []
+            other = parent[node]
+            while other != NONE:
+                nodes.append(other)
+                other = parent[other]
+            return nodes
+        if axis in ('following-sibling', 'preceding-sibling'):
+            siblings = snapshot.next_sibling if axis == 'following-sibling' else index.prev_sibling
+            nodes = []
+            other = siblings[node]
+            while other != NONE:
+                nodes.append(other)
+                other = siblings[other]
+            return nodes
+        end = index.subtree_end
+        if axis == 'following':
+            return range(end[node] + 1, len(snapshot))
+        # preceding: 排在前面且不是祖先(子树在 node 之前结束)的节点, 逐个产生, 不先建列表
+        return (other for other in range(node - 1, 0, -1) if end[other] < node)
+
+    def step(self, contexts, step):
+        if step.test is not _ANY:
+            if step.axis in ('descendant', 'descendant-or-self') and not step.positional:
+                return self._indexed_step(contexts, step)
+            if step.axis == 'child':
+                candidates = self._candidates(step)
+                if len(contexts) > INDEXED_CHILD_CONTEXTS or (
+                        candidates is not None and len(candidates) <= INDEXED_CHILD_CANDIDATES):
+                    return self._indexed_children(contexts, step, candidates)
+        if step.axis in ('following', 'preceding') and not step.positional:
+            return self._ordered_step(contexts, step)
+        if step.axis == 'descendant-or-self' and not step.predicates:
+            starts, ends = _ranges(self.index, contexts, True)
+            return [node for start, end in zip(starts, ends) for node in range(start, end + 1)]
+        results = set()
+        # 一个上下文的轴就可能有整个文档那么多节点, 按遍历的节点数检查取消
+        count = 0
+        for node in contexts:
+            nodes = []
+            for other in self.axis(step.axis, node):
+                count += 1
+                if count % CHECK_INTERVAL == 0:
+                    check(self.token)
+                if self.test(step, other):
+                    nodes.append(other)
+            results.update(self._filter(nodes, step.predicates))
+        return sorted(results)
+
+    def _ordered_step(self, contexts, step):
+        """与位置无关的 following/preceding: 所有上下文的结果合起来由一个边界决定, 每个节点只看一次
+
+        following 的并集是最早结束的上下文子树之后的全部节点; preceding 的并集是
+        子树在最后一个上下文之前结束的节点.
+        """
+        end = self.index.subtree_end
+        if step.axis == 'following':
+            low, high = min(end[node] for node in contexts) + 1, len(self.snapshot)
+        else:
+            low, high = 1, max(contexts)
+        candidates = self._candidates(step)
+        if candidates is None:
+            candidates = range(low, high)
+        results = []
+        for i, node in enumerate(candidates):
+            if i % CHECK_INTERVAL == 0:
+                check(self.token)
+            if node < low or node >= high or (step.axis == 'preceding' and end[node] >= high):
+                continue
+            if not self.test(step, node):
+                continue
+            if all(self.truth(predicate, node, 0, 0) for predicate in step.predicates):
+                results.append(node)
+        return results
+
+    def _filter(self, nodes, predicates):
+        for predicate in predicates:
+            size = len(nodes)
+            nodes = [other for position, other in enumerate(nodes, 1)
+                     if self.truth(predicate, other, position, size)]
+        return nodes
+
+    def _candidates(self, step):
+        """从倒排索引中取最小的候选集合, 没有可用条件时返回 None
+
+        只使用第一个位置谓词之前的条件, 以免改变位置谓词看到的节点.
+        """
+        index = self.index
+        postings = []
+        if step.test is not None:
+            postings.append(index.by_tag.get(step.test, ()))
+        for predicate in step.predicates:
+            if _uses_position(predicate):
+                break
+            self._hints(predicate, postings)
+        return min(postings, key=len) if postings else None
+
+    def _hints(self, expr, postings):
+        index = self.index
+        kind = expr[0]
+        if kind == 'and':
+            self._hints(expr[2], postings)
+            self._hints(expr[3], postings)
+        elif kind == 'attr':
+            postings.append(index.by_attr.get(expr[1], ()))
+        elif kind == 'cmp' and expr[1] == '=':
+            left, right = expr[2], expr[3]
+            if right[0] == 'attr':
+                left, right = right, left
+            if left[0] != 'attr' or right[0] != 'str':
+                return
+            name, value = left[1], right[1]
+            if name == 'id':
+                postings.append(index.by_id.get(value, ()))
+            elif name == 'class' and value.split():
+                postings.append(index.by_class.get(value.split()[0], ()))
+            else:
+                postings.append(index.by_attr.get(name, ()))
+
+    def _indexed_step(self, contexts, step):
+        """用倒排索引取候选节点, 再按子树区间筛掉不在上下文之下的"""
+        starts, ends = _ranges(self.index, contexts, step.axis == 'descendant-or-self')
+        candidates = self._candidates(step)
+        if candidates is None:
+            candidates = (node for start, end in zip(starts, ends) for node in range(max(start, 1), end + 1))
+            whole = True
+        else:
+            whole = contexts[0] == ROOT
+        results = []
+        for i, node in enumerate(candidates):
+            if i % CHECK_INTERVAL == 0:
+                check(self.token)
+            if not whole and not _in_ranges(node, starts, ends):
+                continue
+            # 候选可能来自 id/class/属性的倒排表, 标签名需要另外检查
+            if not self.test(step, node):
+                continue
+            if all(self.truth(predicate, node, 0, 0) for predicate in step.predicates):
+                results.append(node)
+        return results
+
+    def _indexed_children(self, contexts, step, candidates):
+        """从候选节点出发按父节点分组, 代替逐个遍历上下文的子节点"""
+        if candidates is None:
+            candidates = range(1, len(self.snapshot))
+        parent = self.snapshot.parent
+        wanted = set(contexts)
+        groups = {}
+        for i, node in enumerate(candidates):
+            if i % CHECK_INTERVAL == 0:
+                check(self.token)
+            if parent[node] in wanted and self.test(step, node):
+                groups.setdefault(parent[node], []).append(node)
+        results = []
+        for nodes in groups.values():
+            results.extend(self._filter(nodes, step.predicates))
+        return sorted(results)
+
+    def path(self, absolute, steps, node):
+        nodes = [ROOT if absolute else node]
+        for step in steps:
+            nodes = self.step(nodes, step)
+            if not nodes:
+                break
+        return nodes
+
+    def truth(self, expr, node, position, size):
+        value = self.evaluate(expr, node, position, size)
+        if _numeric(expr):
+            return value == position
+        return _boolean(value)
+
+    def evaluate(self, expr, node, position, size):
+        kind = expr[0]
+        if kind == 'str':
+            return expr[1]
+        if kind == 'num':
+            return expr[1]
+        if kind == 'attr':
+            value = _attr(self.snapshot, node, expr[1])
+            return [] if value is None else [value]
+        if kind == 'path':
+            return _Nodes(self, self.path(expr[1], expr[2], node))
+        if kind == 'or':
+            return (_boolean(self.evaluate(expr[2], node, position, size))
+                    or _boolean(self.evaluate(expr[3], node, position, size)))
+        if kind == 'and':
+            return (_boolean(self.evaluate(expr[2], node, position, size))
+                    and _boolean(self.evaluate(expr[3], node, position, size)))
+        if kind == 'cmp':
+            return _compare(expr[1], self.evaluate(expr[2], node, position, size),
+                            self.evaluate(expr[3], node, position, size))
+        return self.call(expr[1], expr[2:], node, position, size)
+
+    def call(self, name, args, node, position, size):
+        values = [self.evaluate(arg, node, position, size) for arg in args]
+        if name == 'position':
+            return float(position)
+        if name == 'last':
+            return float(size)
+        if name == 'not':
+            return not _boolean(values[0])
+        if name == 'count':
+            return float(len(values[0])) if isinstance(values[0], list) else 0.0
+        if name in ('name', 'local-name'):
+            return '' if node == ROOT else self.snapshot.name(node)
+        strings = [_string(value) for value in values] if values else [self.text(node)]
+        if name == 'contains':
+            return strings[1] in strings[0]
+        if name == 'starts-with':
+            return strings[0].startswith(strings[1])
+        if name == 'ends-with':
+            return strings[0].endswith(strings[1])
+        if name == 'normalize-space':
+            return ' '.join(strings[0].split())
+        if name == 'string-length':
+            return float(len(strings[0]))
+        # string() 与 text()
+        return strings[0]
+
+
+class _Nodes(list):
+    """谓词中路径表达式的结果, 需要比较时才取元素文本"""
+
+    def __init__(self, context, nodes):
+        super().__init__(nodes)
+        self.context = context
+
+    def strings(self):
+        return [self.context.text(node) for node in self]
+
+
+def _string(value):
+    if isinstance(value, _Nodes):
+        value = value.strings()
+    if isinstance(value, list):
+        return value[0] if value else ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else str(value)
+    return value
+
+
+def _boolean(value):
+    if isinstance(value, (list, str)):
+        return len(value) > 0
+    return bool(value)
+
+
+def _compare(op, left, right):
+    # 节点集合与其他值比较时, 任一成员满足即为真
+    lefts = _members(left)
+    rights = _members(right)
+    for a in lefts:
+        for b in rights:
+            if _compare_values(op, a, b):
+                return True
+    return False
+
+
+def _members(value):
+    if isinstance(value, _Nodes):
+        return value.strings()
+    return value if isinstance(value, list) else [value]
+
+
+def _compare_values(op, a, b):
+    if isinstance(a, bool) or isinstance(b, bool):
+        a, b = _boolean(a), _boolean(b)
+    elif op in ('<', '>', '<=', '>=') or isinstance(a, float) or isinstance(b, float):
+        try:
+            a, b = float(a), float(b)
+        except ValueError:
+            return False
+    if op == '=':
+        return a == b
+    if op == '!=':
+        return a != b
+    if op == '<':
+        return a < b
+    if op == '>':
+        return a > b
+    if op == '<=':
+        return a <= b
+    return a >= b
+
+
+class XPathQuery:
+    """XPath 1.0 的常用子集: 各种轴、名称测试、谓词、常用函数和 | 合并, 只返回元素
+
+    文本相关的函数基于去掉标签后的元素内容.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        if not text.strip():
+            raise QueryError("XPath为空")
+        self.paths = _XPathParser(text).parse()
+
+    def select(self, snapshot, token=None):
+        context = _XPathContext(snapshot, token)
+        result = set()
+        for absolute, steps in self.paths:
+            result.update(context.path(absolute, steps, ROOT))
+        result.discard(ROOT)
+        return sorted(result)
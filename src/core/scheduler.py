@@ -0,0 +1,326 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.backends import BACKENDS, DEFAULT_BACKEND, FEED_SIZE
+from src.core.cancel import CancelToken, ParseCancelled, check
+from src.core.doc_cache import get_document_cache
+from src.core.http_client import CHUNK_SIZE, get_http_client
+from src.core.parser import HTMLParser, IncrementalParser
+from src.core.source import SourceBuffer, charset_from_content_type, map_file, unmap
+from src.core.timing import StageTimings, span
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 同时进行的解析任务数
+MAX_CONCURRENCY = 4
+# 执行解析等CPU密集步骤的线程数
+PARSE_WORKERS = 2
+# 执行过滤等短小查询的线程数
+QUERY_WORKERS = 1
+# 流式解析时推送部分结果的最小间隔(秒)
+PARTIAL_INTERVAL = 0.3
+
+
+def _feed_next(builder, chunks):
+    """推入下一块数据, 已经读完时返回 False"""
+    chunk = next(chunks, None)
+    if chunk is None:
+        return False
+    builder.feed(chunk)
+    return True
+
+
+def _feed_hashed(parser, digest, chunk):
+    """推入一块数据, 同时更新内容哈希"""
+    if digest is not None:
+        digest.update(chunk)
+    parser.feed(chunk)
+
+
+class ParseJob:
+    """一次解析任务, url 为本地路径时 local 为真
+
+    回调都在后台事件循环线程中调用, 界面层需要自行转发到界面线程.
+    任务被取消后不会再调用任何回调. 各阶段的耗时记录在 timings 中.
+    """
+
+    def __init__(self, url, owner=None, backend=DEFAULT_BACKEND, streaming=True, processes=False, local=False,
+                 on_progress=None, on_partial=None, on_finished=None, on_error=None):
+        self.url = url
+        self.local = local
+        self.owner = owner
+        self.backend = backend
+        self.processes = processes
+        # 只有 html.parser 支持推送式解析, 且推送式解析只能在本进程中进行
+        self.streaming = streaming and backend == DEFAULT_BACKEND and not processes
+        self.on_progress = on_progress
+        self.on_partial = on_partial
+        self.on_finished = on_finished
+        self.on_error = on_error
+        self.token = CancelToken()
+        self.task = None
+        self.timings = StageTimings(url)
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+    def _call(self, callback, *args):
+        if callback is not None and not self.token.cancelled:
+            callback(*args)
+
+    def report_progress(self, received, nodes):
+        self.timings.set_size(received, nodes)
+        self._call(self.on_progress, received, nodes)
+
+    def report_partial(self, snapshot):
+        self._call(self.on_partial, snapshot)
+
+    def finish(self, snapshot):
+        self.timings.finish()
+        self._call(self.on_finished, snapshot)
+
+    def fail(self, message):
+        self._call(self.on_error, message)
+
+
+class ParseScheduler:
+    """所有标签页共用的解析调度器
+
+    任务在 HttpClient 的后台事件循环中运行, 同时运行的任务数有上限,
+    排队时优先执行当前可见标签页提交的任务; 解析等CPU密集的步骤放到
+    一个小线程池里, 不会阻塞网络读取.
+    """
+
+    def __init__(self, client=None, max_concurrency=MAX_CONCURRENCY, parse_workers=PARSE_WORKERS):
+        self.client = client or get_http_client()
+        self.max_concurrency = max_concurrency
+        self.executor = ThreadPoolExecutor(max_workers=parse_workers, thread_name_prefix='parse')
+        # 查询使用单独的线程, 不会排在耗时的解析后面
+        self.query_executor = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix='query')
+        self._pending = []
+        self._running = 0
+        self._active_owner = None
+
+    @property
+    def loop(self):
+        return self.client.loop
+
+    def submit(self, job):
+        """提交任务, 可以在任意线程调用"""
+        self.loop.call_soon_threadsafe(self._enqueue, job)
+        return job
+
+    def run_query(self, func, *args):
+        """在查询线程中执行 func, 返回 concurrent.futures.Future"""
+        return self.query_executor.submit(func, *args)
+
+    def run_parse(self, func, *args):
+        """在解析线程池中执行其他CPU密集的 func(如压缩休眠标签页的文档), 返回 concurrent.futures.Future"""
+        return self.executor.submit(func, *args)
+
+    def set_active_owner(self, owner):
+        """设置当前可见的标签页, 它的任务排在队首"""
+        # 只在事件循环中读取, 直接赋值即可, 不必为此启动事件循环线程
+        self._active_owner = owner
+
+    def cancel(self, job):
+        """取消任务: 排队中的直接移除, 运行中的中断下载并在下一个阶段边界停止"""
+        job.token.cancel()
+        self.loop.call_soon_threadsafe(self._cancel, job)
+
+    def _cancel(self, job):
+        if job in self._pending:
+            self._pending.remove(job)
+        elif job.task is not None:
+            job.task.cancel()
+
+    def _enqueue(self, job):
+        self._pending.append(job)
+        self._dispatch()
+
+    def _next_job(self):
+        for i, job in enumerate(self._pending):
+            if self._active_owner is not None and job.owner is self._active_owner:
+                return self._pending.pop(i)
+        return self._pending.pop(0)
+
+    def _dispatch(self):
+        while self._pending and self._running < self.max_concurrency:
+            job = self._next_job()
+            if job.cancelled:
+                continue
+            self._running += 1
+            job.timings.add('queue', time.perf_counter() - job.timings.created)
+            job.task = self.loop.create_task(self._run(job))
+
+    async def _run(self, job):
+        try:
+            snapshot = await self._fetch_and_parse(job)
+            job.finish(snapshot)
+        except (ParseCancelled, asyncio.CancelledError):
+            logger.info(f"解析任务已取消: {job.url}")
+        except Exception as e:
+            job.fail(str(e))
+        finally:
+            job.task = None
+            self._running -= 1
+            self._dispatch()
+
+    async def _in_executor(self, func, *args):
+        return await self.loop.run_in_executor(self.executor, func, *args)
+
+    async def _fetch_and_parse(self, job):
+        if job.local:
+            return await self._parse_file(job)
+        async with self.client.request(job.url, job.timings) as response:
+            encoding = charset_from_content_type(response.headers.get('Content-Type'))
+            # 来自响应缓存的内容很可能已有解析结果, 整体读取后先查解析缓存
+            if job.streaming and not response.from_cache:
+                return await self._read_stream(job, response, encoding)
+            with job.timings.span('download'):
+                data = await response.read()
+        check(job.token)
+        return await self._parse_whole(job, data, encoding)
+
+    async def _parse_whole(self, job, data, encoding):
+        parser = HTMLParser(job.backend, job.processes)
+        if job.processes:
+            # 等待子进程的线程几乎不占CPU, 放到事件循环的默认线程池, 不占用解析线程
+            snapshot = await self.loop.run_in_executor(
+                None, parser.parse_html, data, encoding, None, job.token, job.timings)
+        else:
+            snapshot = await self._in_executor(parser.parse_html, data, encoding, None, job.token, job.timings)
+        check(job.token)
+        job.report_progress(len(data), len(snapshot))
+        return snapshot
+
+    async def _read_stream(self, job, response, encoding):
+        """分块读取响应并推入增量解析器, 期间定期报告进度和部分快照
+
+        响应缓存过期但内容没有变化时, 按边下载边计算的内容哈希从解析缓存取得结果, 不再生成最终快照.
+        """
+        parser = IncrementalParser(encoding)
+        cache = get_document_cache()
+        digest = cache.hasher() if cache else None
+        timings = job.timings
+        last_partial = time.monotonic()
+        waiting = time.perf_counter()
+        async for chunk in response.iter_chunks(CHUNK_SIZE):
+            timings.add('download', time.perf_counter() - waiting)
+            check(job.token)
+            with timings.span('parse'):
+                await self._in_executor(_feed_hashed, parser, digest, chunk)
+            job.report_progress(parser.bytes_received, parser.node_count)
+            now = time.monotonic()
+            if now - last_partial >= PARTIAL_INTERVAL:
+                with timings.span('partial'):
+                    snapshot = await self._in_executor(parser.snapshot)
+                if snapshot is not None:
+                    job.report_partial(snapshot)
+                last_partial = now
+            waiting = time.perf_counter()
+        check(job.token)
+        key = cache.finish_key(digest, job.backend, encoding) if cache else None
+        if cache:
+            with timings.span('cache'):
+                source = SourceBuffer(parser.buffer, encoding)
+                snapshot = await self._in_executor(cache.get, key, source)
+            if snapshot is not None:
+                job.report_progress(parser.bytes_received, len(snapshot))
+                return snapshot
+        with timings.span('parse'):
+            snapshot = await self._in_executor(parser.close)
+        check(job.token)
+        job.report_progress(parser.bytes_received, len(snapshot))
+        await self._in_executor(self._store, key, snapshot, timings)
+        return snapshot
+
+    async def _parse_file(self, job):
+        """本地文件按内存映射读取, 分块解析并报告进度, 解析期间不把整个文件读进内存"""
+        timings = job.timings
+        with timings.span('read'):
+            data = await self._in_executor(map_file, job.url)
+        source = snapshot = None
+        try:
+            check(job.token)
+            if job.streaming:
+                with timings.span('decode'):
+                    source = SourceBuffer(data)
+                snapshot = await self._parse_source(job, source)
+            else:
+                snapshot = await self._parse_whole(job, data, None)
+            # 快照(包括缓存中的同一个快照)改为读取复制出的内容, 不再依赖磁盘上的文件
+            with timings.span('detach'):
+                await self._in_executor(snapshot.source.detach)
+            return snapshot
+        finally:
+            if snapshot is None and source is not None:
+                # 失败或取消时, 已推送到界面的部分结果也不能再引用映射
+                source.detach()
+            unmap(data)
+
+    async def _parse_source(self, job, source):
+        timings = job.timings
+        data = source.data
+        cache = get_document_cache()
+        with timings.span('cache'):
+            key = await self._in_executor(self._cache_key, data, job.backend, None)
+            snapshot = await self._in_executor(cache.get, key, source) if cache else None
+        if snapshot is not None:
+            job.report_progress(len(source), len(snapshot))
+            return snapshot
+        builder = BACKENDS[DEFAULT_BACKEND].create_builder(source)
+        chunks = source.parse_chunks(FEED_SIZE)
+        fed = 0
+        last_partial = time.monotonic()
+        while True:
+            with timings.span('parse'):
+                if not await self._in_executor(_feed_next, builder, chunks):
+                    break
+            check(job.token)
+            fed = min(fed + FEED_SIZE, len(source))
+            job.report_progress(fed, builder.node_count)
+            now = time.monotonic()
+            if now - last_partial >= PARTIAL_INTERVAL:
+                with timings.span('partial'):
+                    partial = await self._in_executor(builder.partial)
+                job.report_partial(partial)
+                last_partial = now
+        with timings.span('parse'):
+            snapshot = await self._in_executor(builder.close)
+        check(job.token)
+        job.report_progress(len(source), len(snapshot))
+        await self._in_executor(self._store, key, snapshot, timings)
+        return snapshot
+
+    @staticmethod
+    def _cache_key(data, backend, encoding):
+        cache = get_document_cache()
+        return cache.key(data, backend, encoding) if cache else None
+
+    @staticmethod
+    def _store(key, snapshot, timings=None):
+        # 在工作线程中建好过滤用的索引
+        with span(timings, 'index'):
+            snapshot.index
+        cache = get_document_cache()
+        if cache and key is not None:
+            with span(timings, 'store'):
+                cache.put(key, snapshot)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """返回进程内唯一的 ParseScheduler"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ParseScheduler()
+        return _scheduler
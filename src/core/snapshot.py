@@ -0,0 +1,216 @@
+import json
+import struct
+import sys
+from array import array
+
+from src.core.index import DocumentIndex
+
+# 文档根节点的下标, 其余元素按文档顺序(先序)编号
+ROOT = 0
+NONE = -1
+
+# 序列化格式: 魔数, 版本, 字节序, 节点数, 属性对数, 两张字符串表的字节长度
+_MAGIC = b'EESNAP'
+_VERSION = 1
+_HEADER = struct.Struct('<6sBBIIII')
+_BYTEORDER = 0 if sys.byteorder == 'little' else 1
+
+
+class DocumentSnapshot:
+    """不可变的紧凑DOM快照
+
+    树结构保存在 parent/first_child/next_sibling 三个下标数组中,
+    标签名用整数id表示, 属性名和属性值共用一张字符串表,
+    元素的HTML按 starts/ends 偏移从原始内容中切片得到.
+    """
+    __slots__ = ('source', 'tag_names', 'strings', 'parent', 'first_child', 'next_sibling',
+                 'tags', 'attr_index', 'attrs', 'starts', 'ends', '_index')
+
+    def __init__(self, source, tag_names, strings, parent, first_child, next_sibling,
+                 tags, attr_index, attrs, starts, ends):
+        self.source = source
+        self.tag_names = tag_names
+        self.strings = strings
+        self.parent = parent
+        self.first_child = first_child
+        self.next_sibling = next_sibling
+        self.tags = tags
+        self.attr_index = attr_index
+        self.attrs = attrs
+        self.starts = starts
+        self.ends = ends
+        self._index = None
+
+    def __len__(self):
+        return len(self.tags)
+
+    @property
+    def index(self):
+        """倒排索引, 首次访问时建立; 解析流程会在工作线程中提前建好"""
+        if self._index is None:
+            self._index = DocumentIndex(self)
+        return self._index
+
+    def name(self, node):
+        return self.tag_names[self.tags[node]]
+
+    def children(self, node):
+        child = self.first_child[node]
+        next_sibling = self.next_sibling
+        while child != NONE:
+            yield child
+            child = next_sibling[child]
+
+    def has_children(self, node):
+        return self.first_child[node] != NONE
+
+    def attr_items(self, node):
+        strings = self.strings
+        attrs = self.attrs
+        return [(strings[attrs[i]], strings[attrs[i + 1]])
+                for i in range(2 * self.attr_index[node], 2 * self.attr_index[node + 1], 2)]
+
+    def attr(self, node, name, default=None):
+        for key, value in self.attr_items(node):
+            if key == name:
+                return value
+        return default
+
+    def attrs_text(self, node):
+        return ' '.join([k if v is None else f'{k}="{v}"' for k, v in self.attr_items(node)])
+
+    def outer_html(self, node):
+        return self.source.text(self.starts[node], self.ends[node])
+
+    def outer_bytes(self, node):
+        """零拷贝地返回元素对应的原始字节"""
+        return self.source.view(self.starts[node], self.ends[node])
+
+    def memory_usage(self):
+        """估算占用的字节数, 返回 {'tree': 树结构数组, 'strings': 标签名和属性字符串,
+        'source': 原始内容, 'index': 倒排索引}; 本地文件映射的原始内容按文件大小计"""
+        tree = sum(sys.getsizeof(getattr(self, name)) for name in _ARRAYS)
+        strings = sys.getsizeof(self.tag_names) + sys.getsizeof(self.strings)
+        strings += sum(sys.getsizeof(s) for s in self.tag_names)
+        strings += sum(sys.getsizeof(s) for s in self.strings if s is not None)
+        return {
+            'tree': tree,
+            'strings': strings,
+            'source': len(self.source),
+            'index': self._index.memory_usage() if self._index is not None else 0
+        }
+
+    def to_bytes(self):
+        """把树结构序列化为紧凑的二进制, 不包含原始内容"""
+        names = json.dumps(self.tag_names).encode('utf-8')
+        strings = json.dumps(self.strings).encode('utf-8')
+        parts = [_HEADER.pack(_MAGIC, _VERSION, _BYTEORDER, len(self), len(self.attrs) >> 1,
+                              len(names), len(strings)), names, strings]
+        for name in _ARRAYS:
+            parts.append(getattr(self, name).tobytes())
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, payload, source):
+        """从 to_bytes 的结果和同一份原始内容还原快照, 格式不符时抛出 ValueError"""
+        view = memoryview(payload)
+        magic, version, byteorder, count, pairs, names_len, strings_len = _HEADER.unpack_from(view)
+        if magic != _MAGIC or version != _VERSION or byteorder != _BYTEORDER:
+            raise ValueError("快照格式不兼容")
+        offset = _HEADER.size
+        tag_names = tuple(json.loads(bytes(view[offset:offset + names_len])))
+        offset += names_len
+        strings = tuple(json.loads(bytes(view[offset:offset + strings_len])))
+        offset += strings_len
+        lengths = {'attr_index': count + 1, 'attrs': pairs * 2}
+        arrays = {}
+        for name, typecode in _ARRAYS.items():
+            values = array(typecode)
+            size = lengths.get(name, count) * values.itemsize
+            values.frombytes(view[offset:offset + size])
+            offset += size
+            arrays[name] = values
+        if offset != len(view):
+            raise ValueError("快照数据长度不符")
+        return cls(source, tag_names, strings, **arrays)
+
+    def to_dict(self, node=ROOT):
+        return {
+            'name': self.name(node),
+            'attrs': dict(self.attr_items(node)),
+            'start': self.starts[node],
+            'end': self.ends[node],
+            'children': [self.to_dict(child) for child in self.children(node)]
+        }
+
+
+# 序列化时依次写出的数组及其类型
+_ARRAYS = {
+    'parent': 'i', 'first_child': 'i', 'next_sibling': 'i', 'tags': 'I',
+    'attr_index': 'I', 'attrs': 'I', 'starts': 'q', 'ends': 'q'
+}
+
+
+class SnapshotBuilder:
+    """按文档顺序追加元素, 最后冻结为 DocumentSnapshot"""
+
+    def __init__(self, source):
+        self.source = source
+        self._tag_ids = {'[document]': 0}
+        # 字符串表的0号位置表示没有值的布尔属性
+        self._string_ids = {None: 0}
+        self.parent = array('i', [NONE])
+        self.first_child = array('i', [NONE])
+        self.next_sibling = array('i', [NONE])
+        self.tags = array('I', [0])
+        self.attr_index = array('I', [0, 0])
+        self.attrs = array('I')
+        self.starts = array('q', [0])
+        self.ends = array('q', [NONE])
+        self.last_child = [NONE]
+
+    def __len__(self):
+        return len(self.tags)
+
+    def open_element(self, parent, name, attrs, start):
+        """追加一个元素, 返回它的下标"""
+        node = len(self.tags)
+        tag_ids = self._tag_ids
+        self.tags.append(tag_ids.setdefault(name, len(tag_ids)))
+        self.parent.append(parent)
+        self.first_child.append(NONE)
+        self.next_sibling.append(NONE)
+        self.last_child.append(NONE)
+        self.starts.append(start)
+        self.ends.append(NONE)
+        if attrs:
+            ids = self._string_ids
+            flat = self.attrs
+            for key, value in attrs:
+                flat.append(ids.setdefault(key, len(ids)))
+                flat.append(ids.setdefault(value, len(ids)))
+        self.attr_index.append(len(self.attrs) >> 1)
+
+        previous = self.last_child[parent]
+        if previous == NONE:
+            self.first_child[parent] = node
+        else:
+            self.next_sibling[previous] = node
+        self.last_child[parent] = node
+        return node
+
+    def tag_names(self):
+        return tuple(self._tag_ids)
+
+    def close_element(self, node, end):
+        self.ends[node] = end
+
+    def freeze(self):
+        tag_names = self.tag_names()
+        strings = tuple(self._string_ids)
+        return DocumentSnapshot(
+            self.source, tag_names, strings,
+            array('i', self.parent), array('i', self.first_child), array('i', self.next_sibling),
+            array('I', self.tags), array('I', self.attr_index), array('I', self.attrs),
+            array('q', self.starts), array('q', self.ends)
+        )
@@ -0,0 +1,121 @@
+import codecs
+import mmap
+import os
+import re
+
+# 文档开头用于探测编码的字节数
+SNIFF_BYTES = 1024
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_\-:.]+)', re.IGNORECASE)
+_HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([^"\';\s]+)', re.IGNORECASE)
+
+
+def _normalize(encoding):
+    try:
+        return codecs.lookup(encoding).name
+    except (LookupError, TypeError):
+        return None
+
+
+def charset_from_content_type(content_type):
+    """从Content-Type响应头中取出charset"""
+    if not content_type:
+        return None
+    match = _HEADER_CHARSET.search(content_type)
+    return _normalize(match.group(1)) if match else None
+
+
+def sniff_encoding(data, declared=None):
+    """按 BOM、响应头声明、<meta charset> 的顺序确定文档编码"""
+    head = bytes(data[:SNIFF_BYTES])
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    encoding = _normalize(declared) if declared else None
+    if encoding:
+        return encoding
+    match = _META_CHARSET.search(head)
+    if match:
+        encoding = _normalize(match.group(1).decode('ascii', 'ignore'))
+        if encoding:
+            return encoding
+    return 'utf-8'
+
+
+def map_file(path):
+    """以只读内存映射打开本地文件, 解析期间内容按需由操作系统换入, 用完后调用 unmap"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        # 映射在文件关闭后仍然有效
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def unmap(data):
+    """关闭 map_file 返回的映射; 其他类型的数据不做处理"""
+    if isinstance(data, mmap.mmap):
+        try:
+            data.close()
+        except BufferError:
+            # 还有 memoryview 引用着映射, 等它们释放后由垃圾回收解除映射
+            pass
+
+
+def ascii_compatible(encoding):
+    """偏移按字节计算, 只有ASCII兼容的编码才能直接按字节解析"""
+    return not encoding.startswith(('utf-16', 'utf-32'))
+
+
+class SourceBuffer:
+    """文档的原始字节(bytes、流式解析中的 bytearray 或本地文件的 mmap), 节点只记录其中的偏移, 需要时再切片"""
+    __slots__ = ('data', 'encoding')
+
+    def __init__(self, data, encoding=None):
+        encoding = sniff_encoding(data, encoding)
+        if not ascii_compatible(encoding):
+            # 偏移量按字节计算, 非ASCII兼容的编码先转成UTF-8
+            data = bytes(data).decode(encoding, 'replace').encode('utf-8')
+            encoding = 'utf-8'
+        self.data = data
+        self.encoding = encoding
+
+    def __len__(self):
+        return len(self.data)
+
+    def view(self, start, end):
+        """零拷贝地返回一段原始字节"""
+        return memoryview(self.data)[start:end]
+
+    def text(self, start, end):
+        # 直接切片而不导出memoryview, 流式解析时缓冲区仍可继续增长
+        return str(self.data[start:end], self.encoding, 'replace')
+
+    def detach(self):
+        """内存映射的内容复制为 bytes 并关闭映射
+
+        文件被截断或改写后再读取映射会使进程崩溃(SIGBUS), Windows 上映射还会锁住文件,
+        因此映射只在解析期间使用, 之后的快照和缓存都读取复制出的内容.
+        """
+        data = self.data
+        if isinstance(data, mmap.mmap):
+            self.data = data[:]
+            unmap(data)
+
+    def decode_token(self, token):
+        """把按latin-1读入的片段还原成文档编码的文本"""
+        if token.isascii():
+            return token
+        return token.encode('latin-1').decode(self.encoding, 'replace')
+
+    def parse_chunks(self, size):
+        """按latin-1分块解码, 使字符下标与字节偏移一一对应"""
+        data = self.data
+        for start in range(0, len(data), size):
+            yield str(data[start:start + size], 'latin-1')
@@ -0,0 +1,89 @@
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+# 各阶段的显示名, 未列出的阶段直接显示名称
+STAGE_LABELS = {
+    'queue': "排队",
+    'dns': "DNS解析",
+    'connect': "建立连接",
+    'wait': "等待响应",
+    'download': "下载",
+    'read': "读取文件",
+    'detach': "复制文件内容",
+    'decode': "解码",
+    'cache': "查解析缓存",
+    'parse': "解析",
+    'partial': "部分快照",
+    'index': "建立索引",
+    'store': "写解析缓存",
+    'model': "加载树",
+    'filter': "过滤查询",
+    'filter_apply': "应用过滤",
+    'restore': "从休眠恢复",
+}
+
+
+class StageTimings:
+    """一次解析中各阶段的耗时
+
+    同一阶段可以多次记录(如分块下载和解析), 累计耗时和次数.
+    会在事件循环线程和工作线程中同时记录, 内部加锁.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self.created = time.perf_counter()
+        self.elapsed = None
+        self.bytes = 0
+        self.nodes = 0
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            total, count = self._stages.get(stage, (0.0, 0))
+            self._stages[stage] = (total + seconds, count + 1)
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def set_size(self, received, nodes):
+        self.bytes = received
+        self.nodes = nodes
+
+    def finish(self):
+        """记录从创建到完成的总耗时"""
+        self.elapsed = time.perf_counter() - self.created
+
+    def stages(self):
+        """返回 [(阶段, 累计毫秒, 次数)], 按首次记录的顺序"""
+        with self._lock:
+            return [(stage, total * 1000, count) for stage, (total, count) in self._stages.items()]
+
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'started': self.started,
+            'bytes': self.bytes,
+            'nodes': self.nodes,
+            'total_ms': round(self.elapsed * 1000, 2) if self.elapsed is not None else None,
+            'stages': [{'stage': stage, 'ms': round(ms, 2), 'count': count}
+                       for stage, ms, count in self.stages()]
+        }
+
+    def summary(self):
+        """一行文字摘要, 如 '下载 120ms, 解析 340ms'"""
+        return ', '.join(f"{STAGE_LABELS.get(stage, stage)} {ms:.0f}ms" for stage, ms, _ in self.stages())
+
+
+def span(timings, stage):
+    """timings 为 None 时不记录"""
+    return timings.span(stage) if timings is not None else nullcontext()
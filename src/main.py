@@ -1,36 +1,75 @@
 # coding = utf-8
-# This is a sample Python script.
+"""图形界面入口
 
-# Press Shift+F10 to execute it or replace it with your code.
-# Press Double Shift to search everywhere for classes, files, tool windows, actions, and settings.
+用法:
+    python -m src.main                     # 启动程序
+    python -m src.main --startup-report    # 启动后在标准错误输出各阶段和各模块的导入耗时
+"""
+# 最先导入, 启动计时从这里开始
+from src.utils import startup
 
+import argparse
+import json
 import sys
-from PyQt6.QtWidgets import QApplication
 
-from src.utils.settings import SettingsManager
-from ui.main_window import MainWindow
-from utils.logger import setup_logger
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m src.main', description="ElementEye HTML元素分析器")
+    parser.add_argument('--startup-report', action='store_true', help="输出启动耗时报告")
+    parser.add_argument('--report-json', help="把启动耗时报告以JSON写入该文件")
+    parser.add_argument('--exit-after-startup', action='store_true', help="窗口显示后立即退出, 用于测量冷启动")
+    # 其余参数交给 Qt
+    return parser.parse_known_args(argv)
 
 
 def main():
+    args, qt_args = parse_args(sys.argv[1:])
+    if args.startup_report or args.report_json:
+        startup.profile_imports()
+
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+    from src.utils.logger import setup_logger
+    from src.utils.settings import get_settings_manager
+    from src.ui.main_window import MainWindow
+    from src.ui.theme import apply_theme
+    startup.mark("导入界面模块")
+
     # 设置日志
     setup_logger()
 
-    # 加载配置
-    settings_manager = SettingsManager()
-    settings = settings_manager.load_settings()
+    # 加载配置, 全程只读取一次, 由各窗口共用
+    settings = get_settings_manager().settings
+    startup.mark("读取设置")
 
     # 创建应用
-    app = QApplication(sys.argv)
+    app = QApplication([sys.argv[0]] + qt_args)
+    # 在创建控件之前应用主题, 控件第一次显示时直接按主题 polish
+    apply_theme(app, settings.get('theme'), settings.get('font_size'))
+
+    # 事件循环开始处理后窗口才真正显示出来; 先于主窗口内部的延迟初始化登记
+    QTimer.singleShot(0, lambda: startup.mark("窗口显示"))
 
     # 创建主窗口
     window = MainWindow(settings)
+    startup.mark("创建主窗口")
     window.show()
 
+    def finish():
+        # 第一个标签页和网络设置在窗口显示后才初始化
+        startup.mark("首个标签页就绪")
+        startup.stop_profiling()
+        if args.startup_report:
+            print(startup.report(), file=sys.stderr)
+        if args.report_json:
+            with open(args.report_json, 'w', encoding='utf-8') as f:
+                json.dump(startup.as_dict(), f, ensure_ascii=False, indent=2)
+        if args.exit_after_startup:
+            app.quit()
+
+    QTimer.singleShot(0, finish)
     sys.exit(app.exec())
 
 
 if __name__ == '__main__':
     main()
-
-# See PyCharm help at https://www.jetbrains.com/help/pycharm/
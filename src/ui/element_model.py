@@ -0,0 +1,229 @@
+import sys
+
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex
+from src.core.query import compile_query
+from src.core.snapshot import ROOT, NONE
+
+# 每次 fetchMore 最多创建的行数
+FETCH_BATCH = 200
+
+
+class _TreeNode:
+    """模型内部节点, 只在父节点被展开时才创建"""
+    __slots__ = ('element', 'parent', 'row', 'children', '_pending', '_lookahead')
+
+    def __init__(self, element=NONE, parent=None, row=0):
+        self.element = element
+        self.parent = parent
+        self.row = row
+        self.children = []
+        self._pending = None
+        self._lookahead = None
+
+    def start_fetch(self, snapshot, visible):
+        """准备一个惰性的子元素迭代器"""
+        if self._pending is not None or snapshot is None:
+            return False
+        children = snapshot.children(self.element)
+        if visible is not None:
+            children = (c for c in children if c in visible)
+        self._pending = children
+        self._lookahead = next(self._pending, None)
+        return True
+
+    def resume(self, snapshot):
+        """快照增长后, 从尚未取出的位置继续迭代新快照中的子元素"""
+        if self._lookahead is not None:
+            first = self._lookahead
+        elif self.children:
+            first = snapshot.next_sibling[self.children[-1].element]
+        else:
+            first = snapshot.first_child[self.element]
+
+        def siblings(child):
+            while child != NONE:
+                yield child
+                child = snapshot.next_sibling[child]
+
+        self._pending = siblings(first)
+        self._lookahead = next(self._pending, None)
+
+    def has_more(self):
+        return self._lookahead is not None
+
+    def fetch(self, count):
+        """取出最多 count 个子元素"""
+        batch = []
+        while self._lookahead is not None and len(batch) < count:
+            batch.append(self._lookahead)
+            self._lookahead = next(self._pending, None)
+        return batch
+
+
+class ElementTreeModel(QAbstractItemModel):
+    """惰性加载的HTML元素树模型, 行只在展开或滚动到可见时才创建"""
+
+    HEADERS = ("标签", "属性")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._snapshot = None
+        self._root = _TreeNode()
+        self._visible = None
+        self._started = []
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def set_snapshot(self, snapshot):
+        self.beginResetModel()
+        self._snapshot = snapshot
+        self._root = _TreeNode(ROOT)
+        self._visible = None
+        self._started = []
+        self.endResetModel()
+
+    def update_snapshot(self, snapshot):
+        """用增长后的快照替换当前快照, 已展开的节点直接追加新完成的子元素
+
+        流式解析时先后得到的快照下标一致, 因此不需要重置模型.
+        过滤状态下只替换数据, 等最终结果到达后再统一过滤.
+        """
+        if self._snapshot is None:
+            self.set_snapshot(snapshot)
+            return
+        self._snapshot = snapshot
+        if self._visible is not None:
+            return
+        for node in list(self._started):
+            had_rows = bool(node.children) or node is self._root
+            node.resume(snapshot)
+            if had_rows and node.has_more():
+                self.fetchMore(self._index_of(node))
+        # 让视图重新查询 hasChildren, 刷新新出现子元素的节点的展开箭头
+        self.layoutAboutToBeChanged.emit()
+        self.layoutChanged.emit()
+
+    def _index_of(self, node):
+        if node is self._root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def set_filter(self, filter_text, mode='text'):
+        """在当前线程中过滤, 耗时的查询应先在后台调用 compute_visible 再 set_visible"""
+        self.set_visible(self.compute_visible(self._snapshot, filter_text, mode=mode))
+
+    def set_visible(self, visible):
+        """一次性应用过滤结果, visible 为 None 表示显示全部"""
+        self.beginResetModel()
+        self._visible = visible
+        self._root = _TreeNode(ROOT)
+        self._started = []
+        self.endResetModel()
+
+    @staticmethod
+    def compute_visible(snapshot, filter_text, token=None, mode='text'):
+        """返回匹配元素及其祖先的集合, 查询语法错误时抛出 QueryError
+
+        text 模式按标签名、属性名或属性值做子串匹配, 多个词同时匹配;
+        css/xpath 模式按选择器查询. 不访问模型状态, 可以在工作线程中调用.
+        """
+        if not filter_text.strip():
+            return None
+        if snapshot is None:
+            return set()
+        matches = compile_query(filter_text.strip(), mode).select(snapshot, token)
+        return snapshot.index.with_ancestors(matches, token)
+
+    def memory_usage(self):
+        """返回 (已创建的行数, 估算字节数), 不含快照本身"""
+        count = 0
+        size = sys.getsizeof(self._visible) if self._visible is not None else 0
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            count += 1
+            size += sys.getsizeof(node) + sys.getsizeof(node.children)
+            stack.extend(node.children)
+        return count - 1, size
+
+    def element(self, index):
+        if not index.isValid():
+            return None
+        return index.internalPointer().element
+
+    def outer_html(self, index):
+        """按偏移从原始内容中切出元素的HTML"""
+        element = self.element(index)
+        if element is None or self._snapshot is None:
+            return None
+        return self._snapshot.outer_html(element)
+
+    def _node(self, index):
+        return index.internalPointer() if index.isValid() else self._root
+
+    # QAbstractItemModel 接口
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._node(parent)
+        if 0 <= row < len(node.children) and 0 <= column < len(self.HEADERS):
+            return self.createIndex(row, column, node.children[row])
+        return QModelIndex()
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalPointer().parent
+        if node is None or node is self._root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self._node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self._node(parent)
+        if node.children:
+            return True
+        self._start_fetch(node)
+        return node.has_more()
+
+    def canFetchMore(self, parent):
+        node = self._node(parent)
+        self._start_fetch(node)
+        return node.has_more()
+
+    def _start_fetch(self, node):
+        if node.start_fetch(self._snapshot, self._visible):
+            self._started.append(node)
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        self._start_fetch(node)
+        batch = node.fetch(FETCH_BATCH)
+        if not batch:
+            return
+        first = len(node.children)
+        self.beginInsertRows(parent, first, first + len(batch) - 1)
+        node.children.extend(_TreeNode(element, node, first + i) for i, element in enumerate(batch))
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        element = index.internalPointer().element
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            if index.column() == 0:
+                return self._snapshot.name(element)
+            return self._snapshot.attrs_text(element)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
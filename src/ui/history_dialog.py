@@ -0,0 +1,154 @@
+from collections import OrderedDict
+
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QTableView, QHeaderView
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, pyqtSignal
+
+from src.utils.history import SORT_COLUMNS
+
+# 每次从数据库读取的行数
+PAGE_SIZE = 200
+# 内存中保留的页数
+CACHED_PAGES = 20
+# 停止输入多久(毫秒)后才执行搜索
+SEARCH_DELAY = 200
+
+
+class HistoryTableModel(QAbstractTableModel):
+    """按页从历史记录库读取的表格模型, 只有滚动到的行才会被读取和格式化
+
+    排序和搜索都交给数据库完成.
+    """
+
+    HEADERS = ("URL", "时间", "次数")
+
+    def __init__(self, history_manager, parent=None):
+        super().__init__(parent)
+        self.history_manager = history_manager
+        self.search = ''
+        self.sort_column = SORT_COLUMNS.index('timestamp')
+        self.descending = True
+        self._pages = OrderedDict()
+        self._count = history_manager.count()
+
+    def reload(self):
+        self.beginResetModel()
+        self._pages.clear()
+        self._count = self.history_manager.count(self.search)
+        self.endResetModel()
+
+    def set_search(self, text):
+        text = text.strip()
+        if text != self.search:
+            self.search = text
+            self.reload()
+
+    def _row(self, row):
+        number = row // PAGE_SIZE
+        page = self._pages.get(number)
+        if page is None:
+            page = self.history_manager.page(number * PAGE_SIZE, PAGE_SIZE, self.search,
+                                             SORT_COLUMNS[self.sort_column], self.descending)
+            self._pages[number] = page
+            if len(self._pages) > CACHED_PAGES:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(number)
+        offset = row - number * PAGE_SIZE
+        return page[offset] if offset < len(page) else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._count
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return None
+        entry = self._row(index.row())
+        if entry is None:
+            return None
+        value = entry[index.column()]
+        if index.column() == 1:
+            # 时间按ISO格式保存, 显示时才转换
+            return value.replace('T', ' ')[:19]
+        return value
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.sort_column = column
+        self.descending = order == Qt.SortOrder.DescendingOrder
+        self.reload()
+
+
+class HistoryDialog(QDialog):
+    # 历史记录库在后台写入新记录后发出
+    history_changed = pyqtSignal()
+
+    def __init__(self, history_manager, parent=None):
+        super().__init__(parent)
+        self.history_manager = history_manager
+        self.model = HistoryTableModel(history_manager, self)
+        self.init_ui()
+        # 通知可能在读取数据的过程中同步发出, 排队处理以免在模型查询中途重置
+        self.history_changed.connect(self.refresh, Qt.ConnectionType.QueuedConnection)
+        history_manager.subscribe(self._on_history_changed)
+
+    def init_ui(self):
+        self.setWindowTitle("历史记录")
+        self.setGeometry(100, 100, 700, 450)
+        layout = QVBoxLayout(self)
+
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("搜索URL...")
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.apply_search)
+        self.search_input.textChanged.connect(lambda: self.search_timer.start())
+        self.count_label = QLabel()
+        search_layout.addWidget(self.search_input)
+        search_layout.addWidget(self.count_label)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        # 先设好排序标记, 开启排序时只按它查询一次
+        self.table.horizontalHeader().setSortIndicator(self.model.sort_column, Qt.SortOrder.DescendingOrder)
+        self.table.setSortingEnabled(True)
+        # 固定行高和列宽, 避免为计算尺寸读取所有行
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.verticalHeader().setVisible(False)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Fixed)
+        header.setSectionResizeMode(2, QHeaderView.ResizeMode.Fixed)
+        header.resizeSection(1, 160)
+        header.resizeSection(2, 60)
+
+        layout.addLayout(search_layout)
+        layout.addWidget(self.table)
+        self.update_count()
+
+    def apply_search(self):
+        self.model.set_search(self.search_input.text())
+        self.update_count()
+
+    def refresh(self):
+        self.model.reload()
+        self.update_count()
+
+    def _on_history_changed(self):
+        self.history_changed.emit()
+
+    def done(self, result):
+        self.history_manager.unsubscribe(self._on_history_changed)
+        super().done(result)
+
+    def update_count(self):
+        self.count_label.setText(f"{self.model.rowCount()} 条")
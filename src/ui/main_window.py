@@ -1,19 +1,22 @@
-from datetime import datetime
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QMessageBox, QDialog, QMenu, QFileDialog
 
-from PyQt6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QTableWidgetItem, QTableWidget, QMessageBox, QDialog, \
-    QMenu, QFileDialog
-
-from src.ui.settings_dialog import SettingsDialog
+# 网络、缓存模块和各对话框在用到时才导入, 不拖慢启动
 from src.ui.tab_widget import TabWidget
-from src.utils.history import HistoryManager
-from src.utils.settings import SettingsManager
+from src.ui.theme import apply_theme
+from src.utils.history import get_history_manager
+from src.utils.settings import get_settings_manager
 
 class MainWindow(QMainWindow):
     def __init__(self, settings):
         super().__init__()
         self.settings = settings
-        self.history_manager = HistoryManager()
-        self.settings_manager = SettingsManager()
+        self.history_manager = get_history_manager()
+        self.history_manager.set_max_history(self.settings.get('max_history', 100))
+        self.settings_manager = get_settings_manager()
+        self.settings_manager.subscribe(self.on_settings_changed)
+        # 窗口显示后再初始化网络客户端和缓存
+        QTimer.singleShot(0, self.apply_network_settings)
         
         self.init_ui()
         self.setup_menu()
@@ -31,7 +34,7 @@ class MainWindow(QMainWindow):
         central_widget.setLayout(layout)
         
         # 创建标签页管理器
-        self.tab_widget = TabWidget(self)
+        self.tab_widget = TabWidget(self.settings, self)
         layout.addWidget(self.tab_widget)
         
     def setup_menu(self):
@@ -53,6 +56,8 @@ class MainWindow(QMainWindow):
         # 视图菜单
         view_menu = menubar.addMenu('视图')
         view_menu.addAction('历史记录', self.show_history)
+        view_menu.addAction('性能', self.show_performance)
+        view_menu.addAction('内存', self.show_memory)
         
         # 帮助菜单
         help_menu = menubar.addMenu('帮助')
@@ -63,16 +68,16 @@ class MainWindow(QMainWindow):
             self,
             "打开文件",
             "",
-            "HTML Files (*.html);;All Files (*)"
+            "HTML Files (*.html *.htm);;All Files (*)"
         )
         if file_name:
             try:
-                with open(file_name, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                # 创建新标签页并设置内容
                 current_tab = self.tab_widget.currentWidget()
-                if current_tab:
-                    current_tab.set_html_content(content)
+                if current_tab is None:
+                    self.tab_widget.add_tab()
+                    current_tab = self.tab_widget.currentWidget()
+                # 文件在后台按内存映射分块解析, 不阻塞界面
+                current_tab.open_file(file_name)
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"打开文件失败: {str(e)}")
 
@@ -98,260 +103,57 @@ class MainWindow(QMainWindow):
 
     def open_settings(self):
         try:
+            from src.ui.settings_dialog import SettingsDialog
             dialog = SettingsDialog(self.settings, self)
             if dialog.exec() == QDialog.DialogCode.Accepted:
-                # 更新设置
-                self.settings_manager.save_settings(self.settings)
-                # 应用设置
-                self.apply_settings()
+                # 更新设置, 改动会通知到订阅者(主窗口), 并在后台写盘
+                self.settings_manager.update(dialog.values)
         except Exception as e:
             QMessageBox.critical(self, "错误", f"打开设置失败: {str(e)}")
 
+    def on_settings_changed(self, changed):
+        self.apply_settings()
+
     def apply_settings(self):
         try:
-            # 应用主题
-            theme = self.settings.get('theme', '浅色')
-            if theme == '浅色':
-                self.setStyleSheet(f"""
-                    QMainWindow, QDialog {{
-                        background-color: #f5f5f5;
-                    }}
-                    QWidget {{
-                        background-color: #ffffff;
-                        color: #2c3e50;
-                        font-size: {self.settings.get('font_size', 12)}pt;
-                    }}
-                    QMenuBar {{
-                        background-color: #ffffff;
-                        border-bottom: 1px solid #e0e0e0;
-                    }}
-                    QMenuBar::item:selected {{
-                        background-color: #e0e0e0;
-                        border-radius: 4px;
-                    }}
-                    QMenu {{
-                        background-color: #ffffff;
-                        border: 1px solid #e0e0e0;
-                        padding: 5px;
-                    }}
-                    QMenu::item:selected {{
-                        background-color: #e0e0e0;
-                        border-radius: 4px;
-                    }}
-                    QPushButton {{
-                        background-color: #3498db;
-                        color: white;
-                        border: none;
-                        padding: 8px 15px;
-                        border-radius: 4px;
-                    }}
-                    QPushButton:hover {{
-                        background-color: #2980b9;
-                    }}
-                    QPushButton:pressed {{
-                        background-color: #2472a4;
-                    }}
-                    QLineEdit {{
-                        padding: 8px;
-                        border: 1px solid #e0e0e0;
-                        border-radius: 4px;
-                        background-color: #ffffff;
-                    }}
-                    QLineEdit:focus {{
-                        border: 1px solid #3498db;
-                    }}
-                    QTreeWidget {{
-                        border: 1px solid #e0e0e0;
-                        border-radius: 4px;
-                    }}
-                    QTreeWidget::item {{
-                        padding: 5px;
-                    }}
-                    QTreeWidget::item:selected {{
-                        background-color: #3498db;
-                        color: white;
-                    }}
-                    QScrollBar:vertical {{
-                        border: none;
-                        background: #f0f0f0;
-                        width: 10px;
-                        border-radius: 5px;
-                    }}
-                    QScrollBar::handle:vertical {{
-                        background: #c0c0c0;
-                        border-radius: 5px;
-                    }}
-                    QScrollBar::handle:vertical:hover {{
-                        background: #a0a0a0;
-                    }}
-                """)
-            else:
-                self.setStyleSheet(f"""
-                    QMainWindow, QDialog {{
-                        background-color: #1e1e1e;
-                    }}
-                    QWidget {{
-                        background-color: #2d2d2d;
-                        color: #ffffff;
-                        font-size: {self.settings.get('font_size', 12)}pt;
-                    }}
-                    QMenuBar {{
-                        background-color: #2d2d2d;
-                        border-bottom: 1px solid #3d3d3d;
-                    }}
-                    QMenuBar::item:selected {{
-                        background-color: #3d3d3d;
-                        border-radius: 4px;
-                    }}
-                    QMenu {{
-                        background-color: #2d2d2d;
-                        border: 1px solid #3d3d3d;
-                        padding: 5px;
-                    }}
-                    QMenu::item:selected {{
-                        background-color: #3d3d3d;
-                        border-radius: 4px;
-                    }}
-                    QPushButton {{
-                        background-color: #0d47a1;
-                        color: white;
-                        border: none;
-                        padding: 8px 15px;
-                        border-radius: 4px;
-                    }}
-                    QPushButton:hover {{
-                        background-color: #1565c0;
-                    }}
-                    QPushButton:pressed {{
-                        background-color: #0a3d87;
-                    }}
-                    QLineEdit {{
-                        padding: 8px;
-                        border: 1px solid #3d3d3d;
-                        border-radius: 4px;
-                        background-color: #2d2d2d;
-                        color: white;
-                    }}
-                    QLineEdit:focus {{
-                        border: 1px solid #0d47a1;
-                    }}
-                    QTreeWidget {{
-                        border: 1px solid #3d3d3d;
-                        border-radius: 4px;
-                        background-color: #2d2d2d;
-                    }}
-                    QTreeWidget::item {{
-                        padding: 5px;
-                    }}
-                    QTreeWidget::item:selected {{
-                        background-color: #0d47a1;
-                        color: white;
-                    }}
-                    QScrollBar:vertical {{
-                        border: none;
-                        background: #2d2d2d;
-                        width: 10px;
-                        border-radius: 5px;
-                    }}
-                    QScrollBar::handle:vertical {{
-                        background: #4d4d4d;
-                        border-radius: 5px;
-                    }}
-                    QScrollBar::handle:vertical:hover {{
-                        background: #5d5d5d;
-                    }}
-                """)
-            
-            # 更新字体大小
-            self.update_font_size()
+            # 主题和字号作用于整个程序, 与当前相同时不会重新应用
+            apply_theme(QApplication.instance(), self.settings.get('theme'), self.settings.get('font_size'))
             
-            # 更新网络超时设置
-            timeout = self.settings.get('timeout', 10)
-            # 这里可以更新网络请求的超时设置
+            # 更新网络超时和缓存设置
+            self.apply_network_settings()
             
             # 更新历史记录限制
             max_history = self.settings.get('max_history', 100)
             self.history_manager.set_max_history(max_history)
+
+            # 标签页内存预算可能变小
+            self.tab_widget.enforce_memory_budget()
             
         except Exception as e:
             QMessageBox.critical(self, "错误", f"应用设置失败: {str(e)}")
 
-    def update_font_size(self):
-        """更新所有控件的字体大小"""
-        try:
-            font_size = self.settings.get('font_size', 12)
-            
-            # 更新主窗口字体
-            font = self.font()
-            font.setPointSize(font_size)
-            self.setFont(font)
-            
-            # 更新标签页中的控件字体
-            for i in range(self.tab_widget.count()):
-                tab = self.tab_widget.widget(i)
-                if tab:
-                    # 更新树形视图字体
-                    tree_font = tab.tree.font()
-                    tree_font.setPointSize(font_size)
-                    tab.tree.setFont(tree_font)
-                    
-                    # 更新预览区域字体
-                    preview_font = tab.preview.font()
-                    preview_font.setPointSize(font_size)
-                    tab.preview.setFont(preview_font)
-                    
-                    # 更新其他输入框字体
-                    url_font = tab.url_input.font()
-                    url_font.setPointSize(font_size)
-                    tab.url_input.setFont(url_font)
-                    
-                    filter_font = tab.filter_input.font()
-                    filter_font.setPointSize(font_size)
-                    tab.filter_input.setFont(filter_font)
-                    
-            # 更新菜单字体
-            menu_font = self.menuBar().font()
-            menu_font.setPointSize(font_size)
-            self.menuBar().setFont(menu_font)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"更新字体大小失败: {str(e)}")
+    def apply_network_settings(self):
+        from src.core.doc_cache import DEFAULT_DISK_MB, get_document_cache
+        from src.core.http_cache import DEFAULT_CACHE_MB
+        from src.core.http_client import DEFAULT_TIMEOUT, get_http_client
+        get_http_client().set_timeout(self.settings.get('timeout', DEFAULT_TIMEOUT))
+        get_http_client().set_cache_limit(self.settings.get('http_cache_mb', DEFAULT_CACHE_MB))
+        cache = get_document_cache()
+        if cache:
+            cache.configure(max_bytes=self.settings.get('doc_cache_mb', DEFAULT_DISK_MB) * 1024 * 1024)
 
     def show_history(self):
-        class HistoryDialog(QDialog):
-            def __init__(self, history, parent=None):
-                super().__init__(parent)
-                self.history = history
-                self.init_ui()
-                
-            def init_ui(self):
-                self.setWindowTitle("历史记录")
-                self.setGeometry(100, 100, 600, 400)
-                
-                layout = QVBoxLayout()
-                
-                # 创建表格
-                table = QTableWidget()
-                table.setColumnCount(2)
-                table.setHorizontalHeaderLabels(["URL", "时间"])
-                
-                # 填充历史记录
-                table.setRowCount(len(self.history))
-                for i, entry in enumerate(self.history):
-                    url_item = QTableWidgetItem(entry['url'])
-                    time_item = QTableWidgetItem(
-                        datetime.fromisoformat(entry['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
-                    )
-                    table.setItem(i, 0, url_item)
-                    table.setItem(i, 1, time_item)
-                
-                table.resizeColumnsToContents()
-                layout.addWidget(table)
-                
-                self.setLayout(layout)
-        
-        dialog = HistoryDialog(self.history_manager.history, self)
-        dialog.exec()
+        from src.ui.history_dialog import HistoryDialog
+        HistoryDialog(self.history_manager, self).exec()
+
+    def show_performance(self):
+        current_tab = self.tab_widget.currentWidget()
+        if current_tab is not None:
+            current_tab.show_performance()
+
+    def show_memory(self):
+        from src.ui.memory_dialog import MemoryDialog
+        MemoryDialog(self.tab_widget, self).exec()
 
     def show_about(self):
         """显示关于对话框"""
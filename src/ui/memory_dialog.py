@@ -0,0 +1,144 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+                             QTableWidgetItem, QTextEdit, QGroupBox, QHeaderView, QMessageBox)
+from PyQt6.QtCore import Qt
+
+from src.core.doc_cache import get_document_cache
+from src.utils.memory import format_size, get_memory_tracer, process_memory
+
+# 表格列: (标题, memory_usage 中的键)
+USAGE_COLUMNS = (
+    ("树结构", 'tree'),
+    ("字符串", 'strings'),
+    ("原始内容", 'source'),
+    ("索引", 'index'),
+    ("树节点", 'model'),
+    ("预览", 'preview'),
+    ("休眠数据", 'hibernated'),
+)
+
+
+class MemoryDialog(QDialog):
+    """按标签页统计内存占用, 并可按需拍 tracemalloc 快照比较分配的增长"""
+
+    def __init__(self, tab_widget, parent=None):
+        super().__init__(parent)
+        self.tab_widget = tab_widget
+        self.tracer = get_memory_tracer()
+        self.init_ui()
+        self.refresh()
+
+    def init_ui(self):
+        self.setWindowTitle("内存")
+        self.resize(900, 600)
+        layout = QVBoxLayout(self)
+
+        self.summary_label = QLabel()
+        headers = ["标签页", "元素", "树行数"] + [title for title, _ in USAGE_COLUMNS] + ["合计"]
+        self.table = QTableWidget(0, len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        note = QLabel("同一文档的快照可能被多个标签页和解析缓存共用, 各行分别计入.")
+        note.setWordWrap(True)
+
+        refresh_button = QPushButton("刷新")
+        refresh_button.clicked.connect(self.refresh)
+
+        # 分配跟踪
+        trace_group = QGroupBox("分配跟踪 (tracemalloc)")
+        trace_layout = QVBoxLayout(trace_group)
+        trace_buttons = QHBoxLayout()
+        self.trace_button = QPushButton()
+        self.trace_button.clicked.connect(self.toggle_tracing)
+        self.snapshot_button = QPushButton("拍快照")
+        self.snapshot_button.clicked.connect(self.take_snapshot)
+        self.compare_button = QPushButton("与上一张比较")
+        self.compare_button.clicked.connect(self.compare_snapshots)
+        trace_buttons.addWidget(self.trace_button)
+        trace_buttons.addWidget(self.snapshot_button)
+        trace_buttons.addWidget(self.compare_button)
+        trace_buttons.addStretch()
+        self.trace_output = QTextEdit()
+        self.trace_output.setReadOnly(True)
+        self.trace_output.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
+        trace_layout.addLayout(trace_buttons)
+        trace_layout.addWidget(self.trace_output)
+
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(self.summary_label, stretch=1)
+        top_layout.addWidget(refresh_button)
+        layout.addLayout(top_layout)
+        layout.addWidget(self.table, stretch=1)
+        layout.addWidget(note)
+        layout.addWidget(trace_group, stretch=1)
+        self.update_trace_buttons()
+
+    def refresh(self):
+        rows = []
+        for i in range(self.tab_widget.count()):
+            tab = self.tab_widget.widget(i)
+            if not hasattr(tab, 'memory_usage'):
+                continue
+            snapshot = tab.tree_model.snapshot
+            model_rows, usage = tab.memory_usage()
+            title = tab.url_input.text() or self.tab_widget.tabText(i)
+            if tab.hibernated is not None:
+                title += " (休眠)"
+            rows.append((title, len(snapshot) - 1 if snapshot is not None else 0, model_rows, usage))
+
+        self.table.setRowCount(len(rows))
+        for row, (title, elements, model_rows, usage) in enumerate(rows):
+            values = [title, str(elements), str(model_rows)]
+            values += [format_size(usage.get(key, 0)) for _, key in USAGE_COLUMNS]
+            values.append(format_size(sum(usage.values())))
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+        parts = []
+        rss = process_memory()
+        if rss is not None:
+            parts.append(f"进程常驻内存 {format_size(rss)}")
+        cache = get_document_cache()
+        if cache:
+            count, size = cache.memory_usage()
+            parts.append(f"解析缓存内存层 {count} 个文档, {format_size(size)}")
+        self.summary_label.setText(", ".join(parts))
+
+    def update_trace_buttons(self):
+        tracing = self.tracer.tracing
+        self.trace_button.setText("停止跟踪" if tracing else "开始跟踪")
+        self.snapshot_button.setEnabled(tracing)
+        self.compare_button.setEnabled(tracing and len(self.tracer.snapshots) >= 2)
+
+    def toggle_tracing(self):
+        if self.tracer.tracing:
+            self.tracer.stop()
+            self.trace_output.append("已停止跟踪")
+        else:
+            self.tracer.start()
+            self.trace_output.append("已开始跟踪, 之后的分配会被记录; 操作一段时间后拍快照比较")
+        self.update_trace_buttons()
+
+    def take_snapshot(self):
+        try:
+            taken, total = self.tracer.take()
+            lines = [f"[{taken}] 快照 #{len(self.tracer.snapshots)}, 跟踪到 {format_size(total)}"]
+            for location, size, count in self.tracer.top(limit=10):
+                lines.append(f"  {format_size(size):>10}  {count:>7} 块  {location}")
+            self.trace_output.append('\n'.join(lines))
+        except Exception as e:
+            QMessageBox.warning(self, "警告", f"拍快照失败: {str(e)}")
+        self.update_trace_buttons()
+
+    def compare_snapshots(self):
+        try:
+            lines = ["与上一张快照相比增长最多的位置:"]
+            for location, diff, size, count_diff in self.tracer.compare():
+                lines.append(f"  {diff / 1024:>+10.1f} KB  (共 {format_size(size)}, {count_diff:+d} 块)  {location}")
+            self.trace_output.append('\n'.join(lines))
+        except Exception as e:
+            QMessageBox.warning(self, "警告", f"比较快照失败: {str(e)}")
@@ -1,59 +1,197 @@
+import os
+import zlib
+from collections import deque
+
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit,
-                            QPushButton, QLabel, QTreeWidget, QTreeWidgetItem,
+                            QPushButton, QLabel, QTreeView, QComboBox,
                             QTextEdit, QMessageBox, QMenu, QFileDialog, QApplication)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtCore import Qt, QObject, QTimer, QUrl, pyqtSignal
 from PyQt6.QtGui import QAction
-from src.core.parser import HTMLParser
-from src.utils.history import HistoryManager
+from src.core.backends import DEFAULT_BACKEND
+from src.core.cancel import CancelToken, ParseCancelled
+from src.core.doc_cache import get_document_cache
+from src.core.query import QueryError
+from src.core.scheduler import ParseJob, get_scheduler
+from src.core.snapshot import DocumentSnapshot
+from src.core.source import SourceBuffer
+from src.core.timing import span
+from src.ui.element_model import ElementTreeModel
+from src.utils.history import get_history_manager
 from src.utils.logger import get_logger
-import asyncio
-import aiohttp
-from bs4 import BeautifulSoup
 
 logger = get_logger(__name__)
 
-class ParserThread(QThread):
+# 停止输入多久(毫秒)后才执行过滤
+FILTER_DELAY = 200
+# 每个标签页保留的解析耗时记录数
+TIMINGS_HISTORY = 20
+# 过滤模式: (显示名, 查询模式, 输入框提示)
+FILTER_MODES = (
+    ("文本", 'text', "输入标签名、class、id或属性..."),
+    ("CSS", 'css', "输入CSS选择器, 如 div.item > a[href]"),
+    ("XPath", 'xpath', "输入XPath, 如 //div[@id='main']//a"),
+)
+
+class ParseTask(QObject):
+    """把后台调度器的回调转成Qt信号
+
+    回调先经内部信号排队送到界面线程, 在界面线程中确认任务未被取消后
+    才发出对外的信号, 因此已被取代的任务不会覆盖新的结果.
+    """
     finished = pyqtSignal(object)
     error = pyqtSignal(str)
-    progress = pyqtSignal(int)
+    progress = pyqtSignal(int, int)
+    partial = pyqtSignal(object)
+    _relay = pyqtSignal(str, tuple)
+
+    def __init__(self, url, owner, backend=DEFAULT_BACKEND, streaming=True, processes=False, local=False):
+        super().__init__(owner)
+        self._relay.connect(self._deliver)
+        self.job = ParseJob(
+            url, owner, backend, streaming, processes, local,
+            on_progress=lambda *args: self._relay.emit('progress', args),
+            on_partial=lambda *args: self._relay.emit('partial', args),
+            on_finished=lambda *args: self._relay.emit('finished', args),
+            on_error=lambda *args: self._relay.emit('error', args)
+        )
+
+    @property
+    def streaming(self):
+        return self.job.streaming
 
-    def __init__(self, url):
-        super().__init__()
-        self.url = url
+    def start(self):
+        get_scheduler().submit(self.job)
+
+    def cancel(self):
+        get_scheduler().cancel(self.job)
+
+    def _deliver(self, name, args):
+        if not self.job.cancelled:
+            getattr(self, name).emit(*args)
+
+class FilterTask(QObject):
+    """在查询线程中计算过滤结果, 被新查询取代后结果直接丢弃"""
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+    _relay = pyqtSignal(str, object)
 
-    async def fetch_url(self):
+    def __init__(self, snapshot, filter_text, mode, owner, timings=None):
+        super().__init__(owner)
+        self.snapshot = snapshot
+        self.filter_text = filter_text
+        self.mode = mode
+        self.timings = timings
+        self.token = CancelToken()
+        self._relay.connect(self._deliver)
+
+    def start(self):
+        future = get_scheduler().run_query(self._compute)
+        future.add_done_callback(self._done)
+
+    def _compute(self):
+        with span(self.timings, 'filter'):
+            return ElementTreeModel.compute_visible(self.snapshot, self.filter_text, self.token, self.mode)
+
+    def cancel(self):
+        self.token.cancel()
+
+    def _done(self, future):
+        if self.token.cancelled:
+            return
         try:
-            timeout = aiohttp.ClientTimeout(total=10)  # 10秒超时
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(self.url, headers=headers) as response:
-                    if response.status == 200:
-                        return await response.text()
-                    else:
-                        raise Exception(f"HTTP错误: {response.status}")
+            visible = future.result()
+        except ParseCancelled:
+            return
+        except QueryError as e:
+            self._relay.emit('error', str(e))
+            return
         except Exception as e:
-            self.error.emit(str(e))
-            return None
+            logger.error(f"过滤失败: {str(e)}")
+            return
+        self._relay.emit('finished', visible)
+
+    def _deliver(self, name, value):
+        if not self.token.cancelled:
+            getattr(self, name).emit(value)
 
-    def run(self):
+def _pack_snapshot(snapshot):
+    """返回休眠时保存的 (压缩的序列化快照, (压缩的原始内容, 编码))
+
+    本地文件在解析完成后已复制成 bytes, 与下载的内容一样压缩保存.
+    """
+    source = snapshot.source
+    return zlib.compress(snapshot.to_bytes(), 1), (zlib.compress(source.data, 1), source.encoding)
+
+def _unpack_snapshot(hibernated, timings=None):
+    payload, (data, encoding) = hibernated
+    with span(timings, 'restore'):
+        source = SourceBuffer(zlib.decompress(data), encoding)
+        return DocumentSnapshot.from_bytes(zlib.decompress(payload), source)
+
+def _hibernated_size(hibernated):
+    payload, (data, encoding) = hibernated
+    return len(payload) + len(data)
+
+def _document_size(snapshot):
+    """快照及其索引的估算字节数; 要遍历全部字符串和倒排表, 在解析线程池中计算"""
+    return sum(snapshot.memory_usage().values())
+
+class HibernateTask(QObject):
+    """在解析线程池中压缩或还原休眠标签页的文档、估算文档大小, 被取消后结果直接丢弃"""
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+    _relay = pyqtSignal(str, object)
+
+    def __init__(self, func, args, owner):
+        super().__init__(owner)
+        self.func = func
+        self.args = args
+        self.token = CancelToken()
+        self._relay.connect(self._deliver)
+
+    def start(self):
+        future = get_scheduler().run_parse(self.func, *self.args)
+        future.add_done_callback(self._done)
+
+    def cancel(self):
+        self.token.cancel()
+
+    def _done(self, future):
+        if self.token.cancelled:
+            return
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            content = loop.run_until_complete(self.fetch_url())
-            if content:
-                soup = BeautifulSoup(content, 'html.parser')
-                self.finished.emit(soup)
-            loop.close()
+            value = future.result()
         except Exception as e:
-            self.error.emit(str(e))
+            self._relay.emit('error', str(e))
+            return
+        self._relay.emit('finished', value)
+
+    def _deliver(self, name, value):
+        if not self.token.cancelled:
+            getattr(self, name).emit(value)
 
 class ParserWidget(QWidget):
-    def __init__(self, parent=None):
+    # 解析完成或从休眠恢复、估算出文档大小后发出, 标签页管理器据此检查内存预算
+    document_loaded = pyqtSignal()
+
+    def __init__(self, settings=None, parent=None):
         super().__init__(parent)
-        self.parser = HTMLParser()
-        self.history_manager = HistoryManager()
+        self.settings = settings if settings is not None else {}
+        self.streamed = False
+        self.parse_task = None
+        self.filter_task = None
+        self.expected_size = 0
+        # 当前文档和最近几次解析的各阶段耗时
+        self.timings = None
+        self.timings_log = deque(maxlen=TIMINGS_HISTORY)
+        # 休眠后保存的压缩数据, 见 _pack_snapshot; 压缩完成前快照暂存在 hibernating 中
+        self.hibernated = None
+        self.hibernating = None
+        self.hibernate_task = None
+        # 文档(或休眠数据)的估算字节数, 在载入、休眠时更新, 检查内存预算时直接使用
+        self.document_size = 0
+        self.size_task = None
+        self.history_manager = get_history_manager()
         self.common_tags = [
             ('div', '容器'),
             ('p', '段落'),
@@ -76,18 +214,11 @@ class ParserWidget(QWidget):
         # URL输入区域
         url_container = QWidget()
         url_container.setObjectName("urlContainer")
-        url_container.setStyleSheet("""
-            QWidget#urlContainer {
-                background-color: rgba(255, 255, 255, 0.05);
-                border-radius: 8px;
-                padding: 5px;
-            }
-        """)
         url_layout = QHBoxLayout(url_container)
         url_layout.setContentsMargins(10, 10, 10, 10)
         
         url_label = QLabel("URL:")
-        url_label.setStyleSheet("font-weight: bold;")
+        url_label.setObjectName("fieldLabel")
         self.url_input = QLineEdit()
         self.url_input.setPlaceholderText("输入网页地址...")
         self.url_input.setMinimumHeight(35)
@@ -104,36 +235,32 @@ class ParserWidget(QWidget):
         # 过滤区域
         filter_container = QWidget()
         filter_container.setObjectName("filterContainer")
-        filter_container.setStyleSheet("""
-            QWidget#filterContainer {
-                background-color: rgba(255, 255, 255, 0.05);
-                border-radius: 8px;
-                padding: 5px;
-            }
-        """)
         filter_layout = QHBoxLayout(filter_container)
         filter_layout.setContentsMargins(10, 10, 10, 10)
         
         filter_label = QLabel("过滤:")
-        filter_label.setStyleSheet("font-weight: bold;")
+        filter_label.setObjectName("fieldLabel")
+        self.filter_mode = QComboBox()
+        for name, mode, _ in FILTER_MODES:
+            self.filter_mode.addItem(name, mode)
+        self.filter_mode.setMinimumHeight(35)
+        self.filter_mode.currentIndexChanged.connect(self.on_filter_mode_changed)
         self.filter_input = QLineEdit()
-        self.filter_input.setPlaceholderText("输入标签名、class、id或属性...")
+        self.filter_input.setPlaceholderText(FILTER_MODES[0][2])
         self.filter_input.setMinimumHeight(35)
-        self.filter_input.textChanged.connect(self.filter_tree)
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY)
+        self.filter_timer.timeout.connect(lambda: self.filter_tree(self.filter_input.text()))
+        self.filter_input.textChanged.connect(lambda: self.filter_timer.start())
         
         filter_layout.addWidget(filter_label)
+        filter_layout.addWidget(self.filter_mode)
         filter_layout.addWidget(self.filter_input)
         
         # 快捷标签按钮区域
         tags_container = QWidget()
         tags_container.setObjectName("tagsContainer")
-        tags_container.setStyleSheet("""
-            QWidget#tagsContainer {
-                background-color: rgba(255, 255, 255, 0.05);
-                border-radius: 8px;
-                padding: 5px;
-            }
-        """)
         tags_layout = QHBoxLayout(tags_container)
         tags_layout.setSpacing(8)
         tags_layout.setContentsMargins(10, 10, 10, 10)
@@ -143,77 +270,39 @@ class ParserWidget(QWidget):
             tag_btn.setToolTip(tooltip)
             tag_btn.setMinimumHeight(30)
             tag_btn.setMinimumWidth(45)
-            tag_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: rgba(52, 152, 219, 0.1);
-                    border: 1px solid rgba(52, 152, 219, 0.2);
-                    border-radius: 4px;
-                    padding: 2px 8px;
-                    font-size: 11px;
-                    color: #3498db;
-                }
-                QPushButton:hover {
-                    background-color: rgba(52, 152, 219, 0.2);
-                    border-color: rgba(52, 152, 219, 0.3);
-                }
-                QPushButton:pressed {
-                    background-color: rgba(52, 152, 219, 0.3);
-                }
-            """)
+            tag_btn.setObjectName("tagButton")
             tag_btn.clicked.connect(lambda checked, t=tag: self.apply_tag_filter(t))
             tags_layout.addWidget(tag_btn)
         
         tags_layout.addStretch()
         
         # 树形视图
-        self.tree = QTreeWidget()
-        self.tree.setHeaderLabels(["标签", "属性"])
+        self.tree_model = ElementTreeModel(self)
+        self.tree = QTreeView()
+        self.tree.setModel(self.tree_model)
+        self.tree.setUniformRowHeights(True)
         self.tree.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self.show_context_menu)
-        self.tree.setStyleSheet("""
-            QTreeWidget {
-                border: 1px solid rgba(255, 255, 255, 0.1);
-                border-radius: 8px;
-                padding: 5px;
-            }
-            QTreeWidget::item {
-                padding: 5px;
-                margin: 2px 0;
-            }
-            QTreeWidget::item:selected {
-                background-color: rgba(52, 152, 219, 0.2);
-                border-radius: 4px;
-            }
-            QTreeWidget::item:hover {
-                background-color: rgba(52, 152, 219, 0.1);
-                border-radius: 4px;
-            }
-        """)
         
+        # 解析进度和性能面板入口
+        status_layout = QHBoxLayout()
+        self.status_label = QLabel()
+        perf_button = QPushButton("性能")
+        perf_button.setToolTip("查看各阶段耗时")
+        perf_button.clicked.connect(self.show_performance)
+        status_layout.addWidget(self.status_label, stretch=1)
+        status_layout.addWidget(perf_button)
+
         # 预览区域
         preview_container = QWidget()
         preview_container.setObjectName("previewContainer")
-        preview_container.setStyleSheet("""
-            QWidget#previewContainer {
-                background-color: rgba(255, 255, 255, 0.05);
-                border-radius: 8px;
-                padding: 5px;
-            }
-        """)
         preview_layout = QVBoxLayout(preview_container)
         preview_layout.setContentsMargins(10, 10, 10, 10)
         
         preview_label = QLabel("标签预览:")
-        preview_label.setStyleSheet("font-weight: bold;")
+        preview_label.setObjectName("fieldLabel")
         self.preview = QTextEdit()
         self.preview.setReadOnly(True)
-        self.preview.setStyleSheet("""
-            QTextEdit {
-                border: 1px solid rgba(255, 255, 255, 0.1);
-                border-radius: 4px;
-                padding: 5px;
-            }
-        """)
         
         preview_layout.addWidget(preview_label)
         preview_layout.addWidget(self.preview)
@@ -223,6 +312,7 @@ class ParserWidget(QWidget):
         main_layout.addWidget(filter_container)
         main_layout.addWidget(tags_container)
         main_layout.addWidget(self.tree, stretch=3)
+        main_layout.addLayout(status_layout)
         main_layout.addWidget(preview_container, stretch=1)
 
     def parse_url(self):
@@ -230,17 +320,47 @@ class ParserWidget(QWidget):
         if not url:
             QMessageBox.warning(self, "警告", "请输入URL")
             return
+
+        # 本地文件直接解析
+        if url.startswith('file://'):
+            url = QUrl(url).toLocalFile()
+        if os.path.isfile(url):
+            self.open_file(url)
+            return
             
         # 确保URL包含协议
         if not url.startswith(('http://', 'https://')):
             url = 'https://' + url
             self.url_input.setText(url)
-            
+
+        self.start_parse(url)
+
+    def open_file(self, path):
+        """在后台按内存映射解析本地文件"""
+        self.url_input.setText(path)
+        self.start_parse(path, local=True)
+
+    def start_parse(self, url, local=False):
         try:
-            self.parser_thread = ParserThread(url)
-            self.parser_thread.finished.connect(self.handle_parsing_finished)
-            self.parser_thread.error.connect(self.handle_parsing_error)
-            self.parser_thread.start()
+            # 取消仍在进行的上一次解析
+            self.cancel_parse()
+            self.parse_task = ParseTask(
+                url,
+                self,
+                self.settings.get('parser_backend', DEFAULT_BACKEND),
+                self.settings.get('streaming_parse', True),
+                self.settings.get('process_parse', False),
+                local
+            )
+            self.expected_size = os.path.getsize(url) if local else 0
+            self.streamed = False
+            self.timings = self.parse_task.job.timings
+            self.timings_log.append(self.timings)
+            self.parse_task.partial.connect(self.handle_parsing_partial)
+            self.parse_task.progress.connect(self.handle_parsing_progress)
+            self.parse_task.finished.connect(self.handle_parsing_finished)
+            self.parse_task.error.connect(self.handle_parsing_error)
+            self.parse_task.start()
             
             # 添加到历史记录
             self.history_manager.add_entry(url)
@@ -248,52 +368,230 @@ class ParserWidget(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "错误", f"创建解析线程失败: {str(e)}")
 
-    def handle_parsing_finished(self, soup):
-        self.update_tree(soup)
+    def cancel_parse(self):
+        if self.parse_task is not None:
+            self.parse_task.cancel()
+            self.parse_task.deleteLater()
+            self.parse_task = None
+
+    def handle_parsing_partial(self, snapshot):
+        with span(self.timings, 'model'):
+            if self.streamed:
+                self.tree_model.update_snapshot(snapshot)
+            else:
+                self.tree_model.set_snapshot(snapshot)
+                self.streamed = True
+
+    def handle_parsing_progress(self, received, nodes):
+        if self.expected_size:
+            percent = received * 100 // self.expected_size
+            self.status_label.setText(f"已解析 {percent}% ({received / 1024:.1f} KB), {nodes} 个元素")
+        else:
+            self.status_label.setText(f"已接收 {received / 1024:.1f} KB, {nodes} 个元素")
+
+    def handle_parsing_finished(self, snapshot):
+        timings = self.timings
+        if self.streamed:
+            # 流式解析的部分结果与最终快照下标一致, 直接增量更新
+            with span(timings, 'model'):
+                self.tree_model.update_snapshot(snapshot)
+            if self.filter_input.text():
+                self.filter_tree(self.filter_input.text())
+        else:
+            self.update_tree(snapshot)
+        if timings is not None:
+            self.status_label.setText(
+                f"解析完成: {timings.nodes} 个元素, {timings.bytes / 1024:.1f} KB, "
+                f"用时 {timings.elapsed * 1000:.0f} ms")
+            logger.info(f"解析耗时 {timings.url}: {timings.summary()}")
+        self.release_parse_task()
+        self.measure_document(snapshot)
 
     def handle_parsing_error(self, error_msg):
+        self.release_parse_task()
         QMessageBox.critical(self, "错误", f"解析失败: {error_msg}")
 
-    def update_tree(self, soup):
-        self.tree.clear()
-        self.build_tree_items(soup, self.tree)
+    def release_parse_task(self):
+        """任务已经结束, 只释放不取消"""
+        if self.parse_task is not None:
+            self.parse_task.deleteLater()
+            self.parse_task = None
 
-    def build_tree_items(self, element, parent):
-        if element.name is None:
-            return
-            
-        attrs = ' '.join([f'{k}="{v}"' for k, v in element.attrs.items()])
-        item = QTreeWidgetItem(parent)
-        item.setText(0, element.name)
-        item.setText(1, attrs)
-        item.setData(0, Qt.ItemDataRole.UserRole, str(element))
-        
-        for child in element.children:
-            if child.name is not None:
-                self.build_tree_items(child, item)
+    def update_tree(self, snapshot):
+        with span(self.timings, 'model'):
+            self.tree_model.set_snapshot(snapshot)
+        if self.filter_input.text():
+            self.filter_tree(self.filter_input.text())
 
     def filter_tree(self, filter_text):
-        filter_text = filter_text.lower()
-        
-        def filter_items(item):
-            tag_text = item.text(0).lower()
-            attrs_text = item.text(1).lower()
-            matches = filter_text in tag_text or filter_text in attrs_text
-            
-            child_visible = False
-            for i in range(item.childCount()):
-                if filter_items(item.child(i)):
-                    child_visible = True
-            
-            is_visible = matches or child_visible
-            item.setHidden(not is_visible)
-            return is_visible
-        
-        root = self.tree.invisibleRootItem()
-        for i in range(root.childCount()):
-            filter_items(root.child(i))
+        """在后台计算过滤结果, 完成后一次性应用到模型"""
+        self.filter_timer.stop()
+        self.cancel_filter()
+        snapshot = self.tree_model.snapshot
+        if not filter_text.strip() or snapshot is None:
+            self.tree_model.set_visible(None)
+            return
+        self.filter_task = FilterTask(snapshot, filter_text, self.filter_mode.currentData(), self, self.timings)
+        self.filter_task.finished.connect(self.handle_filter_finished)
+        self.filter_task.error.connect(self.handle_filter_error)
+        self.filter_task.start()
+
+    def cancel_filter(self):
+        if self.filter_task is not None:
+            self.filter_task.cancel()
+            self.filter_task.deleteLater()
+            self.filter_task = None
+
+    def handle_filter_finished(self, visible):
+        # 换成其他文档时会重新过滤并取消本任务; 流式解析中快照下标不变, 结果仍然有效
+        with span(self.timings, 'filter_apply'):
+            self.tree_model.set_visible(visible)
+        self.status_label.setText(f"过滤后显示 {len(visible)} 个元素")
+
+    def handle_filter_error(self, message):
+        self.status_label.setText(f"查询语法错误: {message}")
+
+    def memory_usage(self):
+        """估算本标签页占用的内存, 返回 (已创建的树行数, {项目: 字节})
+
+        快照可能与解析缓存或其他标签页共用, 这里按本标签页引用的全部计入.
+        """
+        usage = {'tree': 0, 'strings': 0, 'source': 0, 'index': 0, 'hibernated': 0}
+        snapshot = self.tree_model.snapshot or self.hibernating
+        if snapshot is not None:
+            usage.update(snapshot.memory_usage())
+        if self.hibernated is not None:
+            usage['hibernated'] = _hibernated_size(self.hibernated)
+        rows, usage['model'] = self.tree_model.memory_usage()
+        # 预览框中的HTML, 按每字符2字节估算
+        usage['preview'] = self.preview.document().characterCount() * 2
+        return rows, usage
+
+    def measure_document(self, snapshot):
+        """在后台估算文档大小, 完成后发出 document_loaded"""
+        self.cancel_size_task()
+        self.size_task = HibernateTask(_document_size, (snapshot,), self)
+        self.size_task.finished.connect(self.handle_measured)
+        self.size_task.error.connect(self.handle_measure_error)
+        self.size_task.start()
+
+    def handle_measured(self, size):
+        self.release_size_task()
+        self.document_size = size
+        self.document_loaded.emit()
+
+    def handle_measure_error(self, message):
+        logger.error(f"估算文档大小失败: {message}")
+        self.release_size_task()
+
+    def cancel_size_task(self):
+        if self.size_task is not None:
+            self.size_task.cancel()
+            self.release_size_task()
+
+    def release_size_task(self):
+        self.size_task.deleteLater()
+        self.size_task = None
+
+    def hibernate(self):
+        """丢弃树模型, 在后台把快照压缩保存, 之后只保留压缩数据; 返回是否开始休眠
+
+        正在解析、正在休眠或恢复、没有文档的标签页不休眠.
+        """
+        snapshot = self.tree_model.snapshot
+        if snapshot is None or self.parse_task is not None or self.hibernate_task is not None:
+            return False
+        self.filter_timer.stop()
+        self.cancel_filter()
+        self.cancel_size_task()
+        self.tree_model.set_snapshot(None)
+        # 压缩完成前仍持有快照, 这期间切换回来直接使用
+        self.hibernating = snapshot
+        self.hibernate_task = HibernateTask(_pack_snapshot, (snapshot,), self)
+        self.hibernate_task.finished.connect(self.handle_hibernated)
+        self.hibernate_task.error.connect(self.handle_hibernate_error)
+        self.hibernate_task.start()
+        self.status_label.setText("已休眠, 切换到本标签页时恢复")
+        return True
+
+    def handle_hibernated(self, hibernated):
+        self.release_hibernate_task()
+        self.hibernated = hibernated
+        self.document_size = _hibernated_size(hibernated)
+        # 解析缓存的内存层也引用着同一个快照
+        cache = get_document_cache()
+        if cache:
+            cache.release(self.hibernating)
+        self.hibernating = None
+
+    def handle_hibernate_error(self, message):
+        logger.error(f"标签页休眠失败: {message}")
+        self.release_hibernate_task()
+        snapshot, self.hibernating = self.hibernating, None
+        self.update_tree(snapshot)
+
+    def restore(self):
+        """从休眠中恢复文档; 树恢复为折叠状态, 过滤条件重新应用"""
+        if self.hibernating is not None:
+            self.cancel_hibernate_task()
+            snapshot, self.hibernating = self.hibernating, None
+            self.handle_restored(snapshot)
+            return
+        if self.hibernated is None or self.hibernate_task is not None:
+            return
+        self.hibernate_task = HibernateTask(_unpack_snapshot, (self.hibernated, self.timings), self)
+        self.hibernate_task.finished.connect(self.handle_restored)
+        self.hibernate_task.error.connect(self.handle_restore_error)
+        self.hibernate_task.start()
+        self.status_label.setText("正在恢复...")
+
+    def handle_restored(self, snapshot):
+        self.release_hibernate_task()
+        self.hibernated = None
+        self.update_tree(snapshot)
+        self.status_label.setText(f"已恢复: {len(snapshot) - 1} 个元素")
+        self.measure_document(snapshot)
+
+    def handle_restore_error(self, message):
+        logger.error(f"恢复休眠的标签页失败: {message}")
+        self.release_hibernate_task()
+        self.hibernated = None
+        self.document_size = 0
+        self.status_label.setText("恢复失败, 请重新解析")
+
+    def cancel_hibernate_task(self):
+        if self.hibernate_task is not None:
+            self.hibernate_task.cancel()
+            self.release_hibernate_task()
+
+    def release_hibernate_task(self):
+        self.hibernate_task.deleteLater()
+        self.hibernate_task = None
+
+    def dispose(self):
+        """关闭标签页时调用: 停止解析、过滤和休眠任务, 释放文档"""
+        self.filter_timer.stop()
+        self.cancel_filter()
+        self.cancel_parse()
+        self.cancel_hibernate_task()
+        self.cancel_size_task()
+        self.hibernated = None
+        self.hibernating = None
+        self.document_size = 0
+        self.tree_model.set_snapshot(None)
+
+    def show_performance(self):
+        from src.ui.performance_dialog import PerformanceDialog
+        PerformanceDialog(self, self).exec()
+
+    def on_filter_mode_changed(self, row):
+        self.filter_input.setPlaceholderText(FILTER_MODES[row][2])
+        if self.filter_input.text():
+            self.filter_tree(self.filter_input.text())
 
     def apply_tag_filter(self, tag):
+        if self.filter_mode.currentData() == 'xpath':
+            tag = f'//{tag}'
         self.filter_input.setText(tag)
 
     def show_context_menu(self, position):
@@ -309,13 +607,11 @@ class ParserWidget(QWidget):
         menu.exec(self.tree.viewport().mapToGlobal(position))
 
     def copy_current_tag(self):
-        item = self.tree.currentItem()
-        if item:
-            tag_html = item.data(0, Qt.ItemDataRole.UserRole)
+        tag_html = self.tree_model.outer_html(self.tree.currentIndex())
+        if tag_html is not None:
             QApplication.clipboard().setText(tag_html)
 
     def preview_current_tag(self):
-        item = self.tree.currentItem()
-        if item:
-            tag_html = item.data(0, Qt.ItemDataRole.UserRole)
+        tag_html = self.tree_model.outer_html(self.tree.currentIndex())
+        if tag_html is not None:
             self.preview.setText(tag_html)
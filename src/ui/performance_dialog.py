@@ -0,0 +1,93 @@
+import json
+
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+                             QTableWidgetItem, QFileDialog, QMessageBox, QComboBox, QHeaderView)
+from PyQt6.QtCore import Qt
+
+from src.core.timing import STAGE_LABELS
+
+
+class PerformanceDialog(QDialog):
+    """显示标签页最近几次解析各阶段的耗时, 可导出为JSON"""
+
+    def __init__(self, parser_widget, parent=None):
+        super().__init__(parent)
+        self.parser_widget = parser_widget
+        self.init_ui()
+        self.refresh()
+
+    def init_ui(self):
+        self.setWindowTitle("性能")
+        self.resize(560, 420)
+        layout = QVBoxLayout(self)
+
+        self.record_combo = QComboBox()
+        self.record_combo.currentIndexChanged.connect(self.show_record)
+        self.summary_label = QLabel()
+        self.summary_label.setWordWrap(True)
+
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(["阶段", "耗时(ms)", "次数", "占比"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+
+        button_layout = QHBoxLayout()
+        refresh_button = QPushButton("刷新")
+        refresh_button.clicked.connect(self.refresh)
+        export_button = QPushButton("导出JSON")
+        export_button.clicked.connect(self.export_json)
+        close_button = QPushButton("关闭")
+        close_button.clicked.connect(self.accept)
+        button_layout.addWidget(refresh_button)
+        button_layout.addWidget(export_button)
+        button_layout.addStretch()
+        button_layout.addWidget(close_button)
+
+        layout.addWidget(self.record_combo)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.table)
+        layout.addLayout(button_layout)
+
+    def records(self):
+        # 最近一次排在最前
+        return list(reversed(self.parser_widget.timings_log))
+
+    def refresh(self):
+        self.record_combo.blockSignals(True)
+        self.record_combo.clear()
+        for timings in self.records():
+            self.record_combo.addItem(f"{timings.started}  {timings.url}")
+        self.record_combo.blockSignals(False)
+        self.show_record(0)
+
+    def show_record(self, row):
+        records = self.records()
+        if not 0 <= row < len(records):
+            self.summary_label.setText("还没有解析记录")
+            self.table.setRowCount(0)
+            return
+        timings = records[row]
+        total = timings.elapsed * 1000 if timings.elapsed is not None else None
+        self.summary_label.setText(
+            f"{timings.bytes / 1024:.1f} KB, {timings.nodes} 个元素, "
+            + (f"总耗时 {total:.1f} ms" if total is not None else "尚未完成"))
+        stages = timings.stages()
+        self.table.setRowCount(len(stages))
+        for i, (stage, ms, count) in enumerate(stages):
+            share = f"{ms * 100 / total:.1f}%" if total else "-"
+            for column, value in enumerate((STAGE_LABELS.get(stage, stage), f"{ms:.1f}", str(count), share)):
+                item = QTableWidgetItem(value)
+                if column:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(i, column, item)
+
+    def export_json(self):
+        file_name, _ = QFileDialog.getSaveFileName(self, "导出性能数据", "timings.json", "JSON Files (*.json)")
+        if not file_name:
+            return
+        try:
+            with open(file_name, 'w', encoding='utf-8') as f:
+                json.dump([timings.to_dict() for timings in self.records()], f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
@@ -1,13 +1,20 @@
 #coding=utf-8
-from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QLabel, QComboBox,
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QLabel, QComboBox, QCheckBox,
                             QPushButton, QFormLayout, QHBoxLayout, QSpinBox, QMessageBox)
 from PyQt6.QtCore import Qt
+from src.core.backends import DEFAULT_BACKEND, available_backends
+from src.core.doc_cache import DEFAULT_DISK_MB
+from src.core.http_cache import DEFAULT_CACHE_MB
+from src.ui.tab_widget import DEFAULT_TAB_MEMORY_MB
+from src.ui.theme import preview_stylesheet
 from src.utils.language import LanguageManager
 
 class SettingsDialog(QDialog):
     def __init__(self, settings, parent=None):
         super().__init__(parent)
         self.settings = settings
+        # 确定后的设置值, 由调用者交给 SettingsManager.update
+        self.values = {}
         self.lang_manager = LanguageManager()
         self.init_ui()
         
@@ -45,11 +52,44 @@ class SettingsDialog(QDialog):
         self.timeout_spin.setRange(1, 60)
         self.timeout_spin.setValue(self.settings.get('timeout', 10))
         form_layout.addRow(timeout_label, self.timeout_spin)
+
+        cache_label = QLabel(self.lang_manager.get_text("settings_http_cache"))
+        self.cache_spin = QSpinBox()
+        self.cache_spin.setRange(0, 4096)
+        self.cache_spin.setValue(self.settings.get('http_cache_mb', DEFAULT_CACHE_MB))
+        form_layout.addRow(cache_label, self.cache_spin)
+
+        doc_cache_label = QLabel(self.lang_manager.get_text("settings_doc_cache"))
+        self.doc_cache_spin = QSpinBox()
+        self.doc_cache_spin.setRange(0, 8192)
+        self.doc_cache_spin.setValue(self.settings.get('doc_cache_mb', DEFAULT_DISK_MB))
+        form_layout.addRow(doc_cache_label, self.doc_cache_spin)
+
+        tab_memory_label = QLabel(self.lang_manager.get_text("settings_tab_memory"))
+        self.tab_memory_spin = QSpinBox()
+        self.tab_memory_spin.setRange(0, 65536)
+        self.tab_memory_spin.setValue(self.settings.get('tab_memory_mb', DEFAULT_TAB_MEMORY_MB))
+        form_layout.addRow(tab_memory_label, self.tab_memory_spin)
+
+        # 解析引擎设置
+        backend_label = QLabel(self.lang_manager.get_text("settings_parser_backend"))
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItems(available_backends())
+        self.backend_combo.setCurrentText(self.settings.get('parser_backend', DEFAULT_BACKEND))
+        form_layout.addRow(backend_label, self.backend_combo)
+
+        self.streaming_check = QCheckBox(self.lang_manager.get_text("settings_streaming"))
+        self.streaming_check.setChecked(self.settings.get('streaming_parse', True))
+        form_layout.addRow(self.streaming_check)
+
+        self.process_check = QCheckBox(self.lang_manager.get_text("settings_process_parse"))
+        self.process_check.setChecked(self.settings.get('process_parse', False))
+        form_layout.addRow(self.process_check)
         
         # 历史记录设置
         history_label = QLabel(self.lang_manager.get_text("settings_history"))
         self.history_spin = QSpinBox()
-        self.history_spin.setRange(10, 1000)
+        self.history_spin.setRange(10, 1000000)
         self.history_spin.setValue(self.settings.get('max_history', 100))
         form_layout.addRow(history_label, self.history_spin)
         
@@ -67,31 +107,7 @@ class SettingsDialog(QDialog):
         self.preview_text.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
         # 根据当前主题设置预览样式
-        current_theme = self.settings.get('theme', '浅色')
-        if current_theme == '浅色':
-            self.preview_text.setStyleSheet("""
-                QLabel {
-                    padding: 10px;
-                    border: 1px solid #ccc;
-                    border-radius: 5px;
-                    background-color: #f5f5f5;
-                    color: #333;
-                    min-height: 40px;
-                    margin: 5px;
-                }
-            """)
-        else:
-            self.preview_text.setStyleSheet("""
-                QLabel {
-                    padding: 10px;
-                    border: 1px solid #505050;
-                    border-radius: 5px;
-                    background-color: #2e2e2e;
-                    color: #ffffff;
-                    min-height: 40px;
-                    margin: 5px;
-                }
-            """)
+        self.preview_text.setStyleSheet(preview_stylesheet(self.settings.get('theme')))
         
         form_layout.addRow(font_size_label, self.font_size_spin)
         form_layout.addRow(self.preview_label)
@@ -142,12 +158,20 @@ class SettingsDialog(QDialog):
         
     def save_settings(self):
         try:
-            # 保存设置
-            self.settings['theme'] = self.theme_combo.currentText()
-            self.settings['language'] = self.language_combo.currentText()
-            self.settings['timeout'] = self.timeout_spin.value()
-            self.settings['max_history'] = self.history_spin.value()
-            self.settings['font_size'] = self.font_size_spin.value()
+            # 收集设置
+            self.values = {
+                'theme': self.theme_combo.currentText(),
+                'language': self.language_combo.currentText(),
+                'timeout': self.timeout_spin.value(),
+                'http_cache_mb': self.cache_spin.value(),
+                'doc_cache_mb': self.doc_cache_spin.value(),
+                'tab_memory_mb': self.tab_memory_spin.value(),
+                'parser_backend': self.backend_combo.currentText(),
+                'streaming_parse': self.streaming_check.isChecked(),
+                'process_parse': self.process_check.isChecked(),
+                'max_history': self.history_spin.value(),
+                'font_size': self.font_size_spin.value()
+            }
             
             # 接受对话框
             self.accept()
@@ -160,27 +184,4 @@ class SettingsDialog(QDialog):
         
     def on_theme_changed(self, theme):
         """当主题改变时更新预览样式"""
-        if theme == '浅色':
-            self.preview_text.setStyleSheet("""
-                QLabel {
-                    padding: 10px;
-                    border: 1px solid #ccc;
-                    border-radius: 5px;
-                    background-color: #f5f5f5;
-                    color: #333;
-                    min-height: 40px;
-                    margin: 5px;
-                }
-            """)
-        else:
-            self.preview_text.setStyleSheet("""
-                QLabel {
-                    padding: 10px;
-                    border: 1px solid #505050;
-                    border-radius: 5px;
-                    background-color: #2e2e2e;
-                    color: #ffffff;
-                    min-height: 40px;
-                    margin: 5px;
-                }
-            """)
\ No newline at end of file
+        self.preview_text.setStyleSheet(preview_stylesheet(theme))
@@ -1,57 +1,69 @@
 from PyQt6.QtWidgets import QTabWidget
-from PyQt6.QtCore import Qt
-from src.ui.parser_widget import ParserWidget
+from PyQt6.QtCore import Qt, QTimer
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 所有标签页的文档合计超过该值(MB)时, 最久未使用的后台标签页进入休眠; 0 表示不限制
+DEFAULT_TAB_MEMORY_MB = 512
 
 class TabWidget(QTabWidget):
-    def __init__(self, parent=None):
+    def __init__(self, settings=None, parent=None):
         super().__init__(parent)
+        self.settings = settings if settings is not None else {}
+        # 按最近激活的顺序排列的标签页, 最近的在最后
+        self.recent = []
         self.setTabsClosable(True)
         self.tabCloseRequested.connect(self.close_tab)
+        self.currentChanged.connect(self.on_current_changed)
         
-        # 设置样式表
-        self.setStyleSheet("""
-            QTabWidget::pane {
-                border: 1px solid #444444;
-                background: #2b2b2b;
-            }
-            QTabWidget::tab-bar {
-                left: 5px;
-            }
-            QTabBar::tab {
-                background: #353535;
-                color: #ffffff;
-                padding: 8px 12px;
-                margin-right: 2px;
-                border: 1px solid #444444;
-                border-bottom: none;
-                border-top-left-radius: 4px;
-                border-top-right-radius: 4px;
-            }
-            QTabBar::tab:selected {
-                background: #2b2b2b;
-                border-bottom: none;
-            }
-            QTabBar::tab:hover {
-                background: #404040;
-            }
-            QTabBar::close-button {
-                image: url(resources/close.png);
-                subcontrol-position: right;
-            }
-            QTabBar::close-button:hover {
-                background: #ff4444;
-                border-radius: 2px;
-            }
-        """)
-        
-        # 创建第一个标签页
-        self.add_tab()
+        # 第一个标签页在窗口显示后再创建, 解析相关的模块也到那时才导入
+        QTimer.singleShot(0, self.add_tab)
         
     def add_tab(self):
-        parser_widget = ParserWidget()
+        from src.ui.parser_widget import ParserWidget
+        parser_widget = ParserWidget(self.settings)
+        parser_widget.document_loaded.connect(self.enforce_memory_budget)
         index = self.addTab(parser_widget, "新标签页")
         self.setCurrentIndex(index)
         
+    def on_current_changed(self, index):
+        widget = self.widget(index)
+        if widget is None:
+            return
+        # 当前可见标签页的解析任务优先执行
+        from src.core.scheduler import get_scheduler
+        get_scheduler().set_active_owner(widget)
+        if widget in self.recent:
+            self.recent.remove(widget)
+        self.recent.append(widget)
+        widget.restore()
+        self.enforce_memory_budget()
+
+    def enforce_memory_budget(self):
+        """超出预算时按最久未使用的顺序让后台标签页休眠, 当前标签页不休眠"""
+        budget = self.settings.get('tab_memory_mb', DEFAULT_TAB_MEMORY_MB) * 1024 * 1024
+        if budget <= 0:
+            return
+        # 各标签页的文档大小在载入和休眠时已在后台估算好, 这里不遍历文档
+        sizes = {widget: widget.document_size for widget in self.recent}
+        total = sum(sizes.values())
+        current = self.currentWidget()
+        for widget in self.recent:
+            if total <= budget:
+                break
+            if widget is current or not widget.hibernate():
+                continue
+            # 在后台压缩, 压缩后的数据通常只有原来的几分之一, 这里按全部释放估算
+            total -= sizes[widget]
+            logger.info(f"标签页 {widget.url_input.text()} 进入休眠, 约 {sizes[widget] / 1024 / 1024:.1f} MB")
+
     def close_tab(self, index):
         if self.count() > 1:
+            widget = self.widget(index)
             self.removeTab(index)
+            if widget in self.recent:
+                self.recent.remove(widget)
+            # 停止未完成的解析和过滤, 释放文档, 并销毁控件
+            widget.dispose()
+            widget.deleteLater()
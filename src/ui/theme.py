@@ -0,0 +1,270 @@
+"""界面主题
+
+每种 (主题, 字号) 只生成一次样式表, 在应用程序级别统一设置; 颜色放在调色板中,
+样式表通过 palette(...) 引用. 各控件不再单独设置样式表, 新建标签页时不必为每个控件
+解析一遍样式表, 切换主题时也只重新 polish 一次.
+"""
+import time
+from functools import lru_cache
+
+from PyQt6.QtGui import QColor, QPalette
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_THEME = 'light'
+DEFAULT_FONT_SIZE = 12
+
+# 设置中保存的是设置对话框中显示的名称, 随界面语言不同
+THEME_NAMES = {
+    '浅色': 'light', 'Light': 'light', 'light': 'light',
+    '深色': 'dark', 'Dark': 'dark', 'dark': 'dark',
+}
+
+THEMES = {
+    'light': {
+        'window': '#f5f5f5',
+        'base': '#ffffff',
+        'alternate': '#f0f0f0',
+        'text': '#2c3e50',
+        'placeholder': '#95a5a6',
+        'border': '#e0e0e0',
+        'handle': '#c0c0c0',
+        'handle_hover': '#a0a0a0',
+        'accent': '#3498db',
+        'accent_hover': '#2980b9',
+        'accent_pressed': '#2472a4',
+        'accent_text': '#ffffff',
+        # 快捷标签按钮的文字和半透明底色
+        'tag': '#3498db',
+    },
+    'dark': {
+        'window': '#1e1e1e',
+        'base': '#2d2d2d',
+        'alternate': '#353535',
+        'text': '#ffffff',
+        'placeholder': '#8a8a8a',
+        'border': '#3d3d3d',
+        'handle': '#4d4d4d',
+        'handle_hover': '#5d5d5d',
+        'accent': '#0d47a1',
+        'accent_hover': '#1565c0',
+        'accent_pressed': '#0a3d87',
+        'accent_text': '#ffffff',
+        'tag': '#5dade2',
+    },
+}
+
+STYLESHEET = """
+QMainWindow, QDialog {{
+    background-color: palette(window);
+}}
+QWidget {{
+    background-color: palette(base);
+    color: palette(text);
+    font-size: {font_size}pt;
+}}
+QLabel {{
+    background-color: transparent;
+}}
+QLabel#fieldLabel {{
+    font-weight: bold;
+}}
+QWidget#urlContainer, QWidget#filterContainer, QWidget#tagsContainer, QWidget#previewContainer {{
+    background-color: palette(alternate-base);
+    border-radius: 8px;
+    padding: 5px;
+}}
+QMenuBar {{
+    border-bottom: 1px solid palette(mid);
+}}
+QMenuBar::item:selected, QMenu::item:selected {{
+    background-color: palette(mid);
+    border-radius: 4px;
+}}
+QMenu {{
+    border: 1px solid palette(mid);
+    padding: 5px;
+}}
+QPushButton {{
+    background-color: palette(highlight);
+    color: palette(highlighted-text);
+    border: none;
+    padding: 8px 15px;
+    border-radius: 4px;
+}}
+QPushButton:hover {{
+    background-color: {accent_hover};
+}}
+QPushButton:pressed {{
+    background-color: {accent_pressed};
+}}
+QPushButton#tagButton {{
+    background-color: rgba({tag_rgb}, 0.1);
+    border: 1px solid rgba({tag_rgb}, 0.2);
+    border-radius: 4px;
+    padding: 2px 8px;
+    font-size: 11px;
+    color: {tag};
+}}
+QPushButton#tagButton:hover {{
+    background-color: rgba({tag_rgb}, 0.2);
+    border-color: rgba({tag_rgb}, 0.3);
+}}
+QPushButton#tagButton:pressed {{
+    background-color: rgba({tag_rgb}, 0.3);
+}}
+QLineEdit {{
+    padding: 8px;
+    border: 1px solid palette(mid);
+    border-radius: 4px;
+}}
+QLineEdit:focus {{
+    border: 1px solid palette(highlight);
+}}
+QTreeView {{
+    border: 1px solid palette(mid);
+    border-radius: 8px;
+    padding: 5px;
+}}
+QTreeView::item {{
+    padding: 5px;
+    margin: 2px 0;
+}}
+QTreeView::item:selected {{
+    background-color: palette(highlight);
+    color: palette(highlighted-text);
+    border-radius: 4px;
+}}
+QTreeView::item:hover {{
+    background-color: rgba({accent_rgb}, 0.1);
+    border-radius: 4px;
+}}
+QTextEdit {{
+    border: 1px solid palette(mid);
+    border-radius: 4px;
+    padding: 5px;
+}}
+QTabWidget::pane {{
+    border: 1px solid palette(mid);
+}}
+QTabWidget::tab-bar {{
+    left: 5px;
+}}
+QTabBar::tab {{
+    background: palette(alternate-base);
+    padding: 8px 12px;
+    margin-right: 2px;
+    border: 1px solid palette(mid);
+    border-bottom: none;
+    border-top-left-radius: 4px;
+    border-top-right-radius: 4px;
+}}
+QTabBar::tab:selected {{
+    background: palette(base);
+}}
+QTabBar::tab:hover {{
+    background: palette(mid);
+}}
+QScrollBar:vertical {{
+    border: none;
+    background: palette(alternate-base);
+    width: 10px;
+    border-radius: 5px;
+}}
+QScrollBar::handle:vertical {{
+    background: palette(dark);
+    border-radius: 5px;
+}}
+QScrollBar::handle:vertical:hover {{
+    background: palette(shadow);
+}}
+"""
+
+
+def theme_key(theme):
+    """把设置中的主题名称(浅色/Light/light ...)转换为 THEMES 的键"""
+    return THEME_NAMES.get(theme, DEFAULT_THEME)
+
+
+def _rgb(color):
+    color = QColor(color)
+    return f"{color.red()}, {color.green()}, {color.blue()}"
+
+
+@lru_cache(maxsize=None)
+def build_palette(theme):
+    colors = THEMES[theme_key(theme)]
+    palette = QPalette()
+    roles = {
+        QPalette.ColorRole.Window: colors['window'],
+        QPalette.ColorRole.WindowText: colors['text'],
+        QPalette.ColorRole.Base: colors['base'],
+        QPalette.ColorRole.AlternateBase: colors['alternate'],
+        QPalette.ColorRole.Text: colors['text'],
+        QPalette.ColorRole.PlaceholderText: colors['placeholder'],
+        QPalette.ColorRole.Button: colors['base'],
+        QPalette.ColorRole.ButtonText: colors['text'],
+        QPalette.ColorRole.ToolTipBase: colors['base'],
+        QPalette.ColorRole.ToolTipText: colors['text'],
+        QPalette.ColorRole.Highlight: colors['accent'],
+        QPalette.ColorRole.HighlightedText: colors['accent_text'],
+        QPalette.ColorRole.Mid: colors['border'],
+        QPalette.ColorRole.Dark: colors['handle'],
+        QPalette.ColorRole.Shadow: colors['handle_hover'],
+    }
+    for role, color in roles.items():
+        palette.setColor(role, QColor(color))
+    return palette
+
+
+@lru_cache(maxsize=None)
+def compile_stylesheet(theme, font_size=DEFAULT_FONT_SIZE):
+    """生成 (主题, 字号) 对应的样式表, 结果被缓存"""
+    colors = THEMES[theme_key(theme)]
+    return STYLESHEET.format(
+        font_size=font_size,
+        accent_hover=colors['accent_hover'],
+        accent_pressed=colors['accent_pressed'],
+        accent_rgb=_rgb(colors['accent']),
+        tag=colors['tag'],
+        tag_rgb=_rgb(colors['tag']),
+    )
+
+
+def preview_stylesheet(theme):
+    """设置对话框中字体预览框的样式, 预览的是尚未应用的主题, 因此直接写颜色"""
+    colors = THEMES[theme_key(theme)]
+    return f"""
+        QLabel {{
+            padding: 10px;
+            border: 1px solid {colors['border']};
+            border-radius: 5px;
+            background-color: {colors['window']};
+            color: {colors['text']};
+            min-height: 40px;
+            margin: 5px;
+        }}
+    """
+
+
+_applied = None
+
+
+def apply_theme(app, theme=None, font_size=None):
+    """把主题应用到整个程序, 返回重新 polish 所有控件的耗时(毫秒); 与当前主题相同时什么也不做"""
+    global _applied
+    key = (theme_key(theme), int(font_size or DEFAULT_FONT_SIZE))
+    if key == _applied:
+        return 0.0
+    start = time.perf_counter()
+    app.setPalette(build_palette(key[0]))
+    if app.styleSheet():
+        # 直接替换已有的程序级样式表比先清空再设置慢数倍(31 个标签页时约 900 ms 对 240 ms)
+        app.setStyleSheet('')
+    app.setStyleSheet(compile_stylesheet(*key))
+    elapsed = (time.perf_counter() - start) * 1000
+    _applied = key
+    logger.info(f"应用主题 {key[0]}, 字号 {key[1]}pt, 耗时 {elapsed:.1f} ms")
+    return elapsed
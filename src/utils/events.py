@@ -0,0 +1,53 @@
+import threading
+import weakref
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Listeners:
+    """变更通知的回调列表
+
+    绑定方法按弱引用保存, 对象(如关闭的标签页)被销毁后自动移除, 不会因为订阅而无法释放.
+    回调在发出通知的线程中调用, 单个回调出错不影响其他回调.
+    """
+
+    def __init__(self):
+        self._refs = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _ref(callback):
+        if hasattr(callback, '__self__') and hasattr(callback, '__func__'):
+            return weakref.WeakMethod(callback)
+        return lambda: callback
+
+    def add(self, callback):
+        with self._lock:
+            self._refs.append(self._ref(callback))
+
+    def remove(self, callback):
+        with self._lock:
+            self._refs = [ref for ref in self._refs if ref() not in (None, callback)]
+
+    def emit(self, *args):
+        with self._lock:
+            refs = list(self._refs)
+        dead = []
+        for ref in refs:
+            callback = ref()
+            if callback is None:
+                dead.append(ref)
+                continue
+            try:
+                callback(*args)
+            except RuntimeError as e:
+                # Qt对象已被删除, 但Python包装对象还在
+                logger.debug(f"移除失效的回调: {str(e)}")
+                dead.append(ref)
+            except Exception as e:
+                logger.error(f"变更通知处理失败: {str(e)}")
+        if dead:
+            with self._lock:
+                self._refs = [ref for ref in self._refs if ref not in dead]
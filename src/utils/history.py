@@ -1,39 +1,248 @@
+import atexit
 import json
+import sqlite3
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 
+from src.utils.events import Listeners
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_HISTORY_FILE = Path.home() / '.html_parser' / 'history.db'
+# 记录数超出上限这么多(或上限的十分之一, 取较大者)时才在后台压缩
+COMPACT_SLACK = 100
+# 压缩时每个事务删除的记录数, 两批之间释放锁, 不长时间挡住写入和查询
+COMPACT_BATCH = 500
+# 收到新记录后等待多久(秒)再写入, 期间的记录合并到一个事务
+WRITE_DELAY = 0.2
+# 可排序的列
+SORT_COLUMNS = ('url', 'timestamp', 'visits')
+# 搜索结果少于总数的这一比例时, 先筛选再排序, 不沿排序索引逐行匹配
+SELECTIVE_SEARCH = 0.05
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    timestamp TEXT NOT NULL,
+    visits INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS history_timestamp ON history (timestamp, id);
+CREATE INDEX IF NOT EXISTS history_visits ON history (visits, id);
+"""
+
+
+def _like_pattern(text):
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
 class HistoryManager:
-    def __init__(self):
-        self.history_file = Path.home() / '.html_parser' / 'history.json'
-        self.history_file.parent.mkdir(exist_ok=True)
-        self.history = self.load_history()
+    """访问历史, 保存在SQLite数据库中
+
+    每个URL只保留一条记录(最近访问时间和访问次数), url 和 timestamp 上有索引.
+    添加记录只是放入队列, 由后台线程合并写入, 写入后通知订阅者; 查询不等待队列中的记录.
+    超出上限的旧记录在后台线程中分批删除. 旧版的 history.json 会在第一次打开时导入.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_FILE):
+        self.history_file = Path(path)
+        self.history_file.parent.mkdir(parents=True, exist_ok=True)
         self.max_history = 100  # 默认最大历史记录数
-        
-    def load_history(self):
-        if self.history_file.exists():
-            with open(self.history_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
-        
+        # _lock 保护数据库连接; 队列另用 _wakeup 自带的锁, 添加记录不必等待数据库
+        self._lock = threading.RLock()
+        self._wakeup = threading.Condition()
+        self._pending = []
+        self._closed = False
+        self._compacting = False
+        self.listeners = Listeners()
+        # 最近一次搜索的 (文字, 结果数)
+        self._search_count = (None, 0)
+        self._conn = sqlite3.connect(str(self.history_file), check_same_thread=False)
+        # WAL 模式下提交不必等待 fsync, 读写互不阻塞
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._count = self._conn.execute('SELECT COUNT(*) FROM history').fetchone()[0]
+        if self._count == 0:
+            self._import_legacy()
+        self._writer = threading.Thread(target=self._write_loop, name='history-writer', daemon=True)
+        self._writer.start()
+
+    def _import_legacy(self):
+        legacy = self.history_file.with_name('history.json')
+        if not legacy.exists():
+            return
+        try:
+            with open(legacy, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            with self._lock, self._conn:
+                for entry in entries:
+                    self._upsert(entry['url'], entry['timestamp'])
+            self._count = self._conn.execute('SELECT COUNT(*) FROM history').fetchone()[0]
+            legacy.rename(legacy.with_name('history.json.bak'))
+            logger.info(f"已导入旧的历史记录 {len(entries)} 条")
+        except Exception as e:
+            logger.error(f"导入旧的历史记录失败: {str(e)}")
+
+    def _upsert(self, url, timestamp):
+        """更新已有URL的访问时间, 不存在时插入; 返回是否新增了记录"""
+        cursor = self._conn.execute(
+            'UPDATE history SET timestamp = ?, visits = visits + 1 WHERE url = ?', (timestamp, url))
+        if cursor.rowcount:
+            return False
+        self._conn.execute('INSERT INTO history (url, timestamp) VALUES (?, ?)', (url, timestamp))
+        return True
+
     def add_entry(self, url):
-        entry = {
-            'url': url,
-            'timestamp': datetime.now().isoformat()
-        }
-        self.history.append(entry)
-        self.trim_history()  # 确保历史记录不超过最大条数
-        self.save_history()
-        
-    def save_history(self):
-        with open(self.history_file, 'w', encoding='utf-8') as f:
-            json.dump(self.history, f, ensure_ascii=False, indent=4)
-            
+        """记下一次访问, 在调用线程中立即返回"""
+        timestamp = datetime.now().isoformat(timespec='seconds')
+        with self._wakeup:
+            self._pending.append((url, timestamp))
+            self._wakeup.notify()
+
+    def _write_loop(self):
+        while True:
+            with self._wakeup:
+                while not self._pending and not self._closed:
+                    self._wakeup.wait()
+                if self._closed:
+                    return
+            time.sleep(WRITE_DELAY)
+            self.flush()
+
+    def flush(self):
+        """把队列中的记录写入数据库, 有新记录时通知订阅者"""
+        with self._wakeup:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        with self._lock:
+            if self._closed:
+                return
+            try:
+                with self._conn:
+                    for url, timestamp in batch:
+                        if self._upsert(url, timestamp):
+                            self._count += 1
+                self._search_count = (None, 0)
+            except sqlite3.Error as e:
+                logger.error(f"保存历史记录失败: {str(e)}")
+                return
+        self.trim_history()
+        self.listeners.emit()
+
+    def subscribe(self, callback):
+        """callback() 在写入记录的线程中调用, 多数情况下是后台线程, 界面需要排队转发"""
+        self.listeners.add(callback)
+
+    def unsubscribe(self, callback):
+        self.listeners.remove(callback)
+
     def set_max_history(self, max_history):
         self.max_history = max_history
-        self.trim_history()  # 立即修剪历史记录
-        
-    def trim_history(self):
-        """修剪历史记录以符合最大条数限制"""
-        if len(self.history) > self.max_history:
-            self.history = self.history[-self.max_history:]
-            self.save_history()
+        self.trim_history(force=True)  # 立即修剪历史记录
+
+    def trim_history(self, force=False):
+        """记录数超出上限一定数量后, 在后台删除最旧的记录"""
+        slack = 0 if force else max(COMPACT_SLACK, self.max_history // 10)
+        with self._lock:
+            if self._compacting or self._count <= self.max_history + slack:
+                return
+            self._compacting = True
+        threading.Thread(target=self._compact, name='history-compact', daemon=True).start()
+
+    def _compact(self):
+        try:
+            with self._lock:
+                if self._closed:
+                    return
+                # 要保留的最旧一条记录, 比它旧的都删除
+                keep = self._conn.execute(
+                    'SELECT timestamp, id FROM history ORDER BY timestamp DESC, id DESC LIMIT 1 OFFSET ?',
+                    (self.max_history - 1,)).fetchone() if self.max_history > 0 else ('\uffff', 0)
+            if keep is None:
+                return
+            while True:
+                with self._lock:
+                    if self._closed:
+                        return
+                    with self._conn:
+                        deleted = self._conn.execute(
+                            'DELETE FROM history WHERE id IN (SELECT id FROM history WHERE (timestamp, id) < (?, ?) '
+                            'ORDER BY timestamp, id LIMIT ?)', (*keep, COMPACT_BATCH)).rowcount
+                    self._count -= deleted
+                    self._search_count = (None, 0)
+                if deleted < COMPACT_BATCH:
+                    break
+        except sqlite3.Error as e:
+            logger.error(f"压缩历史记录失败: {str(e)}")
+        finally:
+            self._compacting = False
+
+    def count(self, search=None):
+        """记录数, search 为URL中包含的文字"""
+        with self._lock:
+            if not search:
+                return self._count
+            if self._search_count[0] != search:
+                count = self._conn.execute(
+                    "SELECT COUNT(*) FROM history WHERE url LIKE ? ESCAPE '\\'", (_like_pattern(search),)).fetchone()[0]
+                self._search_count = (search, count)
+            return self._search_count[1]
+
+    def page(self, offset, limit, search=None, sort='timestamp', descending=True):
+        """按 sort 排序后取出 [offset, offset+limit) 的记录, 每条为 (url, timestamp, visits)"""
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"不能按 {sort} 排序")
+        order = 'DESC' if descending else 'ASC'
+        where, args, key = '', [], sort
+        if search:
+            where, args = "WHERE url LIKE ? ESCAPE '\\'", [_like_pattern(search)]
+            if self.count(search) < self.count() * SELECTIVE_SEARCH:
+                # 一元加号使排序不走索引, 先扫描筛选出少量结果再排序
+                key = f'+{sort}'
+        with self._lock:
+            return self._conn.execute(
+                f'SELECT url, timestamp, visits FROM history {where} '
+                f'ORDER BY {key} {order}, id {order} LIMIT ? OFFSET ?', args + [limit, offset]).fetchall()
+
+    @property
+    def history(self):
+        """全部记录, 按时间从旧到新, 每条为 {'url', 'timestamp', 'visits'}"""
+        rows = self.page(0, self.count(), descending=False)
+        return [{'url': url, 'timestamp': timestamp, 'visits': visits} for url, timestamp, visits in rows]
+
+    def clear(self):
+        with self._wakeup:
+            self._pending.clear()
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM history')
+            self._count = 0
+            self._search_count = (None, 0)
+
+    def close(self):
+        """写入队列中的记录后关闭数据库"""
+        self.flush()
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+        with self._lock:
+            self._conn.close()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_history_manager():
+    """返回进程内唯一的 HistoryManager, 各标签页共用"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = HistoryManager()
+            atexit.register(_manager.close)
+        return _manager
@@ -0,0 +1,118 @@
+import gc
+import os
+import sys
+import threading
+import tracemalloc
+from datetime import datetime
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 每次分配记录的调用栈深度, 越深越准确但开销越大
+TRACE_FRAMES = 5
+# 比较快照时列出的条目数
+TOP_STATS = 30
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def process_memory():
+    """进程当前的常驻内存(字节), 无法获取时返回 None"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # 只能取得峰值; macOS 上单位为字节, Linux 上为KB
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+class MemoryTracer:
+    """按需开启 tracemalloc, 拍快照并和上一张比较, 找出增长最多的分配位置
+
+    跟踪会明显拖慢分配, 只在排查问题时开启.
+    """
+
+    def __init__(self):
+        self.snapshots = []
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=TRACE_FRAMES):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.info("已开启内存分配跟踪")
+
+    def stop(self):
+        with self._lock:
+            self.snapshots.clear()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("已关闭内存分配跟踪")
+
+    def take(self):
+        """拍一张快照, 返回 (时间, 跟踪到的总字节数); 未开启跟踪时抛出 RuntimeError"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("尚未开启内存跟踪")
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ))
+        total = sum(stat.size for stat in snapshot.statistics('filename'))
+        taken = datetime.now().strftime('%H:%M:%S')
+        with self._lock:
+            self.snapshots.append((taken, snapshot))
+        return taken, total
+
+    def compare(self, key_type='lineno', limit=TOP_STATS):
+        """比较最近两张快照, 返回按增长排序的 (位置, 增长字节, 当前字节, 增长块数)"""
+        with self._lock:
+            if len(self.snapshots) < 2:
+                raise RuntimeError("至少需要两张快照才能比较")
+            (_, before), (_, after) = self.snapshots[-2:]
+        result = []
+        for stat in after.compare_to(before, key_type)[:limit]:
+            frame = stat.traceback[0]
+            result.append((f"{frame.filename}:{frame.lineno}", stat.size_diff, stat.size, stat.count_diff))
+        return result
+
+    def top(self, key_type='lineno', limit=TOP_STATS):
+        """最近一张快照中占用最多的位置, 返回 (位置, 字节, 块数)"""
+        with self._lock:
+            if not self.snapshots:
+                raise RuntimeError("还没有快照")
+            _, snapshot = self.snapshots[-1]
+        result = []
+        for stat in snapshot.statistics(key_type)[:limit]:
+            frame = stat.traceback[0]
+            result.append((f"{frame.filename}:{frame.lineno}", stat.size, stat.count))
+        return result
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_memory_tracer():
+    """返回进程内唯一的 MemoryTracer"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = MemoryTracer()
+        return _tracer
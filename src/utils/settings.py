@@ -1,28 +1,65 @@
 import json
+import threading
 from pathlib import Path
 
-from src.core.parser import logger
+from src.utils.events import Listeners
+from src.utils.logger import get_logger
+from src.utils.storage import WriteBehindFile
+
+logger = get_logger(__name__)
+
+DEFAULT_SETTINGS_FILE = Path.home() / '.html_parser' / 'settings.json'
 
 
 class SettingsManager:
-    def __init__(self):
-        self.settings_file = Path.home() / '.html_parser' / 'settings.json'
-        self.settings_file.parent.mkdir(exist_ok=True)
+    """进程内共享的设置服务
+
+    启动时读取一次, settings 字典由各窗口和标签页直接共用; 通过 update 修改时
+    通知订阅者改动了哪些键, 并在后台合并写盘.
+    """
+
+    def __init__(self, path=DEFAULT_SETTINGS_FILE):
+        self.settings_file = Path(path)
+        self.settings_file.parent.mkdir(parents=True, exist_ok=True)
         self.settings = self.load_settings()
+        self.listeners = Listeners()
+        self._writer = WriteBehindFile(self.settings_file)
 
     def load_settings(self):
-        if self.settings_file.exists():
-            with open(self.settings_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return self.get_default_settings()
-
-    def save_settings(self, settings):
         try:
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, ensure_ascii=False, indent=4)
+            if self.settings_file.exists():
+                with open(self.settings_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
         except Exception as e:
-            logger.error(f"保存设置失败: {str(e)}")
-            raise
+            logger.error(f"读取设置失败, 将使用默认设置: {str(e)}")
+        return self.get_default_settings()
+
+    def get(self, key, default=None):
+        return self.settings.get(key, default)
+
+    def update(self, values):
+        """修改设置, 返回实际改变的 {键: 新值}; 有改变时通知订阅者并安排写盘"""
+        changed = {key: value for key, value in values.items() if self.settings.get(key) != value}
+        if not changed:
+            return changed
+        self.settings.update(changed)
+        self.save_settings()
+        self.listeners.emit(changed)
+        return changed
+
+    def subscribe(self, callback):
+        """callback(changed) 在修改设置的线程(通常是界面线程)中调用"""
+        self.listeners.add(callback)
+
+    def unsubscribe(self, callback):
+        self.listeners.remove(callback)
+
+    def save_settings(self):
+        # 在调用线程中序列化, 后台线程只负责写文件
+        self._writer.schedule(json.dumps(self.settings, ensure_ascii=False, indent=4))
+
+    def flush(self):
+        self._writer.flush()
 
     def get_default_settings(self):
         return {
@@ -31,3 +68,16 @@ class SettingsManager:
             'max_history': 100,
             'export_format': 'html'
         }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_settings_manager():
+    """返回进程内唯一的 SettingsManager"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SettingsManager()
+        return _manager
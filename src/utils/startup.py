@@ -0,0 +1,109 @@
+"""启动耗时统计: 各模块的导入耗时和启动各阶段的时间点
+
+只依赖标准库, 应在 main 中最先导入, 时间从导入本模块时算起(不含解释器自身的启动).
+"""
+import sys
+import threading
+import time
+
+START = time.perf_counter()
+
+_marks = []
+_imports = {}
+
+
+def mark(name):
+    """记录一个启动阶段完成的时间点"""
+    _marks.append((name, time.perf_counter() - START))
+
+
+def elapsed():
+    return time.perf_counter() - START
+
+
+class _TimedLoader:
+    """包装模块加载器, 记录模块本身代码的执行耗时(扣除其中导入的其他模块)"""
+
+    _stack = []
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        name = module.__name__
+        stack = _TimedLoader._stack
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += total
+            _imports[name] = (total - nested, total)
+
+
+class _ImportProfiler:
+    """放在 sys.meta_path 最前面, 只在主线程中为找到的模块包装加载器"""
+
+    def find_spec(self, name, path=None, target=None):
+        if threading.current_thread() is not threading.main_thread():
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader)
+                return spec
+        return None
+
+
+_profiler = None
+
+
+def profile_imports():
+    """开始统计之后导入的模块"""
+    global _profiler
+    if _profiler is None:
+        _profiler = _ImportProfiler()
+        sys.meta_path.insert(0, _profiler)
+
+
+def stop_profiling():
+    global _profiler
+    if _profiler is not None:
+        sys.meta_path.remove(_profiler)
+        _profiler = None
+
+
+def report(top=20):
+    """返回启动报告的文本: 各阶段时间点和导入最慢的模块"""
+    lines = ["启动耗时 (从 main 开始计时):"]
+    previous = 0.0
+    for name, at in _marks:
+        lines.append(f"  {at * 1000:8.1f} ms  (+{(at - previous) * 1000:6.1f})  {name}")
+        previous = at
+    if _imports:
+        total = sum(own for own, _ in _imports.values())
+        lines.append(f"导入 {len(_imports)} 个模块, 共 {total * 1000:.1f} ms, 最慢的 {top} 个 (自身/含子模块):")
+        slowest = sorted(_imports.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        for name, (own, cumulative) in slowest:
+            lines.append(f"  {own * 1000:8.1f} ms  {cumulative * 1000:8.1f} ms  {name}")
+    return '\n'.join(lines)
+
+
+def as_dict():
+    return {
+        'marks': [{'name': name, 'ms': round(at * 1000, 2)} for name, at in _marks],
+        'imports': {name: {'self_ms': round(own * 1000, 2), 'total_ms': round(total * 1000, 2)}
+                    for name, (own, total) in _imports.items()},
+    }
@@ -0,0 +1,97 @@
+import atexit
+import os
+import threading
+import time
+from pathlib import Path
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 最后一次修改后多久(秒)才真正写盘, 期间的多次修改合并为一次
+WRITE_DELAY = 0.5
+# 持续修改时, 距第一次未写盘的修改最多这么久(秒)也要写盘
+MAX_WRITE_DELAY = 5
+
+
+def write_atomic(path, text):
+    """先写临时文件再改名替换, 中途崩溃也不会留下写了一半的文件"""
+    path = Path(path)
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+class WriteBehindFile:
+    """延迟写盘: schedule 只记下最新内容, 由后台定时器合并后原子地写入
+
+    进程退出时会写出尚未写盘的内容.
+    """
+
+    def __init__(self, path, delay=WRITE_DELAY, max_delay=MAX_WRITE_DELAY):
+        self.path = Path(path)
+        self.delay = delay
+        self.max_delay = max_delay
+        self._pending = None
+        # 第一次和最近一次未写盘的修改时间
+        self._first = None
+        self._last = None
+        self._timer = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def schedule(self, text):
+        """记下要写入的内容, 在调用线程中立即返回
+
+        text 也可以是返回内容的函数, 写盘时才在后台线程中调用, 频繁修改时不必每次都序列化.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._pending = text
+            self._last = now
+            if self._first is None:
+                self._first = now
+            if self._timer is None:
+                self._start_timer(self.delay)
+
+    def _start_timer(self, delay):
+        self._timer = threading.Timer(delay, self._expire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _expire(self):
+        # 定时器到期时如果期间又有修改, 不必每次修改都重启定时器, 在这里顺延到期时间
+        with self._lock:
+            if self._first is None:
+                return
+            due = min(self._last + self.delay, self._first + self.max_delay)
+            remaining = due - time.monotonic()
+            if remaining > 0:
+                self._start_timer(remaining)
+                return
+            self._timer = None
+        self.flush()
+
+    def flush(self):
+        """立即写出尚未写盘的内容"""
+        with self._write_lock:
+            with self._lock:
+                text, self._pending = self._pending, None
+                self._first = self._last = None
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if text is None:
+                return
+            try:
+                if callable(text):
+                    text = text()
+                write_atomic(self.path, text)
+            except Exception as e:
+                logger.error(f"写入 {self.path} 失败: {str(e)}")
@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 测试按 src. 前缀导入, 与 python -m src.main 一致
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# 在导入被测模块之前切换 HOME, 不读写用户的缓存和历史记录
+os.environ['HOME'] = tempfile.mkdtemp(prefix='html_parser_test_')
+
+from src.core.doc_cache import set_document_cache  # noqa: E402
+
+# 关闭解析缓存, 每次都真正解析
+set_document_cache(None)
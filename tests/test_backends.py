@@ -0,0 +1,35 @@
+import pytest
+
+from src.core.backends import DEFAULT_BACKEND, available_backends
+from src.core.parser import HTMLParser
+
+# 隐式关闭的元素(没有结束标签, 后面也没有兄弟元素), 以及属性值中带 > 的开始标签
+DOCUMENTS = (
+    "<div><p>a<p>last</div>",
+    "<div><p>a<p>b<span>c</span></div>tail",
+    "<ul><li>1<li>2<li>3</ul><p>x",
+    "<table><tr><td>a<td>b</table>",
+    "<dl><dt>t<dd>d</dl><div><p>one<p>two</div>",
+    # 引号中的 > 和 < 不是标签的边界
+    "<div><img alt=\"a>b\" src=x><p title='<b>x</b>'>y</p></div>",
+    "<div><script data-x=\">\">var a = '<p>';</script><span>z</span></div>",
+)
+
+# 补出的 html/head/body/tbody 在源码中没有标签, 不参与比较
+IMPLIED = {'html', 'head', 'body', 'tbody'}
+
+
+def outer_htmls(backend, document):
+    parser = HTMLParser(backend)
+    parser.parse_html(document.encode('utf-8'))
+    snapshot = parser.snapshot
+    return [(snapshot.name(node), snapshot.outer_html(node))
+            for node in range(1, len(snapshot)) if snapshot.name(node) not in IMPLIED]
+
+
+@pytest.mark.parametrize('backend', [name for name in available_backends() if name != DEFAULT_BACKEND])
+@pytest.mark.parametrize('document', DOCUMENTS)
+def test_outer_html_matches_default_backend(backend, document):
+    # html.parser 直接记录源码位置, 其他后端的偏移靠在源码中对齐标签得到
+    assert outer_htmls(backend, document) == outer_htmls(DEFAULT_BACKEND, document)
+
@@ -0,0 +1,49 @@
+import threading
+import time
+
+from src.utils import history
+from src.utils.history import HistoryManager
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_add_entry_does_not_wait_for_database(tmp_path):
+    manager = HistoryManager(tmp_path / 'history.db')
+    held = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with manager._lock:
+            held.set()
+            release.wait()
+    threading.Thread(target=hold).start()
+    held.wait()
+    try:
+        start = time.monotonic()
+        manager.add_entry('http://example.com/')
+        assert time.monotonic() - start < 0.1
+    finally:
+        release.set()
+    wait_until(lambda: manager.count() == 1)
+    manager.close()
+
+
+def test_compaction_keeps_newest_entries_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, 'COMPACT_BATCH', 7)
+    manager = HistoryManager(tmp_path / 'history.db')
+    manager.max_history = 1000
+    for i in range(100):
+        manager._pending.append((f'http://example.com/{i}', f'2024-01-01T00:00:{i // 10:02d}'))
+    manager.flush()
+    assert manager.count() == 100
+    manager.set_max_history(10)
+    wait_until(lambda: not manager._compacting)
+    assert manager.count() == 10
+    urls = [url for url, timestamp, visits in manager.page(0, 100)]
+    assert sorted(urls) == sorted(f'http://example.com/{i}' for i in range(90, 100))
+    manager.close()
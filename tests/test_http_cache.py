@@ -0,0 +1,40 @@
+import json
+
+from src.core.http_cache import ResponseCache
+
+URL = 'http://example.com/page.html'
+
+
+def store(cache, url, body):
+    writer = cache.open_writer(url, {'ETag': '"1"', 'Content-Type': 'text/html'})
+    writer.write(body)
+    writer.commit()
+
+
+def read_index(cache):
+    return json.loads(cache.index_file.read_text(encoding='utf-8'))
+
+
+def test_touch_does_not_rewrite_index(tmp_path):
+    cache = ResponseCache(tmp_path)
+    store(cache, URL, b'<p>a</p>')
+    cache.flush()
+    saved = read_index(cache)[cache.key(URL)]['last_used']
+    mtime = cache.index_file.stat().st_mtime_ns
+
+    for _ in range(100):
+        cache.touch(URL)
+    assert cache.index_file.stat().st_mtime_ns == mtime
+
+    # 合并后的访问时间在下一次写盘时保存
+    cache.flush()
+    assert read_index(cache)[cache.key(URL)]['last_used'] > saved
+
+
+def test_index_survives_reload(tmp_path):
+    cache = ResponseCache(tmp_path)
+    store(cache, URL, b'<p>a</p>')
+    cache.flush()
+    entry = ResponseCache(tmp_path).lookup(URL)
+    assert entry.read() == b'<p>a</p>'
+    assert entry.validators() == {'If-None-Match': '"1"'}
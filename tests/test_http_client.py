@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+
+from src.core.cancel import CancelToken, ParseCancelled
+from src.core.http_client import HttpClient, HttpError
+
+
+class FakeResponse:
+    headers = {'Content-Type': 'text/html; charset=utf-8'}
+
+    def __init__(self, chunks, stall):
+        self.chunks = chunks
+        self.stall = stall
+
+    async def iter_chunks(self, size):
+        for chunk in self.chunks:
+            yield chunk
+        if self.stall:
+            # 服务器不再发送数据
+            await asyncio.sleep(60)
+
+
+class FakeClient(HttpClient):
+    """不访问网络, 返回固定内容的客户端"""
+
+    def __init__(self, chunks=(), stall=False, error=None):
+        super().__init__()
+        self.chunks = chunks
+        self.stall = stall
+        self.error = error
+
+    @asynccontextmanager
+    async def request(self, url, timings=None):
+        if self.error is not None:
+            raise self.error
+        yield FakeResponse(self.chunks, self.stall)
+
+
+@pytest.fixture
+def make_client():
+    clients = []
+
+    def make(**kwargs):
+        clients.append(FakeClient(**kwargs))
+        return clients[-1]
+    yield make
+    for client in clients:
+        client.close()
+
+
+def test_stream_yields_chunks(make_client):
+    stream = make_client(chunks=[b'<p>', b'a</p>']).stream('http://example.com/')
+    assert stream.encoding == 'utf-8'
+    assert b''.join(stream) == b'<p>a</p>'
+
+
+def test_stream_raises_request_error(make_client):
+    with pytest.raises(HttpError):
+        make_client(error=HttpError(404, 'http://example.com/')).stream('http://example.com/')
+
+
+def test_cancel_interrupts_stalled_stream(make_client):
+    token = CancelToken()
+    stream = make_client(chunks=[b'<p>'], stall=True).stream('http://example.com/', token=token)
+    threading.Timer(0.2, token.cancel).start()
+    start = time.monotonic()
+    with pytest.raises(ParseCancelled):
+        list(stream)
+    assert time.monotonic() - start < 5
+    assert stream._future.done()
+
+
+def test_close_ends_stalled_stream(make_client):
+    stream = make_client(chunks=[b'<p>'], stall=True).stream('http://example.com/')
+    chunks = iter(stream)
+    assert next(chunks) == b'<p>'
+    threading.Timer(0.2, stream.close).start()
+    # 生产者被取消后仍会放入结束标记
+    assert list(chunks) == []
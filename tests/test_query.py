@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+from src.core.cancel import CancelToken, ParseCancelled
+
+from src.core.backends import available_backends
+from src.core.parser import HTMLParser
+from src.core.query import QueryError, select
+
+lxml_html = pytest.importorskip('lxml.html')
+
+# 标签名和 id/class 的倒排表互相矛盾: 带 id/class 的元素不一定是查询的标签
+DOCUMENT = (
+    "<html><body>"
+    "<div><p>a<span id='x' class='c'>s</span></p>"
+    "<div class='c' id='y'>d<p class='c'>e</p></div>"
+    "<ul><li class='c'>1</li><li id='x2'>2</li></ul></div>"
+    "<section class='c'><div id='z'><span class='c'>t</span></div></section>"
+    "</body></html>"
+)
+
+QUERIES = (
+    "//div[@id='x']",
+    "//span[@id='x']",
+    "//div[@class='c']",
+    "//p[@class='c']",
+    "//li[@id='x2']",
+    "//section//span[@class='c']",
+    "/html/body/div/p[@class='c']",
+    "/html/body/div/div[@class='c']",
+    "/html/body/section[@class='c']",
+    "/html/body/div[@class='c']",
+    "//div/div[@id='y']/p",
+    "//*[@class='c']",
+    "//span[@class='c']/preceding::p",
+    "//li/preceding::*[@class='c']",
+    "//p/following::li",
+    "//li[@id='x2']/following::span",
+    "//span/preceding::p[1]",
+    "//p/following::*[2]",
+)
+
+
+def signature(name, attrs):
+    """按标签名和属性比较元素; 有的解析引擎会补出 head, 先序下标不能直接比较"""
+    return name, tuple(sorted(attrs))
+
+
+def lxml_matches(document, query):
+    root = lxml_html.document_fromstring(document)
+    return [signature(element.tag, element.attrib.items()) for element in root.xpath(query)]
+
+
+@pytest.mark.parametrize('backend', available_backends())
+@pytest.mark.parametrize('query', QUERIES)
+def test_xpath_matches_lxml(backend, query):
+    parser = HTMLParser(backend)
+    parser.parse_html(DOCUMENT.encode('utf-8'))
+    snapshot = parser.snapshot
+    matches = [signature(snapshot.name(node), snapshot.attr_items(node))
+               for node in select(snapshot, query, 'xpath')]
+    assert matches == lxml_matches(DOCUMENT, query)
+
+
+def test_empty_pseudo_is_rejected():
+    # 快照不记录文本, :empty 会把有文本的元素当作空元素
+    with pytest.raises(QueryError):
+        select(None, 'p:empty', 'css')
+
+
+@pytest.mark.parametrize('query', ("//p/preceding::span", "//p/preceding::span[1]", "//p/following::*[last()]"))
+def test_cancel_stops_expensive_axis_quickly(query):
+    # 每个上下文的轴都覆盖大半个文档, 逐个上下文计算是平方级的
+    document = "<div>" + "<p><span>x</span></p>" * 20000 + "</div>"
+    parser = HTMLParser()
+    parser.parse_html(document.encode('utf-8'))
+    token = CancelToken()
+    threading.Timer(0.2, token.cancel).start()
+    start = time.monotonic()
+    try:
+        select(parser.snapshot, query, 'xpath', token)
+    except ParseCancelled:
+        pass
+    assert time.monotonic() - start < 2
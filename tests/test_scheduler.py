@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+import pytest
+
+from src.core.cancel import CancelToken, ParseCancelled
+from src.core.doc_cache import DocumentCache, set_document_cache
+from src.core.parser import HTMLParser, IncrementalParser
+from src.core.query import select
+from src.core.scheduler import ParseJob, ParseScheduler
+
+DOCUMENT = ("<html><body>" + "<div class='row'><p>text</p></div>" * 2000 + "</body></html>").encode('utf-8')
+
+
+class FakeClient:
+    loop = None
+
+
+class FakeResponse:
+    """按块返回固定内容的网络响应"""
+    from_cache = False
+
+    def __init__(self, data):
+        self.data = data
+
+    async def iter_chunks(self, size):
+        for start in range(0, len(self.data), size):
+            yield self.data[start:start + size]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = DocumentCache(tmp_path)
+    set_document_cache(cache)
+    yield cache
+    set_document_cache(None)
+
+
+def read_stream(data):
+    scheduler = ParseScheduler(FakeClient())
+
+    async def run():
+        scheduler.client.loop = asyncio.get_running_loop()
+        return await scheduler._read_stream(ParseJob('http://example.com/'), FakeResponse(data), None)
+
+    try:
+        return asyncio.run(run())
+    finally:
+        scheduler.executor.shutdown()
+        scheduler.query_executor.shutdown()
+
+
+def test_stream_key_matches_whole_document_key():
+    digest = DocumentCache.hasher()
+    for start in range(0, len(DOCUMENT), 1000):
+        digest.update(DOCUMENT[start:start + 1000])
+    assert DocumentCache.finish_key(digest, 'html.parser') == DocumentCache.key(DOCUMENT, 'html.parser')
+
+
+def test_unchanged_stream_is_served_from_document_cache(cache, monkeypatch):
+    first = read_stream(DOCUMENT)
+    assert cache.get(DocumentCache.key(DOCUMENT, 'html.parser'), None) is first
+
+    # 内容相同的响应不再生成最终快照
+    def close(self):
+        raise AssertionError('不应重新生成快照')
+    monkeypatch.setattr(IncrementalParser, 'close', close)
+    assert read_stream(DOCUMENT) is first
+
+
+def test_changed_stream_is_parsed_again(cache):
+    first = read_stream(DOCUMENT)
+    second = read_stream(DOCUMENT.replace(b'text', b'TEXT'))
+    assert second is not first
+    assert len(second) == len(first)
+
+
+def test_cancelled_query_does_not_hold_up_the_next_one():
+    # 所有标签页共用一个查询线程, 被取代的查询必须尽快让出
+    parser = HTMLParser()
+    parser.parse_html(("<div>" + "<p><span>x</span></p>" * 20000 + "</div>").encode('utf-8'))
+    snapshot = parser.snapshot
+    scheduler = ParseScheduler(FakeClient())
+    try:
+        stale = CancelToken()
+        slow = scheduler.run_query(select, snapshot, "//p/preceding::span[1]", 'xpath', stale)
+        time.sleep(0.1)
+        stale.cancel()
+        start = time.monotonic()
+        fast = scheduler.run_query(select, snapshot, "//span", 'xpath', CancelToken())
+        assert len(fast.result(timeout=10)) == 20000
+        assert time.monotonic() - start < 2
+        with pytest.raises(ParseCancelled):
+            slow.result()
+    finally:
+        scheduler.executor.shutdown()
+        scheduler.query_executor.shutdown(cancel_futures=True)
+
+
+@pytest.mark.parametrize('streaming', (True, False))
+def test_local_file_is_not_mapped_after_parse(tmp_path, streaming):
+    path = tmp_path / 'page.html'
+    path.write_bytes(DOCUMENT)
+    scheduler = ParseScheduler(FakeClient())
+
+    async def run():
+        scheduler.client.loop = asyncio.get_running_loop()
+        return await scheduler._parse_file(ParseJob(str(path), streaming=streaming, local=True))
+
+    try:
+        snapshot = asyncio.run(run())
+    finally:
+        scheduler.executor.shutdown()
+        scheduler.query_executor.shutdown()
+    assert isinstance(snapshot.source.data, bytes)
+    # 文件被截断后仍能读取元素内容, 映射时这里会 SIGBUS
+    path.write_bytes(b'')
+    assert snapshot.outer_html(len(snapshot) - 1) == '<p>text</p>'
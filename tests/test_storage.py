@@ -0,0 +1,34 @@
+import time
+
+from src.utils.storage import WriteBehindFile
+
+
+def test_write_waits_for_changes_to_settle(tmp_path):
+    path = tmp_path / 'settings.json'
+    writer = WriteBehindFile(path, delay=0.2, max_delay=10)
+    for i in range(5):
+        writer.schedule(str(i))
+        time.sleep(0.1)
+    # 最后一次修改后还不到 delay, 不写盘
+    assert not path.exists()
+    time.sleep(0.3)
+    assert path.read_text(encoding='utf-8') == '4'
+
+
+def test_continuous_changes_are_written_after_max_delay(tmp_path):
+    path = tmp_path / 'settings.json'
+    writer = WriteBehindFile(path, delay=0.2, max_delay=0.5)
+    start = time.monotonic()
+    while not path.exists():
+        assert time.monotonic() - start < 2
+        writer.schedule('x')
+        time.sleep(0.05)
+    assert time.monotonic() - start < 1
+
+
+def test_flush_writes_immediately(tmp_path):
+    path = tmp_path / 'settings.json'
+    writer = WriteBehindFile(path, delay=10)
+    writer.schedule(lambda: 'lazy')
+    writer.flush()
+    assert path.read_text(encoding='utf-8') == 'lazy'